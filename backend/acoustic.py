@@ -0,0 +1,343 @@
+"""
+실시간 음성의 음향 특징과 흥분도(agitation) 신호
+
+Whisper 전사를 기다리지 않고 /ws/audio-stream으로 들어온 PCM에서 바로 계산합니다.
+
+- 프레임(32ms)별 RMS 음량(dBFS)과 정규화 자기상관 기반 피치(75~400Hz), 주기성(유성음 여부)
+- 최근 window_seconds 동안의 말 속도(음절핵 수/초), 고함 비율, 겹침 발화 비율
+- 통화 초반 평상시 음량/피치를 기준선으로 삼아, 기준선보다 크고 높고 빠른 정도를 0~1 흥분도로 합산
+
+청크의 모든 프레임을 (프레임 수, 프레임 길이) 배열로 한 번에 계산하고, 작업 배열은 세션마다
+미리 할당해 재사용하므로 청크마다 청크 크기에 비례하는 새 배열을 만들지 않습니다.
+"""
+
+from typing import Dict, NamedTuple, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from audio import SAMPLE_RATE, SAMPLE_WIDTH
+from risk_lexicon import risk_stage_for
+
+_INT16_SCALE = np.float32(1.0 / 32768.0)
+# 가장 긴 지연의 자기상관을 가장 짧은 지연보다 낮춰 보는 비율
+OCTAVE_COST = 0.1
+
+
+class AcousticFeatures(NamedTuple):
+    rms_db: float  # 최근 윈도우 발화 구간 평균 음량 (dBFS)
+    pitch_hz: float  # 최근 윈도우 평균 피치 (유성음 없으면 0)
+    speaking_rate: float  # 발화 1초당 음절핵 수
+    shout_ratio: float  # 유성음 중 고함(기준선보다 크고 높은 소리) 비율
+    overlap_ratio: float  # 소리 구간 중 주기성이 낮은(겹친 발화/잡음) 비율
+    agitation: float  # 흥분도 0~1
+
+    def as_message(self) -> Dict:
+        return {
+            "type": "acoustic",
+            "agitation": round(self.agitation, 3),
+            "rms_db": round(self.rms_db, 1),
+            "pitch_hz": round(self.pitch_hz, 1),
+            "speaking_rate": round(self.speaking_rate, 2),
+            "shout_ratio": round(self.shout_ratio, 3),
+            "overlap_ratio": round(self.overlap_ratio, 3),
+        }
+
+
+def fuse_risk_level(text_level: int, agitation: Optional[float], weight: float = 0.3) -> int:
+    """
+    텍스트 위험도 점수에 음성 흥분도를 합칩니다.
+
+    흥분도(0~100으로 환산)가 텍스트 점수보다 높을 때만 그 차이의 weight만큼 올립니다.
+    (조용한 목소리로 한 위험 발언의 점수는 낮추지 않음)
+    """
+    if agitation is None:
+        return text_level
+    return int(round(text_level + weight * max(0.0, agitation * 100 - text_level)))
+
+
+def fuse_risk(result: Dict, agitation: Optional[float], weight: float = 0.3) -> Dict:
+    """
+    위험도 결과에 붙일 음성 결합 필드 (acoustic_agitation, fused_risk_level, fused_risk_stage)
+    """
+    fused = fuse_risk_level(int(result.get("risk_level") or 0), agitation, weight)
+    return {
+        "acoustic_agitation": None if agitation is None else round(agitation, 3),
+        "fused_risk_level": fused,
+        "fused_risk_stage": risk_stage_for(fused),
+    }
+
+
+class AcousticAnalyzer:
+    """
+    세션별 음향 특징 추출기 (16kHz mono int16 PCM)
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = SAMPLE_RATE,
+        frame_ms: int = 32,
+        window_seconds: float = 3.0,
+        min_pitch: float = 75.0,
+        max_pitch: float = 400.0,
+        silence_db: float = -45.0,
+        voicing_threshold: float = 0.35,
+        shout_margin_db: float = 10.0,
+        baseline_seconds: float = 2.0,
+        max_chunk_seconds: float = 1.0,
+    ):
+        self.sample_rate = sample_rate
+        self.frame_length = sample_rate * frame_ms // 1000
+        self.frame_seconds = self.frame_length / sample_rate
+        self.min_lag = int(sample_rate / max_pitch)
+        self.max_lag = int(sample_rate / min_pitch)
+        # 모든 지연(lag)에 같은 길이로 자기상관을 계산하는 구간
+        self.corr_length = self.frame_length - self.max_lag
+        # 주기의 배수 지연도 자기상관이 거의 같아 피치가 반으로 잡히지 않도록 긴 지연일수록 조금씩 낮춰 비교
+        self._lag_weight = 1.0 - OCTAVE_COST * np.linspace(0.0, 1.0, self.max_lag - self.min_lag + 1, dtype=np.float32)
+        self.silence_db = silence_db
+        self.voicing_threshold = voicing_threshold
+        self.shout_margin_db = shout_margin_db
+        self.baseline_frames = max(1, int(baseline_seconds / self.frame_seconds))
+
+        # 청크 경계에서 남은 샘플
+        self._carry = np.zeros(self.frame_length, dtype=np.float32)
+        self._carry_len = 0
+        self._allocate(max(1, int(max_chunk_seconds / self.frame_seconds)) + 1)
+
+        # 최근 윈도우의 프레임별 특징 (링 버퍼)
+        self.history = max(8, int(window_seconds / self.frame_seconds))
+        self._ring_rms = np.full(self.history, -100.0, dtype=np.float32)
+        self._ring_pitch = np.zeros(self.history, dtype=np.float32)
+        self._ring_voiced = np.zeros(self.history, dtype=bool)
+        self._ring_sound = np.zeros(self.history, dtype=bool)
+        self._ring_nucleus = np.zeros(self.history, dtype=bool)
+        self._ring_shout = np.zeros(self.history, dtype=bool)
+        self._frames_seen = 0
+
+        # 음절핵 판정에 쓰는 직전 프레임 4개 (앞뒤 2프레임 비교)
+        self._tail_rms = np.full(4, -100.0, dtype=np.float32)
+        self._tail_voiced = np.zeros(4, dtype=bool)
+
+        # 평상시 기준선 (유성음 평균 음량/피치)
+        self.baseline_db: Optional[float] = None
+        self.baseline_pitch: Optional[float] = None
+        self._baseline_count = 0
+        self._baseline_db_sum = 0.0
+        self._baseline_pitch_sum = 0.0
+
+        self.agitation = 0.0
+
+    def _allocate(self, max_frames: int):
+        """
+        청크 하나에 들어갈 수 있는 최대 프레임 수만큼 작업 배열을 할당합니다. (더 큰 청크가 오면 다시 할당)
+        """
+        self._capacity = max_frames
+        lags = self.max_lag - self.min_lag + 1
+        self._frames = np.zeros((max_frames, self.frame_length), dtype=np.float32)
+        self._power = np.zeros(max_frames, dtype=np.float32)
+        self._rms = np.zeros(max_frames + 4, dtype=np.float32)
+        self._energy = np.zeros(max_frames, dtype=np.float32)
+        self._corr = np.zeros((max_frames, lags), dtype=np.float32)
+        self._weighted = np.zeros((max_frames, lags), dtype=np.float32)
+        self._shift_energy = np.zeros((max_frames, lags), dtype=np.float32)
+        self._cumulative = np.zeros((max_frames, self.frame_length + 1), dtype=np.float32)
+        self._lag = np.zeros(max_frames, dtype=np.intp)
+        self._flat_index = np.zeros(max_frames, dtype=np.intp)
+        self._row_offsets = np.arange(max_frames, dtype=np.intp) * lags
+        self._peak = np.zeros(max_frames, dtype=np.float32)
+        self._pitch = np.zeros(max_frames, dtype=np.float32)
+        self._voiced = np.zeros(max_frames + 4, dtype=bool)
+        self._sound = np.zeros(max_frames, dtype=bool)
+        self._mask = np.zeros(max_frames + 4, dtype=bool)
+        self._nucleus = np.zeros(max_frames, dtype=bool)
+
+    def _ring_write(self, ring: np.ndarray, start: int, values: np.ndarray):
+        n = len(values)
+        if n >= len(ring):
+            values = values[-len(ring):]
+            start += n - len(ring)
+            n = len(ring)
+        offset = start % len(ring)
+        first = min(n, len(ring) - offset)
+        ring[offset:offset + first] = values[:first]
+        ring[: n - first] = values[first:]
+
+    def _load_frames(self, samples: np.ndarray) -> int:
+        """
+        이전 청크의 남은 샘플과 이어 붙여 프레임 배열을 채우고 프레임 수를 반환합니다.
+        """
+        total = self._carry_len + len(samples)
+        n_frames = total // self.frame_length
+        if n_frames > self._capacity:
+            self._allocate(n_frames)
+        if n_frames == 0:
+            np.multiply(samples, _INT16_SCALE, out=self._carry[self._carry_len:total])
+            self._carry_len = total
+            return 0
+
+        flat = self._frames[:n_frames].reshape(-1)
+        used = n_frames * self.frame_length - self._carry_len
+        flat[: self._carry_len] = self._carry[: self._carry_len]
+        np.multiply(samples[:used], _INT16_SCALE, out=flat[self._carry_len:])
+        rest = len(samples) - used
+        np.multiply(samples[used:], _INT16_SCALE, out=self._carry[:rest])
+        self._carry_len = rest
+        return n_frames
+
+    def feed(self, pcm: bytes) -> Optional[AcousticFeatures]:
+        """
+        PCM 청크를 넣고 최근 윈도우의 특징을 반환합니다. (아직 완성된 프레임이 없으면 None)
+        """
+        samples = np.frombuffer(pcm, dtype=np.int16, count=len(pcm) // SAMPLE_WIDTH)
+        n = self._load_frames(samples)
+        if n == 0:
+            return None
+        frames = self._frames[:n]
+
+        # 프레임별 RMS 음량 (dBFS)
+        power = self._power[:n]
+        np.einsum("ij,ij->i", frames, frames, out=power)
+        power *= 1.0 / self.frame_length
+        power += 1e-10
+        rms = self._rms[4:4 + n]
+        np.log10(power, out=rms)
+        rms *= 10.0
+
+        # 자기상관 피치: 프레임 앞부분과 min_lag~max_lag만큼 밀린 구간의 내적 (지연별 창은 복사 없는 뷰)
+        head = frames[:, : self.corr_length]
+        shifted = sliding_window_view(frames, self.corr_length, axis=1)[:, self.min_lag: self.max_lag + 1]
+        corr = self._corr[:n]
+        np.einsum("fw,flw->fl", head, shifted, out=corr)
+        energy = self._energy[:n]
+        np.einsum("fw,fw->f", head, head, out=energy)
+
+        # 두 구간의 에너지로 정규화 (음량이 커지는 구간에서 긴 지연이 유리해지지 않도록)
+        cumulative = self._cumulative[:n]
+        np.multiply(frames, frames, out=cumulative[:, 1:])
+        np.cumsum(cumulative[:, 1:], axis=1, out=cumulative[:, 1:])
+        shift_energy = self._shift_energy[:n]
+        np.subtract(
+            cumulative[:, self.min_lag + self.corr_length: self.max_lag + self.corr_length + 1],
+            cumulative[:, self.min_lag: self.max_lag + 1],
+            out=shift_energy,
+        )
+        shift_energy *= energy[:, None]
+        np.sqrt(shift_energy, out=shift_energy)
+        shift_energy += 1e-9
+        corr /= shift_energy
+
+        lag = self._lag[:n]
+        weighted = self._weighted[:n]
+        np.multiply(corr, self._lag_weight, out=weighted)
+        np.argmax(weighted, axis=1, out=lag)
+        flat_index = self._flat_index[:n]
+        np.add(self._row_offsets[:n], lag, out=flat_index)
+        peak = self._peak[:n]
+        np.take(self._corr.reshape(-1), flat_index, out=peak)  # 주기성 (0~1)
+
+        pitch = self._pitch[:n]
+        np.add(lag, self.min_lag, out=pitch, casting="unsafe")
+        np.divide(self.sample_rate, pitch, out=pitch)
+
+        sound = self._sound[:n]
+        np.greater(rms, self.silence_db, out=sound)
+        voiced = self._voiced[4:4 + n]
+        np.greater(peak, self.voicing_threshold, out=voiced)
+        voiced &= sound
+        pitch *= voiced
+
+        # 음절핵: 앞뒤 프레임보다 크고 2프레임 전후보다 3dB 이상 큰 유성음 프레임 (2프레임 늦게 판정)
+        self._rms[:4] = self._tail_rms
+        self._voiced[:4] = self._tail_voiced
+        ext_rms = self._rms[: n + 4]
+        nucleus = self._nucleus[:n]
+        mask = self._mask[:n]
+        np.greater_equal(ext_rms[2:n + 2], ext_rms[1:n + 1], out=nucleus)
+        np.greater(ext_rms[2:n + 2], ext_rms[3:n + 3], out=mask)
+        nucleus &= mask
+        np.minimum(ext_rms[0:n], ext_rms[4:n + 4], out=self._peak[:n])
+        np.subtract(ext_rms[2:n + 2], self._peak[:n], out=self._peak[:n])
+        np.greater_equal(self._peak[:n], 3.0, out=mask)
+        nucleus &= mask
+        nucleus &= self._voiced[2:n + 2]
+        self._tail_rms[:] = ext_rms[n:n + 4]
+        self._tail_voiced[:] = self._voiced[n:n + 4]
+
+        start = self._frames_seen
+        self._ring_write(self._ring_rms, start, rms)
+        self._ring_write(self._ring_pitch, start, pitch)
+        self._ring_write(self._ring_voiced, start, voiced)
+        self._ring_write(self._ring_sound, start, sound)
+        self._ring_write(self._ring_nucleus, start - 2, nucleus)
+        self._frames_seen += n
+
+        return self._summarize(n_voiced=int(np.count_nonzero(voiced)), rms=rms, pitch=pitch, voiced=voiced)
+
+    def _update_baseline(self, rms: np.ndarray, pitch: np.ndarray, voiced: np.ndarray, n_voiced: int, calm: bool):
+        if not n_voiced:
+            return
+        chunk_db = float(np.dot(rms, voiced)) / n_voiced
+        chunk_pitch = float(pitch.sum()) / n_voiced
+        if self._baseline_count < self.baseline_frames:
+            # 통화 초반 유성음으로 기준선 설정
+            self._baseline_count += n_voiced
+            self._baseline_db_sum += chunk_db * n_voiced
+            self._baseline_pitch_sum += chunk_pitch * n_voiced
+            if self._baseline_count >= self.baseline_frames:
+                self.baseline_db = self._baseline_db_sum / self._baseline_count
+                self.baseline_pitch = self._baseline_pitch_sum / self._baseline_count
+        elif calm:
+            # 흥분하지 않은 구간으로만 천천히 따라감
+            self.baseline_db += 0.02 * (chunk_db - self.baseline_db)
+            self.baseline_pitch += 0.02 * (chunk_pitch - self.baseline_pitch)
+
+    def _summarize(self, n_voiced: int, rms: np.ndarray, pitch: np.ndarray, voiced: np.ndarray) -> AcousticFeatures:
+        filled = min(self._frames_seen, self.history)
+        ring_voiced = self._ring_voiced[:filled]
+        voiced_count = int(np.count_nonzero(ring_voiced))
+        sound_count = int(np.count_nonzero(self._ring_sound[:filled]))
+
+        if voiced_count:
+            speech_db = float(np.dot(self._ring_rms[:filled], ring_voiced)) / voiced_count
+            speech_pitch = float(self._ring_pitch[:filled].sum()) / voiced_count
+            speaking_rate = int(np.count_nonzero(self._ring_nucleus[:filled])) / (voiced_count * self.frame_seconds)
+        else:
+            speech_db, speech_pitch, speaking_rate = -100.0, 0.0, 0.0
+        overlap_ratio = (sound_count - voiced_count) / sound_count if sound_count else 0.0
+
+        shout_ratio = 0.0
+        loudness = pitch_rise = 0.0
+        if self.baseline_db is not None and voiced_count:
+            # 고함: 기준선보다 shout_margin_db 이상 크고 피치가 25% 이상 높은 유성음
+            shout = self._ring_shout[:filled]
+            np.greater(self._ring_rms[:filled], self.baseline_db + self.shout_margin_db, out=shout)
+            shout &= ring_voiced
+            np.logical_and(shout, self._ring_pitch[:filled] > self.baseline_pitch * 1.25, out=shout)
+            shout_ratio = int(np.count_nonzero(shout)) / voiced_count
+            loudness = min(1.0, max(0.0, (speech_db - self.baseline_db) / 12.0))
+            pitch_rise = min(1.0, max(0.0, (speech_pitch / self.baseline_pitch - 1.0) / 0.4))
+        rate = min(1.0, max(0.0, (speaking_rate - 4.0) / 3.0))
+
+        raw = (
+            0.35 * loudness
+            + 0.25 * pitch_rise
+            + 0.15 * rate
+            + 0.15 * min(1.0, shout_ratio * 3.0)
+            + 0.10 * overlap_ratio
+        )
+        if n_voiced:
+            self.agitation += 0.3 * (raw - self.agitation)
+        else:
+            # 말이 없으면 서서히 가라앉음
+            self.agitation *= 0.9
+        self._update_baseline(rms, pitch, voiced, n_voiced, calm=raw < 0.4)
+
+        return AcousticFeatures(
+            rms_db=speech_db,
+            pitch_hz=speech_pitch,
+            speaking_rate=speaking_rate,
+            shout_ratio=shout_ratio,
+            overlap_ratio=overlap_ratio,
+            agitation=self.agitation,
+        )
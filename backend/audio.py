@@ -0,0 +1,227 @@
+"""
+실시간 음성 청크 처리를 위한 오디오 유틸리티
+"""
+
+import io
+import struct
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+
+# 실시간 스트림 기본 포맷 (16kHz, 16bit, mono)
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+CHANNELS = 1
+
+WAV_HEADER_SIZE = 44
+
+
+def build_wav_header(
+    data_size: int,
+    sample_rate: int = SAMPLE_RATE,
+    channels: int = CHANNELS,
+    sample_width: int = SAMPLE_WIDTH,
+) -> bytes:
+    """
+    PCM 데이터 크기에 맞는 44바이트 RIFF/WAVE 헤더를 생성합니다.
+    """
+    byte_rate = sample_rate * channels * sample_width
+    block_align = channels * sample_width
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        36 + data_size,
+        b"WAVE",
+        b"fmt ",
+        16,  # fmt 청크 크기
+        1,  # PCM
+        channels,
+        sample_rate,
+        byte_rate,
+        block_align,
+        sample_width * 8,
+        b"data",
+        data_size,
+    )
+
+
+class WavEncoder:
+    """
+    PCM 청크를 메모리 상의 WAV 파일로 감싸는 인코더
+
+    세션마다 하나의 버퍼를 재사용하므로 청크마다 임시 파일을 만들고
+    지울 필요가 없습니다. 반환된 버퍼는 다음 encode 호출 전까지만 유효합니다.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = SAMPLE_RATE,
+        channels: int = CHANNELS,
+        sample_width: int = SAMPLE_WIDTH,
+        filename: str = "chunk.wav",
+    ):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.filename = filename
+        self._buffer = io.BytesIO()
+
+    def encode(self, pcm) -> io.BytesIO:
+        """
+        pcm은 bytes 또는 int16 NumPy 배열 등 버퍼 프로토콜 객체입니다.
+        """
+        payload = memoryview(pcm).cast("B")
+        buffer = self._buffer
+        buffer.seek(0)
+        buffer.write(
+            build_wav_header(len(payload), self.sample_rate, self.channels, self.sample_width)
+        )
+        buffer.write(payload)
+        buffer.truncate()
+        buffer.seek(0)
+        return buffer
+
+    def as_upload(self, pcm) -> tuple:
+        """
+        전사 클라이언트에 바로 전달할 수 있는 (파일명, 파일, MIME) 튜플을 반환합니다.
+        """
+        return (self.filename, self.encode(pcm), "audio/wav")
+
+
+class VADResult(NamedTuple):
+    is_speech: bool
+    speech_ratio: float  # 음성으로 판정된 프레임 비율
+    rms_db: float  # 청크 전체 RMS (dBFS)
+
+
+class VoiceActivityDetector:
+    """
+    에너지와 영교차율(ZCR) 기반의 음성 구간 검출기
+
+    int16 PCM을 (프레임 수, 프레임 길이) 배열로 나눠 한 번에 계산하며,
+    무음 프레임의 에너지로 배경 잡음 수준을 세션별로 추적합니다.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = SAMPLE_RATE,
+        frame_ms: int = 30,
+        energy_threshold_db: float = -45.0,
+        noise_margin_db: float = 10.0,
+        min_zcr: float = 0.01,
+        max_zcr: float = 0.35,
+        min_speech_ratio: float = 0.1,
+    ):
+        self.frame_length = max(1, sample_rate * frame_ms // 1000)
+        self.energy_threshold_db = energy_threshold_db
+        self.noise_margin_db = noise_margin_db
+        self.min_zcr = min_zcr
+        self.max_zcr = max_zcr
+        self.min_speech_ratio = min_speech_ratio
+        self.noise_floor_db = None
+
+    def analyze(self, pcm: bytes) -> VADResult:
+        samples = np.frombuffer(pcm, dtype=np.int16, count=len(pcm) // SAMPLE_WIDTH)
+        n_frames = len(samples) // self.frame_length
+        if n_frames == 0:
+            return VADResult(False, 0.0, float("-inf"))
+
+        frames = samples[: n_frames * self.frame_length].reshape(n_frames, self.frame_length)
+        frames = frames.astype(np.float32) / 32768.0
+
+        # 프레임별 에너지(dBFS)와 영교차율
+        power = np.mean(frames * frames, axis=1)
+        energy_db = 10.0 * np.log10(power + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (self.frame_length - 1 or 1)
+
+        threshold_db = self.energy_threshold_db
+        if self.noise_floor_db is not None:
+            threshold_db = max(threshold_db, self.noise_floor_db + self.noise_margin_db)
+
+        speech = (energy_db > threshold_db) & (zcr >= self.min_zcr) & (zcr <= self.max_zcr)
+        speech_ratio = float(np.count_nonzero(speech)) / n_frames
+
+        # 임계값 아래 프레임으로 배경 잡음 수준 갱신 (지수 이동 평균)
+        quiet = energy_db <= threshold_db
+        if quiet.any():
+            quiet_db = float(np.median(energy_db[quiet]))
+            if self.noise_floor_db is None:
+                self.noise_floor_db = quiet_db
+            else:
+                self.noise_floor_db = 0.9 * self.noise_floor_db + 0.1 * quiet_db
+
+        rms_db = float(10.0 * np.log10(np.mean(power) + 1e-10))
+        return VADResult(speech_ratio >= self.min_speech_ratio, speech_ratio, rms_db)
+
+
+def frame_energies(samples: np.ndarray, frame_length: int, block_frames: int = 8192) -> np.ndarray:
+    """
+    프레임별 평균 에너지를 계산합니다.
+
+    긴 녹음에서도 float 사본이 커지지 않도록 block_frames 단위로 나눠 계산합니다.
+    """
+    n_frames = len(samples) // frame_length
+    frames = samples[: n_frames * frame_length].reshape(n_frames, frame_length)
+    energies = np.empty(n_frames, dtype=np.float32)
+    for start in range(0, n_frames, block_frames):
+        block = frames[start:start + block_frames].astype(np.float32)
+        energies[start:start + block_frames] = np.mean(block * block, axis=1)
+    return energies
+
+
+def find_silence_splits(
+    samples: np.ndarray,
+    sample_rate: int,
+    target_seconds: float = 60.0,
+    search_seconds: float = 10.0,
+    frame_ms: int = 30,
+    smooth_ms: int = 300,
+) -> List[Tuple[int, int]]:
+    """
+    녹음을 target_seconds 전후의 가장 조용한 지점에서 나눈 (시작, 끝) 샘플 구간 목록을 반환합니다.
+    """
+    frame_length = max(1, sample_rate * frame_ms // 1000)
+    return split_at_silence(
+        frame_energies(samples, frame_length), len(samples), frame_length,
+        target_seconds, search_seconds, frame_ms, smooth_ms,
+    )
+
+
+def split_at_silence(
+    energies: np.ndarray,
+    n_samples: int,
+    frame_length: int,
+    target_seconds: float = 60.0,
+    search_seconds: float = 10.0,
+    frame_ms: int = 30,
+    smooth_ms: int = 300,
+) -> List[Tuple[int, int]]:
+    """
+    프레임별 에너지(frame_energies)로 find_silence_splits와 같은 구간을 계산합니다.
+
+    녹음 전체를 메모리에 올리지 않고 블록 단위로 에너지만 모은 경우에 사용합니다.
+    """
+    target_frames = max(1, int(target_seconds * 1000 / frame_ms))
+    search_frames = max(1, int(search_seconds * 1000 / frame_ms))
+
+    n_frames = len(energies)
+    if n_frames <= target_frames + search_frames:
+        return [(0, n_samples)]
+
+    # 짧은 숨소리 대신 지속되는 무음을 찾도록 에너지를 이동 평균으로 평탄화
+    smooth_frames = max(1, smooth_ms // frame_ms)
+    kernel = np.ones(smooth_frames, dtype=np.float32) / smooth_frames
+    smoothed = np.convolve(energies, kernel, mode="same")
+
+    cuts = [0]
+    position = target_frames
+    while position < n_frames - search_frames:
+        low = max(cuts[-1] + 1, position - search_frames)
+        high = min(n_frames, position + search_frames)
+        cut = low + int(np.argmin(smoothed[low:high]))
+        cuts.append(cut)
+        position = cut + target_frames
+
+    boundaries = [cut * frame_length for cut in cuts] + [n_samples]
+    return list(zip(boundaries[:-1], boundaries[1:]))
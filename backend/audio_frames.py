@@ -0,0 +1,264 @@
+"""
+실시간 음성 웹소켓(/ws/audio-stream)의 바이너리 프레임 형식
+
+프레임 = 16바이트 헤더 + 페이로드 (리틀 엔디언)
+
+    오프셋  크기  필드
+    0       2     매직 b"AF"
+    2       1     버전 (1)
+    3       1     코덱 (0: PCM16, 1: G.711 µ-law, 2: G.711 A-law)
+    4       4     시퀀스 번호 (uint32, 프레임마다 1씩 증가)
+    8       4     타임스탬프 (uint32, 스트림 시작 기준 밀리초)
+    12      2     샘플레이트 (Hz)
+    14      1     채널 수
+    15      1     플래그 (예약, 0)
+
+µ-law/A-law는 샘플당 1바이트라 같은 8kHz 음성이면 16kHz PCM16보다 4배 작습니다.
+서버는 페이로드를 디코딩하고 mono로 합친 뒤 16kHz로 리샘플링합니다.
+프레임 형식은 연결할 때 쿼리 파라미터(framing=v1)로 정합니다. 지정하지 않은 연결의 메시지는
+내용과 관계없이 이전 방식(헤더 없는 16kHz/16bit/mono PCM)으로 처리합니다.
+(첫 샘플이 우연히 매직과 같은 PCM을 프레임으로 잘못 해석하지 않도록 내용으로 추측하지 않음)
+"""
+
+import struct
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from audio import SAMPLE_RATE
+from metrics import AUDIO_BYTES, AUDIO_FRAMES
+
+# /ws/audio-stream?framing=v1
+FRAMING_PARAM = "framing"
+FRAMING_V1 = "v1"
+
+FRAME_MAGIC = b"AF"
+FRAME_VERSION = 1
+FRAME_HEADER = struct.Struct("<2sBBIIHBB")
+
+CODEC_PCM16 = 0
+CODEC_MULAW = 1
+CODEC_ALAW = 2
+CODEC_NAMES = {CODEC_PCM16: "pcm16", CODEC_MULAW: "mulaw", CODEC_ALAW: "alaw"}
+
+SUPPORTED_SAMPLE_RATES = (8000, 11025, 16000, 22050, 24000, 32000, 44100, 48000)
+MAX_CHANNELS = 2
+
+_SEQ_MASK = 0xFFFFFFFF
+
+
+class FrameError(ValueError):
+    """
+    해석할 수 없는 프레임 (지원하지 않는 버전/코덱/포맷, 잘린 페이로드)
+    """
+
+
+class FrameHeader(NamedTuple):
+    seq: int
+    timestamp_ms: int
+    sample_rate: int
+    channels: int
+    codec: int
+
+
+def _mulaw_table() -> np.ndarray:
+    code = ~np.arange(256, dtype=np.int32) & 0xFF
+    exponent = (code >> 4) & 0x07
+    magnitude = ((((code & 0x0F) << 3) + 0x84) << exponent) - 0x84
+    return np.where(code & 0x80, -magnitude, magnitude).astype(np.int16)
+
+
+def _alaw_table() -> np.ndarray:
+    code = np.arange(256, dtype=np.int32) ^ 0x55
+    exponent = (code >> 4) & 0x07
+    mantissa = code & 0x0F
+    magnitude = np.where(
+        exponent == 0,
+        (mantissa << 4) + 8,
+        ((mantissa << 4) + 0x108) << np.maximum(exponent - 1, 0),
+    )
+    return np.where(code & 0x80, magnitude, -magnitude).astype(np.int16)
+
+
+# 코드 -> PCM16 조회 테이블 (디코딩은 테이블 인덱싱 한 번)
+MULAW_TABLE = _mulaw_table()
+ALAW_TABLE = _alaw_table()
+
+
+def mulaw_encode(samples: np.ndarray) -> np.ndarray:
+    """
+    int16 샘플을 G.711 µ-law 코드로 인코딩합니다. (부하 테스트/클라이언트 참고용)
+    """
+    x = samples.astype(np.int32)
+    sign = np.where(x < 0, 0x80, 0)
+    magnitude = np.minimum(np.abs(x), 32635) + 0x84
+    exponent = np.clip(np.floor(np.log2(magnitude)).astype(np.int32) - 7, 0, 7)
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8)
+
+
+def encode_frame(
+    seq: int,
+    timestamp_ms: int,
+    payload: bytes,
+    sample_rate: int = SAMPLE_RATE,
+    channels: int = 1,
+    codec: int = CODEC_PCM16,
+) -> bytes:
+    header = FRAME_HEADER.pack(
+        FRAME_MAGIC, FRAME_VERSION, codec, seq & _SEQ_MASK, timestamp_ms & _SEQ_MASK, sample_rate, channels, 0
+    )
+    return header + payload
+
+
+def parse_frame(data: bytes) -> Tuple[FrameHeader, memoryview]:
+    """
+    프레임 헤더를 해석합니다. (framing=v1로 연결한 경우에만 사용)
+    """
+    if len(data) < FRAME_HEADER.size:
+        raise FrameError(f"프레임이 헤더보다 짧습니다: {len(data)}바이트")
+    if data[:2] != FRAME_MAGIC:
+        raise FrameError("프레임 매직이 없습니다")
+    magic, version, codec, seq, timestamp_ms, sample_rate, channels, _ = FRAME_HEADER.unpack_from(data)
+    if version != FRAME_VERSION:
+        raise FrameError(f"지원하지 않는 프레임 버전입니다: {version}")
+    if codec not in CODEC_NAMES:
+        raise FrameError(f"지원하지 않는 코덱입니다: {codec}")
+    if sample_rate not in SUPPORTED_SAMPLE_RATES:
+        raise FrameError(f"지원하지 않는 샘플레이트입니다: {sample_rate}")
+    if not 1 <= channels <= MAX_CHANNELS:
+        raise FrameError(f"지원하지 않는 채널 수입니다: {channels}")
+    header = FrameHeader(seq, timestamp_ms, sample_rate, channels, codec)
+    return header, memoryview(data)[FRAME_HEADER.size:]
+
+
+def resample(samples: np.ndarray, source_rate: int, target_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    float32 샘플을 target_rate로 리샘플링합니다.
+
+    정수배 다운샘플링(32/48kHz -> 16kHz)은 구간 평균 후 솎아내고,
+    그 외에는 (다운샘플링이면 이동 평균으로 저역 통과 후) 선형 보간합니다.
+    """
+    if source_rate == target_rate or not len(samples):
+        return samples
+    if source_rate > target_rate and source_rate % target_rate == 0:
+        factor = source_rate // target_rate
+        usable = len(samples) - len(samples) % factor
+        return samples[:usable].reshape(-1, factor).mean(axis=1, dtype=np.float32)
+
+    ratio = target_rate / source_rate
+    if ratio < 1:
+        width = int(np.ceil(1 / ratio))
+        samples = np.convolve(samples, np.full(width, 1.0 / width, dtype=np.float32), mode="same")
+    positions = np.arange(int(len(samples) * ratio), dtype=np.float64) / ratio
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def decode_payload(header: FrameHeader, payload) -> np.ndarray:
+    """
+    페이로드를 16kHz mono int16 샘플로 변환합니다.
+    """
+    if header.codec == CODEC_PCM16:
+        if len(payload) % (2 * header.channels):
+            raise FrameError("PCM16 페이로드 길이가 샘플 단위와 맞지 않습니다.")
+        samples = np.frombuffer(payload, dtype="<i2")
+    else:
+        if len(payload) % header.channels:
+            raise FrameError("페이로드 길이가 채널 수와 맞지 않습니다.")
+        table = MULAW_TABLE if header.codec == CODEC_MULAW else ALAW_TABLE
+        samples = table[np.frombuffer(payload, dtype=np.uint8)]
+
+    if header.channels == 1 and header.sample_rate == SAMPLE_RATE:
+        return samples.astype(np.int16, copy=False)
+
+    pcm = samples.astype(np.float32)
+    if header.channels > 1:
+        pcm = pcm.reshape(-1, header.channels).mean(axis=1)
+    pcm = resample(pcm, header.sample_rate)
+    return np.clip(np.rint(pcm), -32768, 32767).astype(np.int16)
+
+
+class FrameReassembler:
+    """
+    시퀀스 번호로 프레임 순서를 맞추고 유실 구간을 감지합니다.
+
+    앞선 프레임이 빠지면 최대 reorder_window개까지 뒤 프레임을 보관하며 기다리고,
+    그래도 오지 않으면 유실로 보고 건너뜁니다. 유실 구간은 타임스탬프 차이만큼
+    (최대 max_gap_fill초) 무음으로 채워 발화 사이 간격을 유지합니다.
+    이미 지나간 시퀀스의 프레임(중복/지연)은 버립니다.
+    """
+
+    def __init__(self, reorder_window: int = 4, max_gap_fill: float = 1.0, sample_rate: int = SAMPLE_RATE):
+        self.reorder_window = reorder_window
+        self.max_gap_fill_samples = int(max_gap_fill * sample_rate)
+        self.sample_rate = sample_rate
+        self._expected: Optional[int] = None
+        self._pending: Dict[int, Tuple[FrameHeader, np.ndarray]] = {}
+        self._last_end_ms: Optional[float] = None
+
+    def push(self, header: FrameHeader, samples: np.ndarray) -> List[np.ndarray]:
+        """
+        프레임을 넣고 순서대로 내보낼 수 있게 된 샘플 배열 목록을 반환합니다.
+        """
+        if self._expected is None:
+            self._expected = header.seq
+        ahead = (header.seq - self._expected) & _SEQ_MASK
+        if ahead >= 1 << 31 or header.seq in self._pending:
+            AUDIO_FRAMES.inc(result="late")
+            return []
+        AUDIO_FRAMES.inc(result="in_order" if ahead == 0 else "reordered")
+        self._pending[header.seq] = (header, samples)
+        return self._drain()
+
+    def _emit(self, header: FrameHeader, samples: np.ndarray, output: List[np.ndarray]):
+        self._pending.pop(header.seq)
+        if len(samples):
+            output.append(samples)
+        self._last_end_ms = header.timestamp_ms + len(samples) * 1000 / self.sample_rate
+        self._expected = (header.seq + 1) & _SEQ_MASK
+
+    def _drain(self) -> List[np.ndarray]:
+        output: List[np.ndarray] = []
+        while self._pending:
+            if self._expected in self._pending:
+                self._emit(*self._pending[self._expected], output)
+                continue
+            if len(self._pending) <= self.reorder_window:
+                break
+            # 기다리던 프레임은 유실: 가장 가까운 다음 프레임으로 건너뜀
+            next_seq = min(self._pending, key=lambda seq: (seq - self._expected) & _SEQ_MASK)
+            AUDIO_FRAMES.inc((next_seq - self._expected) & _SEQ_MASK, result="lost")
+            header, samples = self._pending[next_seq]
+            if self._last_end_ms is not None:
+                gap = int((header.timestamp_ms - self._last_end_ms) * self.sample_rate / 1000)
+                gap = min(gap, self.max_gap_fill_samples)
+                if gap > 0:
+                    output.append(np.zeros(gap, dtype=np.int16))
+            self._emit(header, samples, output)
+        return output
+
+
+class AudioStreamDecoder:
+    """
+    웹소켓 메시지를 16kHz mono PCM16 바이트로 변환합니다. (세션마다 하나)
+
+    framed가 False면 메시지를 헤더 없는 PCM으로 그대로 사용합니다.
+    """
+
+    def __init__(self, framed: bool = False, reorder_window: int = 4, max_gap_fill: float = 1.0):
+        self.framed = framed
+        self.reassembler = FrameReassembler(reorder_window, max_gap_fill)
+
+    def feed(self, data: bytes) -> bytes:
+        """
+        받은 메시지를 넣고 순서대로 이어 붙일 수 있게 된 PCM을 반환합니다. (없으면 빈 바이트)
+        """
+        if not self.framed:
+            AUDIO_BYTES.inc(len(data), codec="raw")
+            return data
+        header, payload = parse_frame(data)
+        AUDIO_BYTES.inc(len(data), codec=CODEC_NAMES[header.codec])
+        ready = self.reassembler.push(header, decode_payload(header, payload))
+        if not ready:
+            return b""
+        return ready[0].tobytes() if len(ready) == 1 else np.concatenate(ready).tobytes()
@@ -0,0 +1,422 @@
+"""
+녹음 파일 일괄 사후 분석 (야간 QA 배치)
+
+디렉터리의 통화 녹음(PCM WAV)을 하나씩 읽어 전사, 위험도 분석, 요약과 음향 감정 통계를 계산하고
+열 기반 파일(Parquet/Arrow, pyarrow가 없으면 JSON Lines)로 저장합니다.
+
+- CPU 작업(WAV 디코딩, 16kHz 변환, 무음 지점 분할, VAD, 음향 특징)은 프로세스 풀에서 실행하므로
+  코어 수만큼 늘어납니다. 모델 호출은 한 이벤트 루프에서 비동기로 동시에 보내고,
+  모델 호출 스케줄러의 배치 우선순위와 분당 한도를 따릅니다.
+- 파일 목록을 미리 모으지 않고 디렉터리를 훑으면서 처리하며, 동시에 처리 중인 녹음 수는
+  (--workers + --concurrency)개로 제한되어 메모리 사용량이 녹음 수와 무관합니다.
+- 결과는 --batch-size개씩 part 파일로 쓰고, 파일을 쓴 뒤에 그 녹음들을 체크포인트에 기록합니다.
+  중단 후 다시 실행하면 체크포인트에 있는 녹음(경로, 크기, 수정 시각이 같은 것)은 건너뛰고,
+  체크포인트에 없는(쓰다 중단된) part 파일은 지웁니다. 실패한 녹음은 기록하지 않으므로 다음 실행에서 다시 처리합니다.
+
+사용 예:
+    python batch_analytics.py /data/recordings --output /data/analytics/2026-10-18
+    python batch_analytics.py /data/recordings --output out --workers 16 --concurrency 32 --format arrow
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, NamedTuple, Set, Tuple
+
+import numpy as np
+
+from acoustic import AcousticAnalyzer
+from audio import SAMPLE_RATE, VoiceActivityDetector, WavEncoder, find_silence_splits
+from audio_frames import resample
+from config import settings
+from inference import inference
+from logging_setup import setup_logging
+from long_audio import open_wav
+from model_scheduler import PRIORITY_BATCH
+from risk_analysis import analyze_risk_text, create_prescreener
+from summarizer import summarizer
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:  # 선택 의존성 (Parquet/Arrow 출력)
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+RECORDING_EXTENSIONS = (".wav",)
+CHECKPOINT_FILE = "_checkpoint.jsonl"
+# 흥분 상태로 보는 흥분도 기준
+AGITATED_THRESHOLD = 0.5
+
+# 출력 열 (이름, 타입)
+COLUMNS: List[Tuple[str, str]] = [
+    ("path", "string"),
+    ("duration_seconds", "float64"),
+    ("source_sample_rate", "int32"),
+    ("speech_segments", "int32"),
+    ("speech_ratio", "float64"),
+    ("transcript", "string"),
+    ("summary", "string"),
+    ("risk_level", "int32"),
+    ("risk_stage", "string"),
+    ("emotion", "string"),
+    ("risk_analysis", "string"),
+    ("risk_source", "string"),
+    ("agitation_mean", "float64"),
+    ("agitation_max", "float64"),
+    ("agitated_ratio", "float64"),
+    ("shout_ratio", "float64"),
+    ("pitch_mean_hz", "float64"),
+    ("speaking_rate", "float64"),
+    ("processed_at", "float64"),
+]
+FORMAT_EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow", "jsonl": ".jsonl"}
+
+
+class PreparedRecording(NamedTuple):
+    """
+    프로세스 풀 작업 결과 (프로세스 사이로 전달되므로 바이트/기본 타입만 사용)
+    """
+    path: str
+    duration: float
+    source_sample_rate: int
+    segments: List[bytes]  # 음성이 있는 구간의 16kHz WAV
+    features: Dict[str, float]
+
+
+def iter_recordings(root: str) -> Iterator[str]:
+    """
+    root 아래의 녹음 파일 경로를 이름 순서대로 하나씩 반환합니다. (하위 디렉터리 포함)
+    """
+    with os.scandir(root) as entries:
+        entries = sorted(entries, key=lambda entry: entry.name)
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from iter_recordings(entry.path)
+        elif entry.name.lower().endswith(RECORDING_EXTENSIONS):
+            yield entry.path
+
+
+def prepare_recording(path: str, segment_seconds: float, chunk_seconds: float = 1.0) -> PreparedRecording:
+    """
+    녹음 하나의 CPU 작업 (프로세스 풀에서 실행)
+
+    16kHz로 변환한 뒤 실시간 경로와 같은 크기의 청크로 음향 특징을 계산하고,
+    무음 지점에서 나눈 구간 중 VAD가 음성으로 판정한 구간만 전사용 WAV로 만듭니다.
+    """
+    with open(path, "rb") as f:
+        audio = open_wav(f)
+        if audio is None:
+            raise ValueError("PCM WAV 파일이 아닙니다.")
+        # 녹음 전체의 음향 특징을 계산하므로 한 번에 읽음 (프로세스 풀 작업자 안에서만 유지)
+        samples = audio.read()
+    if audio.sample_rate != SAMPLE_RATE:
+        # 실시간 프레임과 같은 리샘플러 사용 (44.1/48kHz 녹음은 저역 통과 후 변환해 앨리어싱 방지)
+        pcm = resample(samples.astype(np.float32), audio.sample_rate)
+        samples = np.clip(np.rint(pcm), -32768, 32767).astype(np.int16)
+
+    # 청크별 흥분도와, 발화가 있는 청크의 윈도우 특징(고함 비율, 피치, 말 속도)
+    analyzer = AcousticAnalyzer()
+    chunk = int(SAMPLE_RATE * chunk_seconds)
+    agitation: List[float] = []
+    speech_windows: List[Tuple[float, float, float]] = []
+    for start in range(0, len(samples), chunk):
+        result = analyzer.feed(samples[start:start + chunk].tobytes())
+        if result is None:
+            continue
+        agitation.append(result.agitation)
+        if result.pitch_hz > 0:
+            speech_windows.append((result.shout_ratio, result.pitch_hz, result.speaking_rate))
+
+    vad = VoiceActivityDetector(
+        energy_threshold_db=settings.VAD_ENERGY_THRESHOLD_DB,
+        min_speech_ratio=settings.VAD_MIN_SPEECH_RATIO
+    )
+    encoder = WavEncoder(filename="segment.wav")
+    segments: List[bytes] = []
+    speech_samples = 0
+    for start, end in find_silence_splits(samples, SAMPLE_RATE, segment_seconds):
+        vad_result = vad.analyze(samples[start:end].tobytes())
+        if not vad_result.is_speech:
+            continue
+        speech_samples += end - start
+        segments.append(encoder.encode(samples[start:end]).getvalue())
+
+    agitation_values = np.asarray(agitation, dtype=np.float64)
+    windows = np.asarray(speech_windows, dtype=np.float64).reshape(-1, 3)
+    shout_ratio, pitch_mean, speaking_rate = windows.mean(axis=0) if len(windows) else (0.0, 0.0, 0.0)
+    return PreparedRecording(
+        path=path,
+        duration=len(samples) / SAMPLE_RATE,
+        source_sample_rate=audio.sample_rate,
+        segments=segments,
+        features={
+            "speech_ratio": speech_samples / len(samples) if len(samples) else 0.0,
+            "agitation_mean": float(agitation_values.mean()) if len(agitation_values) else 0.0,
+            "agitation_max": float(agitation_values.max()) if len(agitation_values) else 0.0,
+            "agitated_ratio": (
+                float(np.mean(agitation_values >= AGITATED_THRESHOLD)) if len(agitation_values) else 0.0
+            ),
+            "shout_ratio": float(shout_ratio),
+            "pitch_mean_hz": float(pitch_mean),
+            "speaking_rate": float(speaking_rate),
+        },
+    )
+
+
+class Checkpoint:
+    """
+    처리를 마친 녹음과 그 결과가 담긴 part 파일 목록 (JSON Lines, 한 줄에 part 하나)
+    """
+
+    def __init__(self, output_dir: str, root: str):
+        self.path = os.path.join(output_dir, CHECKPOINT_FILE)
+        self.root = root
+        self.done: Dict[str, Tuple[int, int]] = {}
+        self.parts: Set[str] = set()
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 기록 중 중단된 마지막 줄
+                        continue
+                    self.parts.add(entry["part"])
+                    for item in entry["recordings"]:
+                        self.done[item["path"]] = (item["size"], item["mtime_ns"])
+
+    def key(self, path: str) -> str:
+        return os.path.relpath(path, self.root)
+
+    @staticmethod
+    def stat(path: str) -> Tuple[int, int]:
+        info = os.stat(path)
+        return info.st_size, info.st_mtime_ns
+
+    def is_done(self, path: str) -> bool:
+        return self.done.get(self.key(path)) == self.stat(path)
+
+    def commit(self, part: str, paths: List[str]):
+        recordings = []
+        for path in paths:
+            size, mtime_ns = self.stat(path)
+            recordings.append({"path": self.key(path), "size": size, "mtime_ns": mtime_ns})
+            self.done[self.key(path)] = (size, mtime_ns)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"part": part, "recordings": recordings}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.parts.add(part)
+
+
+class ColumnarWriter:
+    """
+    결과 행을 batch_size개씩 모아 열 단위 part 파일로 씁니다. (임시 파일에 쓴 뒤 이름 변경)
+    """
+
+    def __init__(self, output_dir: str, fmt: str, batch_size: int, checkpoint: Checkpoint):
+        self.output_dir = output_dir
+        self.fmt = fmt
+        self.extension = FORMAT_EXTENSIONS[fmt]
+        self.batch_size = max(1, batch_size)
+        self.checkpoint = checkpoint
+        self.columns: Dict[str, list] = {name: [] for name, _ in COLUMNS}
+        self.paths: List[str] = []
+        self.rows_written = 0
+        self._lock = asyncio.Lock()
+        self._remove_orphans()
+        self._next_part = 1 + max(
+            (int(name[5:10]) for name in checkpoint.parts if name[5:10].isdigit()), default=-1
+        )
+        self._schema = (
+            pa.schema([(name, getattr(pa, kind)()) for name, kind in COLUMNS]) if pa is not None else None
+        )
+
+    def _remove_orphans(self):
+        # 쓰고 나서 체크포인트에 기록하기 전에 중단된 part는 다시 처리하므로 지움
+        for name in os.listdir(self.output_dir):
+            if name.startswith("part-") and name not in self.checkpoint.parts:
+                logger.warning(f"체크포인트에 없는 결과 파일 삭제: {name}")
+                os.remove(os.path.join(self.output_dir, name))
+
+    async def add(self, path: str, row: Dict):
+        async with self._lock:
+            for name, _ in COLUMNS:
+                self.columns[name].append(row.get(name))
+            self.paths.append(path)
+            if len(self.paths) >= self.batch_size:
+                await self._flush()
+
+    async def close(self):
+        async with self._lock:
+            if self.paths:
+                await self._flush()
+
+    async def _flush(self):
+        columns, paths = self.columns, self.paths
+        self.columns = {name: [] for name, _ in COLUMNS}
+        self.paths = []
+        part = f"part-{self._next_part:05d}{self.extension}"
+        self._next_part += 1
+        await asyncio.to_thread(self._write_part, part, columns)
+        self.checkpoint.commit(part, paths)
+        self.rows_written += len(paths)
+        logger.info(f"결과 파일 저장: {part} ({len(paths)}건)")
+
+    def _write_part(self, part: str, columns: Dict[str, list]):
+        target = os.path.join(self.output_dir, part)
+        temp = target + ".tmp"
+        if self.fmt == "jsonl":
+            with open(temp, "w", encoding="utf-8") as f:
+                for values in zip(*columns.values()):
+                    f.write(json.dumps(dict(zip(columns, values)), ensure_ascii=False) + "\n")
+        else:
+            table = pa.table(columns, schema=self._schema)
+            if self.fmt == "parquet":
+                pq.write_table(table, temp, compression="zstd")
+            else:
+                with pa.OSFile(temp, "wb") as sink, pa.ipc.new_file(sink, self._schema) as writer:
+                    writer.write_table(table)
+        os.replace(temp, target)
+
+
+async def analyze_recording(prepared: PreparedRecording, prescreener, language: str) -> Dict:
+    """
+    녹음 하나의 모델 작업: 구간을 동시에 전사한 뒤 위험도 분석과 요약을 동시에 실행합니다.
+    """
+    texts = await asyncio.gather(*(
+        inference.transcribe(
+            ("segment.wav", io.BytesIO(segment), "audio/wav"),
+            language=language,
+            priority=PRIORITY_BATCH
+        )
+        for segment in prepared.segments
+    ))
+    transcript = " ".join(text.strip() for text in texts if text.strip())
+
+    async def chat(model_text, messages):
+        return await inference.chat(
+            model="gpt-3.5-turbo",
+            messages=messages,
+            max_tokens=300,
+            temperature=0.1,
+            priority=PRIORITY_BATCH
+        )
+
+    risk: Dict = {}
+    summary = ""
+    if transcript:
+        risk, summary = await asyncio.gather(
+            analyze_risk_text(transcript, prescreener, chat, settings.RISK_INPUT_TOKEN_BUDGET, endpoint="batch"),
+            summarizer.summarize_text(transcript, priority=PRIORITY_BATCH),
+        )
+    return {
+        "duration_seconds": round(prepared.duration, 2),
+        "source_sample_rate": prepared.source_sample_rate,
+        "speech_segments": len(prepared.segments),
+        "transcript": transcript,
+        "summary": summary,
+        "risk_level": risk.get("risk_level", 0),
+        "risk_stage": risk.get("risk_stage", "정상"),
+        "emotion": risk.get("emotion", ""),
+        "risk_analysis": risk.get("analysis", ""),
+        "risk_source": risk.get("source", ""),
+        **{name: round(value, 4) for name, value in prepared.features.items()},
+        "processed_at": time.time(),
+    }
+
+
+async def run_batch(args) -> Dict:
+    os.makedirs(args.output, exist_ok=True)
+    checkpoint = Checkpoint(args.output, args.input)
+    writer = ColumnarWriter(args.output, args.format, args.batch_size, checkpoint)
+    prescreener = create_prescreener()
+    stats = {"processed": 0, "skipped": 0, "failed": 0}
+    started = time.perf_counter()
+
+    loop = asyncio.get_running_loop()
+    # 프로세스 풀 작업자는 모델/웹 모듈 상태를 물려받지 않도록 spawn으로 시작
+    pool = ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"))
+    in_flight = asyncio.Semaphore(args.workers + args.concurrency)
+    model_slots = asyncio.Semaphore(args.concurrency)
+    tasks: Set[asyncio.Task] = set()
+
+    async def process(path: str):
+        try:
+            prepared = await loop.run_in_executor(pool, prepare_recording, path, args.segment_seconds)
+            async with model_slots:
+                row = await analyze_recording(prepared, prescreener, args.language)
+            row["path"] = checkpoint.key(path)
+            await writer.add(path, row)
+            stats["processed"] += 1
+        except Exception as e:
+            stats["failed"] += 1
+            logger.error(f"녹음 분석 실패 ({path}): {e}")
+        finally:
+            in_flight.release()
+
+    try:
+        for path in iter_recordings(args.input):
+            if checkpoint.is_done(path):
+                stats["skipped"] += 1
+                continue
+            await in_flight.acquire()
+            task = asyncio.create_task(process(path))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+        await writer.close()
+    finally:
+        pool.shutdown(cancel_futures=True)
+        await summarizer.close()
+
+    elapsed = time.perf_counter() - started
+    stats["elapsed_seconds"] = round(elapsed, 2)
+    stats["recordings_per_second"] = round(stats["processed"] / elapsed, 3) if elapsed else 0.0
+    return stats
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="통화 녹음 일괄 사후 분석 (전사, 위험도, 요약, 음향 감정 통계)")
+    parser.add_argument("input", help="녹음 파일(PCM WAV) 디렉터리 (하위 디렉터리 포함)")
+    parser.add_argument("--output", required=True, help="결과 part 파일과 체크포인트를 저장할 디렉터리")
+    parser.add_argument("--format", choices=sorted(FORMAT_EXTENSIONS), default="parquet",
+                        help="출력 형식 (parquet/arrow는 pyarrow 필요)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="CPU 작업 프로세스 수")
+    parser.add_argument("--concurrency", type=int, default=16, help="모델 호출을 동시에 진행하는 녹음 수")
+    parser.add_argument("--batch-size", type=int, default=500, help="part 파일 하나에 담을 녹음 수")
+    parser.add_argument("--segment-seconds", type=float, default=60.0, help="전사 구간 길이(초)")
+    parser.add_argument("--language", default="ko", help="전사 언어")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(level=settings.LOG_LEVEL, fmt=settings.LOG_FORMAT, redact=settings.LOG_REDACT_TRANSCRIPTS)
+    if args.format != "jsonl" and pa is None:
+        print("parquet/arrow 출력에는 pyarrow가 필요합니다. (pip install pyarrow 또는 --format jsonl)", file=sys.stderr)
+        sys.exit(2)
+    if not inference.available:
+        print("OpenAI API 키가 설정되지 않았습니다. .env 파일에 OPENAI_API_KEY를 추가해주세요.", file=sys.stderr)
+        sys.exit(2)
+    stats = asyncio.run(run_batch(args))
+    print(
+        f"처리 {stats['processed']}건, 건너뜀 {stats['skipped']}건, 실패 {stats['failed']}건, "
+        f"{stats['elapsed_seconds']}초 ({stats['recordings_per_second']}건/초)"
+    )
+    if stats["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
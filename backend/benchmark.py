@@ -0,0 +1,522 @@
+"""
+백엔드 부하 테스트/지연 시간 벤치마크
+
+로컬 대역 모델 제공자(MODEL_PROVIDER=local)로 서버를 같은 프로세스에서 띄우고
+다음 경로를 동시에 부하합니다.
+
+- /ws/audio-stream: N명의 상담사가 음성 청크(--codec)를 실시간 속도로 전송
+- /ws/real-time-analysis: 텍스트 청크 전송 (잠정 결과/LLM 결과 지연 측정)
+- /summarize, /generate-script, /analyze-risk: 동시 요청 버스트
+
+경로별 p50/p95/p99 지연 시간, 처리량, 이벤트 루프 지연, 세션당 메모리를 출력합니다.
+이벤트 루프 지연이 크면 비동기 핸들러 안에 블로킹 호출이 있다는 신호입니다.
+
+사용 예:
+    python benchmark.py --audio-sessions 50 --analysis-sessions 50 --duration 30
+    python benchmark.py --url http://localhost:8000 --rest-concurrency 20 --json report.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+# 설정은 import 시점에 읽으므로 서버 모듈을 불러오기 전에 로컬 대역을 기본값으로 지정
+os.environ.setdefault("MODEL_PROVIDER", "local")
+
+import numpy as np
+import websockets
+
+from audio_frames import CODEC_MULAW, CODEC_PCM16, FRAMING_PARAM, FRAMING_V1, encode_frame, mulaw_encode
+
+SAMPLE_RATE = 16000
+
+SAMPLE_TEXTS = [
+    "카드 결제 내역을 확인하고 싶은데 어디서 볼 수 있나요",
+    "지난달에 해지했는데 아직도 요금이 빠져나가고 있어요 확인 부탁드립니다",
+    "몇 번을 전화했는데 아직도 처리가 안 됐다니 정말 짜증나네요",
+    "책임자 바꿔 주세요 이건 말이 안 되잖아요 금감원에 민원넣겠습니다",
+    "당장 처리 안 하면 찾아가겠습니다 가만두지 않을 거예요!!",
+    "대출 이자가 왜 이렇게 많이 올랐는지 설명해 주세요",
+]
+
+
+class LatencyRecorder:
+    """
+    경로별 지연 시간(초)과 오류 수 기록
+    """
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.audio_bytes = 0
+
+    def record(self, name: str, seconds: float):
+        self.samples[name].append(seconds)
+
+    def error(self, name: str):
+        self.errors[name] += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Dict]:
+        report = {}
+        for name in sorted(set(self.samples) | set(self.errors)):
+            values = np.asarray(self.samples.get(name, []), dtype=np.float64) * 1000
+            entry = {
+                "count": int(values.size),
+                "errors": self.errors.get(name, 0),
+                "throughput": round(values.size / elapsed, 2) if elapsed else 0.0,
+            }
+            if values.size:
+                p50, p95, p99 = np.percentile(values, [50, 95, 99])
+                entry.update(
+                    p50_ms=round(float(p50), 1),
+                    p95_ms=round(float(p95), 1),
+                    p99_ms=round(float(p99), 1),
+                    max_ms=round(float(values.max()), 1),
+                )
+            report[name] = entry
+        return report
+
+
+class LoopLagMonitor:
+    """
+    interval마다 깨어나 예정 시각보다 늦은 만큼을 이벤트 루프 지연으로 기록합니다.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def summary(self) -> Dict[str, float]:
+        if not self.samples:
+            return {}
+        values = np.asarray(self.samples) * 1000
+        p50, p99 = np.percentile(values, [50, 99])
+        return {
+            "p50_ms": round(float(p50), 2),
+            "p99_ms": round(float(p99), 2),
+            "max_ms": round(float(values.max()), 2),
+        }
+
+
+def rss_bytes() -> int:
+    """
+    현재 프로세스의 상주 메모리(RSS) 크기
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        # /proc가 없는 환경(macOS 등)에서는 최대 RSS로 대체
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == "darwin" else usage * 1024
+
+
+class MemorySampler:
+    """
+    부하 중 최대 RSS를 주기적으로 기록합니다.
+    """
+
+    def __init__(self, interval: float = 0.25):
+        self.interval = interval
+        self.baseline = rss_bytes()
+        self.peak = self.baseline
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            self.peak = max(self.peak, rss_bytes())
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self.peak = max(self.peak, rss_bytes())
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+class HTTPClient:
+    """
+    벤치마크용 최소 keep-alive HTTP/1.1 JSON 클라이언트 (추가 의존성 없음)
+    """
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def post_json(self, path: str, payload: Dict) -> Tuple[int, bytes]:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self._writer.write(
+            (
+                f"POST {path} HTTP/1.1\r\n"
+                f"Host: {self.host}:{self.port}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n"
+            ).encode("latin-1")
+            + body
+        )
+        await self._writer.drain()
+
+        try:
+            status_line = await self._reader.readline()
+            status = int(status_line.split()[1])
+            headers = {}
+            while True:
+                line = await self._reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            content = await self._reader.readexactly(int(headers.get("content-length", "0")))
+        except (IndexError, ValueError, asyncio.IncompleteReadError):
+            await self.close()
+            raise ConnectionError("HTTP 응답을 해석할 수 없습니다.")
+
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, content
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except Exception:
+                pass
+        self._reader = self._writer = None
+
+
+def speech_like_pcm(seconds: float, rng: np.random.Generator) -> bytes:
+    """
+    VAD를 통과하도록 기본 주파수가 바뀌는 유성음 비슷한 신호를 생성합니다.
+    """
+    n = int(SAMPLE_RATE * seconds)
+    t = np.arange(n) / SAMPLE_RATE
+    f0 = rng.uniform(110, 250)
+    signal = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 5))
+    envelope = 0.6 + 0.4 * np.sin(2 * np.pi * rng.uniform(2, 5) * t)
+    noise = rng.normal(0, 0.05, n)
+    return ((signal * envelope + noise) * 6000).astype(np.int16).tobytes()
+
+
+def encode_audio_message(pcm: bytes, codec: str, seq: int, timestamp_ms: int) -> bytes:
+    """
+    --codec에 맞게 음성 청크를 웹소켓 메시지로 만듭니다.
+
+    raw: 헤더 없는 16kHz PCM16, pcm16: 프레임 헤더 + 16kHz PCM16, mulaw: 프레임 헤더 + 8kHz µ-law
+    """
+    if codec == "raw":
+        return pcm
+    if codec == "pcm16":
+        return encode_frame(seq, timestamp_ms, pcm)
+    samples = np.frombuffer(pcm, dtype=np.int16)[::2]
+    return encode_frame(seq, timestamp_ms, mulaw_encode(samples).tobytes(), sample_rate=8000, codec=CODEC_MULAW)
+
+
+async def run_audio_session(
+    ws_base: str,
+    session_id: int,
+    chunks: int,
+    chunk_seconds: float,
+    pace: bool,
+    codec: str,
+    recorder: LatencyRecorder,
+):
+    """
+    상담사 한 명의 음성 스트림: 청크 전송부터 전사 결과 수신까지의 지연 시간을 측정합니다.
+    """
+    rng = np.random.default_rng(session_id)
+    try:
+        # 프레임 헤더를 붙이는 코덱은 연결할 때 프레임 형식을 알림
+        query = "" if codec == "raw" else f"?{FRAMING_PARAM}={FRAMING_V1}"
+        async with websockets.connect(f"{ws_base}/ws/audio-stream{query}", max_size=None) as ws:
+            for seq in range(chunks):
+                started = time.perf_counter()
+                message = encode_audio_message(
+                    speech_like_pcm(chunk_seconds, rng), codec, seq, int(seq * chunk_seconds * 1000)
+                )
+                recorder.audio_bytes += len(message)
+                await ws.send(message)
+                try:
+                    message = json.loads(await asyncio.wait_for(ws.recv(), timeout=30))
+                    # 연결 직후 서버가 보내는 통화 세션 안내는 건너뜀
+                    while message.get("type") == "session":
+                        message = json.loads(await asyncio.wait_for(ws.recv(), timeout=30))
+                except asyncio.TimeoutError:
+                    recorder.error("ws_audio")
+                    continue
+                if message.get("type") == "error":
+                    recorder.error("ws_audio")
+                else:
+                    recorder.record("ws_audio", time.perf_counter() - started)
+                if pace:
+                    await asyncio.sleep(max(0.0, chunk_seconds - (time.perf_counter() - started)))
+    except Exception as e:
+        print(f"음성 세션 {session_id} 오류: {e}", file=sys.stderr)
+        recorder.error("ws_audio_connect")
+
+
+async def run_analysis_session(
+    ws_base: str,
+    session_id: int,
+    chunks: int,
+    interval: float,
+    recorder: LatencyRecorder,
+):
+    """
+    실시간 분석 세션: 잠정 결과(사전 점수화)와 LLM 최종 결과의 지연 시간을 따로 측정합니다.
+    """
+    rng = random.Random(session_id)
+    sent_at: Dict[int, float] = {}
+    try:
+        async with websockets.connect(f"{ws_base}/ws/real-time-analysis", max_size=None) as ws:
+
+            async def reader():
+                async for raw in ws:
+                    message = json.loads(raw)
+                    now = time.perf_counter()
+                    if message.get("type") == "risk_analysis":
+                        if message.get("provisional"):
+                            started = sent_at.get(message["chunk_id"])
+                            if started is not None:
+                                recorder.record("ws_analysis_provisional", now - started)
+                        else:
+                            # 합쳐진 청크 중 가장 오래 기다린 청크 기준
+                            waits = [now - sent_at[c] for c in message.get("chunk_ids", []) if c in sent_at]
+                            if waits:
+                                recorder.record("ws_analysis_final", max(waits))
+                    elif message.get("type") == "error":
+                        recorder.error("ws_analysis_final")
+
+            reader_task = asyncio.create_task(reader())
+            try:
+                for chunk_id in range(1, chunks + 1):
+                    sent_at[chunk_id] = time.perf_counter()
+                    await ws.send(json.dumps({
+                        "type": "text_chunk",
+                        "text": f"{rng.choice(SAMPLE_TEXTS)} ({session_id}-{chunk_id})",
+                        "chunk_id": chunk_id,
+                    }, ensure_ascii=False))
+                    await asyncio.sleep(interval)
+                # 마지막 LLM 결과를 기다림
+                await asyncio.sleep(min(5.0, interval * 4))
+            finally:
+                reader_task.cancel()
+    except Exception as e:
+        print(f"분석 세션 {session_id} 오류: {e}", file=sys.stderr)
+        recorder.error("ws_analysis_connect")
+
+
+REST_ENDPOINTS = ["/summarize", "/generate-script", "/analyze-risk"]
+
+
+async def run_rest_worker(
+    host: str,
+    port: int,
+    worker_id: int,
+    requests: int,
+    recorder: LatencyRecorder,
+):
+    """
+    REST 엔드포인트 요청을 연속으로 보냅니다. (캐시를 피하도록 요청마다 텍스트를 다르게 구성)
+    """
+    client = HTTPClient(host, port)
+    rng = random.Random(worker_id)
+    try:
+        for index in range(requests):
+            endpoint = REST_ENDPOINTS[(worker_id + index) % len(REST_ENDPOINTS)]
+            payload = {"text": f"{rng.choice(SAMPLE_TEXTS)} 요청 번호 {worker_id}-{index}"}
+            name = f"rest{endpoint}"
+            started = time.perf_counter()
+            try:
+                status, _ = await client.post_json(endpoint, payload)
+            except Exception:
+                recorder.error(name)
+                continue
+            if status == 200:
+                recorder.record(name, time.perf_counter() - started)
+            else:
+                recorder.error(name)
+    finally:
+        await client.close()
+
+
+async def start_local_server():
+    """
+    같은 프로세스의 이벤트 루프에서 uvicorn 서버를 임의 포트로 시작합니다.
+    """
+    import logging
+    import uvicorn
+    from main import app
+
+    # 요청마다 남는 INFO 로그가 측정을 방해하지 않도록 경고 이상만 출력
+    logging.getLogger().setLevel(logging.WARNING)
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", lifespan="on")
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, task, port
+
+
+async def run_benchmark(args) -> Dict:
+    server = server_task = None
+    if args.url:
+        parsed = urlparse(args.url)
+        host, port = parsed.hostname, parsed.port or 80
+    else:
+        server, server_task, port = await start_local_server()
+        host = "127.0.0.1"
+    ws_base = f"ws://{host}:{port}"
+
+    recorder = LatencyRecorder()
+    lag_monitor = LoopLagMonitor()
+    memory = MemorySampler()
+    lag_monitor.start()
+    memory.start()
+
+    chunks = max(1, int(args.duration / args.chunk_seconds))
+    analysis_chunks = max(1, int(args.duration / args.analysis_interval))
+    jobs = [
+        run_audio_session(ws_base, i, chunks, args.chunk_seconds, not args.no_pace, args.codec, recorder)
+        for i in range(args.audio_sessions)
+    ]
+    jobs += [
+        run_analysis_session(ws_base, i, analysis_chunks, args.analysis_interval, recorder)
+        for i in range(args.analysis_sessions)
+    ]
+    jobs += [
+        run_rest_worker(host, port, i, args.rest_requests, recorder)
+        for i in range(args.rest_concurrency)
+    ]
+
+    started = time.perf_counter()
+    await asyncio.gather(*jobs)
+    elapsed = time.perf_counter() - started
+
+    await lag_monitor.stop()
+    await memory.stop()
+    if server is not None:
+        server.should_exit = True
+        await server_task
+
+    sessions = args.audio_sessions + args.analysis_sessions
+    report = {
+        "config": {
+            "target": args.url or "in-process",
+            "model_provider": os.environ.get("MODEL_PROVIDER"),
+            "audio_sessions": args.audio_sessions,
+            "analysis_sessions": args.analysis_sessions,
+            "rest_concurrency": args.rest_concurrency,
+            "rest_requests": args.rest_requests,
+            "duration": args.duration,
+            "codec": args.codec,
+        },
+        "elapsed_seconds": round(elapsed, 2),
+        "latency": recorder.summary(elapsed),
+        "event_loop_lag": lag_monitor.summary(),
+        # 상담사 한 명이 실시간으로 올리는 음성 대역폭
+        "audio_kbps_per_session": round(
+            recorder.audio_bytes * 8 / 1000 / (args.audio_sessions * chunks * args.chunk_seconds), 1
+        ) if args.audio_sessions else 0.0,
+        "memory": {
+            "baseline_mb": round(memory.baseline / 2**20, 1),
+            "peak_mb": round(memory.peak / 2**20, 1),
+            "per_session_kb": round((memory.peak - memory.baseline) / 1024 / sessions, 1) if sessions else 0.0,
+        },
+    }
+    return report
+
+
+def print_report(report: Dict):
+    print(f"\n대상: {report['config']['target']} (제공자: {report['config']['model_provider']}), "
+          f"소요 시간 {report['elapsed_seconds']}초")
+    print(f"{'경로':<28}{'건수':>7}{'오류':>6}{'처리량/s':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for name, entry in report["latency"].items():
+        print(
+            f"{name:<28}{entry['count']:>7}{entry['errors']:>6}{entry['throughput']:>10}"
+            f"{entry.get('p50_ms', '-'):>9}{entry.get('p95_ms', '-'):>9}"
+            f"{entry.get('p99_ms', '-'):>9}{entry.get('max_ms', '-'):>9}"
+        )
+    lag = report["event_loop_lag"]
+    if lag:
+        print(f"이벤트 루프 지연(ms): p50 {lag['p50_ms']}, p99 {lag['p99_ms']}, max {lag['max_ms']}")
+    if report["audio_kbps_per_session"]:
+        print(f"음성 업로드 대역폭({report['config']['codec']}): 세션당 {report['audio_kbps_per_session']}kbps")
+    memory = report["memory"]
+    print(f"메모리(MB): 시작 {memory['baseline_mb']}, 최대 {memory['peak_mb']}, "
+          f"세션당 {memory['per_session_kb']}KB")
+    if report["config"]["target"] != "in-process":
+        print("※ 외부 서버 대상일 때 이벤트 루프 지연/메모리는 벤치마크 클라이언트 프로세스 기준입니다.")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="AI 상담사 정서 케어 API 부하 테스트")
+    parser.add_argument("--url", default="", help="외부 서버 주소 (생략하면 같은 프로세스에서 서버 실행)")
+    parser.add_argument("--audio-sessions", type=int, default=10, help="음성 스트리밍 세션 수")
+    parser.add_argument("--analysis-sessions", type=int, default=10, help="실시간 분석 세션 수")
+    parser.add_argument("--rest-concurrency", type=int, default=5, help="REST 동시 요청 작업자 수")
+    parser.add_argument("--rest-requests", type=int, default=20, help="작업자당 REST 요청 수")
+    parser.add_argument("--duration", type=float, default=10.0, help="세션당 스트리밍 시간(초)")
+    parser.add_argument("--chunk-seconds", type=float, default=1.0, help="음성 청크 길이(초)")
+    parser.add_argument("--analysis-interval", type=float, default=0.5, help="텍스트 청크 전송 간격(초)")
+    parser.add_argument("--codec", choices=["raw", "pcm16", "mulaw"], default="raw",
+                        help="음성 전송 형식 (raw: 헤더 없는 PCM, pcm16/mulaw: 바이너리 프레임)")
+    parser.add_argument("--no-pace", action="store_true", help="음성 청크를 실시간 속도가 아닌 최대 속도로 전송")
+    parser.add_argument("--json", default="", help="결과를 저장할 JSON 파일 경로")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run_benchmark(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
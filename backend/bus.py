@@ -0,0 +1,337 @@
+"""
+워커 간 메시지 버스
+
+여러 uvicorn 워커(프로세스)나 서버가 통화 변경과 세션 목록을 공유하기 위한
+발행/구독(pub/sub) 및 해시 저장소 인터페이스입니다.
+
+- memory: 프로세스 내부 버스 (워커 1개일 때 기본값)
+- redis: Redis 프로토콜(RESP) 버스. Redis 서버나 로컬 대역 서버(bus_server.py)에 접속
+  (BUS_URL=redis://호스트:포트 또는 unix:///소켓경로)
+"""
+
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from metrics import BUS_ERRORS, BUS_MESSAGES
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Dict], None]
+
+
+class BusError(RuntimeError):
+    """
+    버스 연결 실패 또는 서버 오류 응답
+    """
+
+
+class MessageBus(ABC):
+    """
+    발행/구독과 해시 저장소 인터페이스
+
+    메시지와 해시 값은 JSON으로 직렬화할 수 있는 dict입니다.
+    구독 핸들러는 이벤트 루프에서 동기적으로 호출되므로 오래 걸리는 작업을 하면 안 됩니다.
+    """
+
+    name = ""
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+
+    def subscribe(self, channel: str, handler: Handler):
+        self._handlers[channel].append(handler)
+
+    def _dispatch(self, channel: str, message: Dict):
+        BUS_MESSAGES.inc(direction="received")
+        for handler in list(self._handlers.get(channel, ())):
+            try:
+                handler(message)
+            except Exception as e:
+                logger.error(f"버스 메시지 처리 오류 ({channel}): {e}", exc_info=True)
+
+    async def start(self):
+        pass
+
+    async def aclose(self):
+        pass
+
+    @abstractmethod
+    async def publish(self, channel: str, message: Dict) -> int:
+        """
+        메시지를 발행하고 받은 구독자(워커) 수를 반환합니다.
+        """
+
+    @abstractmethod
+    async def hset(self, key: str, mapping: Dict[str, Dict]):
+        ...
+
+    @abstractmethod
+    async def hdel(self, key: str, *fields: str):
+        ...
+
+    @abstractmethod
+    async def hgetall(self, key: str) -> Dict[str, Dict]:
+        ...
+
+
+class InProcessBus(MessageBus):
+    """
+    프로세스 내부 버스 (단일 워커용)
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        super().__init__()
+        self._hashes: Dict[str, Dict[str, Dict]] = defaultdict(dict)
+
+    async def publish(self, channel: str, message: Dict) -> int:
+        BUS_MESSAGES.inc(direction="published")
+        # 실제 버스처럼 발행한 코루틴이 끝난 뒤에 전달
+        asyncio.get_running_loop().call_soon(self._dispatch, channel, message)
+        return 1 if self._handlers.get(channel) else 0
+
+    async def hset(self, key: str, mapping: Dict[str, Dict]):
+        self._hashes[key].update(mapping)
+
+    async def hdel(self, key: str, *fields: str):
+        for field in fields:
+            self._hashes[key].pop(field, None)
+
+    async def hgetall(self, key: str) -> Dict[str, Dict]:
+        return dict(self._hashes.get(key, {}))
+
+
+def encode_command(*args) -> bytes:
+    """
+    RESP 명령 배열로 인코딩합니다.
+    """
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode("utf-8")
+        elif not isinstance(arg, (bytes, bytearray)):
+            arg = str(arg).encode("utf-8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader):
+    """
+    RESP 응답 하나를 읽습니다. 오류 응답은 예외를 던지지 않고 BusError 객체로 반환합니다.
+    """
+    line = await reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("버스 연결이 끊어졌습니다.")
+    prefix, rest = line[:1], line[1:-2]
+    if prefix == b"+":
+        return rest.decode("utf-8")
+    if prefix == b"-":
+        return BusError(rest.decode("utf-8"))
+    if prefix == b":":
+        return int(rest)
+    if prefix == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if prefix == b"*":
+        length = int(rest)
+        if length < 0:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+    raise BusError(f"알 수 없는 응답 형식입니다: {line[:32]!r}")
+
+
+async def open_bus_connection(url: str) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    """
+    redis://호스트:포트 또는 unix:///소켓경로 주소로 연결합니다.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == "unix":
+        if not hasattr(asyncio, "open_unix_connection"):
+            raise ValueError(f"이 운영체제는 유닉스 소켓 BUS_URL을 지원하지 않습니다: {url}")
+        return await asyncio.open_unix_connection(parsed.path)
+    if parsed.scheme == "redis":
+        return await asyncio.open_connection(parsed.hostname or "127.0.0.1", parsed.port or 6379)
+    raise ValueError(f"지원하지 않는 BUS_URL입니다: {url}")
+
+
+class RedisBus(MessageBus):
+    """
+    Redis 프로토콜(RESP) 버스
+
+    - 명령 연결 하나에 요청을 파이프라이닝하고, 응답은 읽기 태스크가 순서대로 대기 중인 요청에 돌려줍니다.
+    - 구독은 별도 연결에서 받으며, 연결이 끊기면 지수 백오프로 다시 연결하고 구독을 복구합니다.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, connect_timeout: float = 3.0, command_timeout: float = 3.0):
+        super().__init__()
+        self.url = url
+        self.connect_timeout = connect_timeout
+        self.command_timeout = command_timeout
+        self._db = urlparse(url).path.strip("/") if urlparse(url).scheme == "redis" else ""
+
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Deque[asyncio.Future] = deque()
+        self._connect_lock = asyncio.Lock()
+
+        self._subscriber_task: Optional[asyncio.Task] = None
+        self._subscriber_writer: Optional[asyncio.StreamWriter] = None
+
+    async def _connect(self) -> asyncio.StreamWriter:
+        async with self._connect_lock:
+            if self._writer is not None and not self._writer.is_closing():
+                return self._writer
+            try:
+                reader, writer = await asyncio.wait_for(open_bus_connection(self.url), self.connect_timeout)
+            except (OSError, asyncio.TimeoutError, ValueError) as e:
+                raise BusError(f"버스 서버에 연결할 수 없습니다 ({self.url}): {e}") from e
+            self._writer = writer
+            self._reader_task = asyncio.create_task(self._read_replies(reader, writer))
+            if self._db:
+                select = self._write(writer, encode_command("SELECT", self._db))
+                select.add_done_callback(lambda future: future.cancelled() or future.exception())
+            return writer
+
+    def _write(self, writer: asyncio.StreamWriter, command: bytes) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(future)
+        writer.write(command)
+        return future
+
+    async def _read_replies(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                reply = await read_reply(reader)
+                future = self._pending.popleft()
+                if future.done():
+                    continue
+                if isinstance(reply, BusError):
+                    future.set_exception(reply)
+                else:
+                    future.set_result(reply)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"버스 명령 연결이 끊어졌습니다: {e}")
+        finally:
+            if self._writer is writer:
+                self._writer = None
+            writer.close()
+            while self._pending:
+                future = self._pending.popleft()
+                if not future.done():
+                    future.set_exception(BusError("버스 연결이 끊어졌습니다."))
+
+    async def execute(self, *args):
+        """
+        명령을 보내고 응답을 기다립니다.
+        """
+        try:
+            writer = await self._connect()
+            future = self._write(writer, encode_command(*args))
+            # 출력 버퍼가 쌓여 있을 때만 실제로 대기
+            await writer.drain()
+            return await asyncio.wait_for(asyncio.shield(future), self.command_timeout)
+        except asyncio.TimeoutError as e:
+            BUS_ERRORS.inc(operation=str(args[0]).lower())
+            raise BusError(f"버스 응답 시간 초과: {args[0]}") from e
+        except (BusError, ConnectionError) as e:
+            BUS_ERRORS.inc(operation=str(args[0]).lower())
+            raise BusError(str(e)) from e
+
+    async def publish(self, channel: str, message: Dict) -> int:
+        BUS_MESSAGES.inc(direction="published")
+        return await self.execute("PUBLISH", channel, json.dumps(message, ensure_ascii=False))
+
+    async def hset(self, key: str, mapping: Dict[str, Dict]):
+        if not mapping:
+            return
+        args = []
+        for field, value in mapping.items():
+            args.extend((field, json.dumps(value, ensure_ascii=False)))
+        await self.execute("HSET", key, *args)
+
+    async def hdel(self, key: str, *fields: str):
+        if fields:
+            await self.execute("HDEL", key, *fields)
+
+    async def hgetall(self, key: str) -> Dict[str, Dict]:
+        reply = await self.execute("HGETALL", key) or []
+        return {
+            reply[i].decode("utf-8"): json.loads(reply[i + 1])
+            for i in range(0, len(reply) - 1, 2)
+        }
+
+    def subscribe(self, channel: str, handler: Handler):
+        new_channel = channel not in self._handlers
+        super().subscribe(channel, handler)
+        writer = self._subscriber_writer
+        if new_channel and writer is not None and not writer.is_closing():
+            writer.write(encode_command("SUBSCRIBE", channel))
+
+    async def _subscribe_loop(self):
+        delay = 0.5
+        while True:
+            writer = None
+            try:
+                reader, writer = await asyncio.wait_for(open_bus_connection(self.url), self.connect_timeout)
+                if self._handlers:
+                    writer.write(encode_command("SUBSCRIBE", *self._handlers))
+                self._subscriber_writer = writer
+                logger.info(f"메시지 버스 구독 연결됨: {self.url}")
+                delay = 0.5
+                while True:
+                    reply = await read_reply(reader)
+                    if isinstance(reply, list) and len(reply) == 3 and reply[0] == b"message":
+                        self._dispatch(reply[1].decode("utf-8"), json.loads(reply[2]))
+                    elif isinstance(reply, BusError):
+                        logger.error(f"버스 구독 오류: {reply}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                BUS_ERRORS.inc(operation="subscribe")
+                logger.warning(f"메시지 버스 구독 연결 실패, {delay:.1f}초 후 재시도: {e}")
+            finally:
+                self._subscriber_writer = None
+                if writer is not None:
+                    writer.close()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 10.0)
+
+    async def start(self):
+        if self._subscriber_task is None or self._subscriber_task.done():
+            self._subscriber_task = asyncio.create_task(self._subscribe_loop())
+
+    async def aclose(self):
+        for task in (self._subscriber_task, self._reader_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._subscriber_task = None
+        self._reader_task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def create_bus(settings) -> MessageBus:
+    """
+    설정(BUS_URL)에 맞는 버스를 생성합니다. 비어 있으면 프로세스 내부 버스를 사용합니다.
+    """
+    if not settings.BUS_URL:
+        return InProcessBus()
+    return RedisBus(settings.BUS_URL)
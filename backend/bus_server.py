@@ -0,0 +1,212 @@
+"""
+메시지 버스 로컬 대역 서버
+
+Redis 없이 여러 워커를 실행할 수 있도록, 버스가 사용하는 Redis 명령 일부
+(PING, SELECT, PUBLISH, SUBSCRIBE, UNSUBSCRIBE, HSET, HGET, HDEL, HGETALL, DEL)를
+같은 프로토콜(RESP)로 처리하는 단일 프로세스 서버입니다.
+
+사용 예:
+    python bus_server.py --port 6380
+    python bus_server.py --unix /tmp/counselor-bus.sock
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, Optional, Set
+
+from bus import BusError, read_reply
+
+logger = logging.getLogger(__name__)
+
+# 구독자의 출력 버퍼가 이 크기를 넘으면 따라오지 못하는 구독자로 보고 연결 종료
+MAX_SUBSCRIBER_BUFFER = 8 * 1024 * 1024
+
+
+class Status(str):
+    """
+    RESP 단순 문자열 응답 (+OK 등)
+    """
+
+
+def encode_reply(value) -> bytes:
+    if isinstance(value, Status):
+        return b"+%s\r\n" % value.encode("utf-8")
+    if isinstance(value, BusError):
+        return b"-%s\r\n" % str(value).encode("utf-8")
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    if isinstance(value, (bytes, bytearray)):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    if isinstance(value, (list, tuple)):
+        return b"*%d\r\n" % len(value) + b"".join(encode_reply(item) for item in value)
+    raise TypeError(f"인코딩할 수 없는 응답입니다: {type(value)}")
+
+
+class LocalBusServer:
+    def __init__(self):
+        self._channels: Dict[bytes, Set[asyncio.StreamWriter]] = defaultdict(set)
+        self._hashes: Dict[bytes, Dict[bytes, bytes]] = defaultdict(dict)
+
+    def _unsubscribe(self, writer: asyncio.StreamWriter, channels: Set[bytes]):
+        for channel in channels:
+            subscribers = self._channels.get(channel)
+            if subscribers is not None:
+                subscribers.discard(writer)
+                if not subscribers:
+                    del self._channels[channel]
+
+    def _publish(self, channel: bytes, message: bytes) -> int:
+        payload = encode_reply([b"message", channel, message])
+        delivered = 0
+        for subscriber in list(self._channels.get(channel, ())):
+            if subscriber.transport.get_write_buffer_size() > MAX_SUBSCRIBER_BUFFER:
+                logger.warning("구독자 출력 버퍼가 가득 차 연결을 종료합니다.")
+                subscriber.close()
+                continue
+            subscriber.write(payload)
+            delivered += 1
+        return delivered
+
+    def _execute(self, command: bytes, args, writer: asyncio.StreamWriter, subscriptions: Set[bytes]):
+        if command == b"PING":
+            return Status("PONG") if not args else args[0]
+        if command == b"SELECT":
+            return Status("OK")
+        if command == b"PUBLISH" and len(args) == 2:
+            return self._publish(args[0], args[1])
+        if command == b"SUBSCRIBE" and args:
+            replies = []
+            for channel in args:
+                subscriptions.add(channel)
+                self._channels[channel].add(writer)
+                replies.append([b"subscribe", channel, len(subscriptions)])
+            return replies
+        if command == b"UNSUBSCRIBE":
+            channels = set(args) if args else set(subscriptions)
+            self._unsubscribe(writer, channels)
+            replies = []
+            for channel in channels:
+                subscriptions.discard(channel)
+                replies.append([b"unsubscribe", channel, len(subscriptions)])
+            return replies
+        if command == b"HSET" and len(args) >= 3 and len(args) % 2 == 1:
+            values = self._hashes[args[0]]
+            added = 0
+            for i in range(1, len(args), 2):
+                added += args[i] not in values
+                values[args[i]] = args[i + 1]
+            return added
+        if command == b"HGET" and len(args) == 2:
+            return self._hashes.get(args[0], {}).get(args[1])
+        if command == b"HDEL" and len(args) >= 2:
+            values = self._hashes.get(args[0], {})
+            removed = sum(values.pop(field, None) is not None for field in args[1:])
+            if not values:
+                self._hashes.pop(args[0], None)
+            return removed
+        if command == b"HGETALL" and len(args) == 1:
+            return [item for pair in self._hashes.get(args[0], {}).items() for item in pair]
+        if command == b"DEL" and args:
+            return sum(self._hashes.pop(key, None) is not None for key in args)
+        return BusError(f"ERR unknown command or wrong number of arguments for '{command.decode(errors='replace')}'")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        subscriptions: Set[bytes] = set()
+        try:
+            while True:
+                request = await read_reply(reader)
+                if not isinstance(request, list) or not request:
+                    writer.write(encode_reply(BusError("ERR protocol error")))
+                    continue
+                command = bytes(request[0]).upper()
+                if command == b"QUIT":
+                    writer.write(encode_reply(Status("OK")))
+                    break
+                reply = self._execute(command, request[1:], writer, subscriptions)
+                if command in (b"SUBSCRIBE", b"UNSUBSCRIBE") and isinstance(reply, list):
+                    # 구독 확인은 채널마다 별도 응답
+                    writer.write(b"".join(encode_reply(item) for item in reply))
+                else:
+                    writer.write(encode_reply(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._unsubscribe(writer, subscriptions)
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 6380, unix_path: Optional[str] = None):
+        if unix_path:
+            if not hasattr(asyncio, "start_unix_server"):
+                raise BusError("이 운영체제는 유닉스 소켓을 지원하지 않습니다. TCP 주소를 사용하세요.")
+            if os.path.exists(unix_path):
+                os.unlink(unix_path)
+            server = await asyncio.start_unix_server(self.handle, path=unix_path)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        return server
+
+
+def start_background_server(host: str = "127.0.0.1", port: int = 0, unix_path: Optional[str] = None) -> str:
+    """
+    현재 프로세스의 별도 스레드에서 로컬 대역 서버를 실행하고 BUS_URL을 반환합니다.
+
+    python main.py를 여러 워커로 실행할 때 워커를 띄우는 부모 프로세스에서 사용합니다.
+    기본값은 모든 운영체제에서 동작하는 TCP 루프백(port=0이면 빈 포트)이며, 서버를 시작하지 못하면
+    BusError를 발생시킵니다.
+    """
+    ready = threading.Event()
+    result: Dict[str, object] = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            server = loop.run_until_complete(LocalBusServer().serve(host, port, unix_path))
+            if unix_path:
+                result["url"] = f"unix://{unix_path}"
+            else:
+                result["url"] = "redis://%s:%d" % server.sockets[0].getsockname()[:2]
+        except Exception as e:
+            result["error"] = e
+            return
+        finally:
+            ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, name="local-bus-server", daemon=True).start()
+    if not ready.wait(5):
+        raise BusError("로컬 메시지 버스 서버가 5초 안에 시작되지 않았습니다.")
+    if "error" in result:
+        raise BusError(f"로컬 메시지 버스 서버를 시작할 수 없습니다: {result['error']}") from result["error"]
+    return result["url"]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="메시지 버스 로컬 대역 서버 (Redis 프로토콜 일부)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    parser.add_argument("--unix", help="TCP 대신 사용할 유닉스 소켓 경로")
+    args = parser.parse_args()
+
+    server = await LocalBusServer().serve(args.host, args.port, args.unix)
+    address = f"unix://{args.unix}" if args.unix else f"redis://{args.host}:{args.port}"
+    print(f"메시지 버스 로컬 대역 서버 실행 중: {address}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,644 @@
+"""
+통화(상담 세션)별 전사 기록과 위험도 시계열 저장소
+
+- 전사 기록은 추가만 하는 로그이며, 요약/스크립트 생성은 클라이언트가 전체 텍스트를 다시
+  보내지 않아도 call_id로 저장된 기록을 사용할 수 있습니다.
+- 위험도 시계열은 항목마다 dict를 만들지 않고 타입 배열(array)에 열 단위로 보관합니다.
+- SQLite에는 쓰기를 모아 두었다가 일정 개수/주기마다 한 트랜잭션으로 기록합니다.
+- 최근 사용한 세션만 메모리에 두고, 나머지는 필요할 때 SQLite에서 다시 불러옵니다.
+  웹소켓이 연결되어 있는 세션은 메모리에서 내보내지 않습니다.
+- 전사 번호(seq)는 기록할 때 SQLite가 통화별로 정합니다. 여러 워커(또는 같은 통화의 세션 객체
+  둘)가 같은 통화에 쓰더라도 번호가 겹쳐 행이 버려지지 않으며, 기록 전까지 메모리의 번호는 임시값입니다.
+- 기록이 실패하면(다른 워커와의 잠금 경합 등) 모아 둔 쓰기를 대기열 앞에 되돌리고 백오프 후 다시 시도합니다.
+- 전사 전문이 저장되므로 retention_days(SESSION_RETENTION_DAYS)가 지난 통화는 주기적으로 삭제합니다.
+  (0이면 삭제하지 않고 계속 보관)
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+from metrics import CALL_SESSIONS, STAGE_SECONDS
+from resilience import backoff_delay
+from risk_lexicon import RISK_STAGES
+
+logger = logging.getLogger(__name__)
+
+# 최근 항목과 같은 텍스트는 중복으로 보고 기록하지 않음 (음성/텍스트 경로가 같은 발화를 보낼 때)
+DUPLICATE_LOOKBACK = 3
+# 메모리에 최근 흥분도가 없을 때 (다른 워커가 기록한) SQLite 값을 다시 확인하는 최소 간격(초)
+AGITATION_POLL_INTERVAL = 1.0
+# 기록 실패 후 재시도 대기 시간 상한(초)과 보관 기간이 지난 통화 삭제 주기(초)
+MAX_FLUSH_RETRY_DELAY = 30.0
+PURGE_INTERVAL = 3600.0
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS calls ("
+    "call_id TEXT PRIMARY KEY, created_at REAL NOT NULL, updated_at REAL NOT NULL, "
+    "summary TEXT, summary_seq INTEGER NOT NULL DEFAULT 0, "
+    "script TEXT, script_seq INTEGER NOT NULL DEFAULT 0)",
+    "CREATE TABLE IF NOT EXISTS transcript ("
+    "call_id TEXT NOT NULL, seq INTEGER NOT NULL, timestamp REAL NOT NULL, "
+    "source TEXT NOT NULL, text TEXT NOT NULL, PRIMARY KEY (call_id, seq))",
+    "CREATE TABLE IF NOT EXISTS risk_timeline ("
+    "call_id TEXT NOT NULL, timestamp REAL NOT NULL, risk_level INTEGER NOT NULL, "
+    "stage INTEGER NOT NULL, chunk_id INTEGER NOT NULL, provisional INTEGER NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS risk_timeline_call ON risk_timeline (call_id, timestamp)",
+    "CREATE TABLE IF NOT EXISTS call_agitation ("
+    "call_id TEXT PRIMARY KEY, agitation REAL NOT NULL, updated_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS calls_updated ON calls (updated_at)",
+)
+# 보관 기간이 지난 통화의 행 삭제 (calls는 마지막에 삭제)
+_PURGE = tuple(
+    f"DELETE FROM {table} WHERE call_id IN (SELECT call_id FROM calls WHERE updated_at < ?)"
+    for table in ("transcript", "risk_timeline", "call_agitation")
+) + ("DELETE FROM calls WHERE updated_at < ?",)
+
+# 같은 통화의 다른 세션 객체(다른 워커)가 더 최근 전사까지 반영한 요약/스크립트는 덮어쓰지 않음
+_UPSERT_CALL = (
+    "INSERT INTO calls (call_id, created_at, updated_at, summary, summary_seq, script, script_seq) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(call_id) DO UPDATE SET "
+    "updated_at = MAX(updated_at, excluded.updated_at), "
+    "summary = CASE WHEN excluded.summary_seq >= summary_seq THEN excluded.summary ELSE summary END, "
+    "summary_seq = MAX(summary_seq, excluded.summary_seq), "
+    "script = CASE WHEN excluded.script_seq >= script_seq THEN excluded.script ELSE script END, "
+    "script_seq = MAX(script_seq, excluded.script_seq)"
+)
+# 통화별 다음 번호를 쓰기 트랜잭션 안에서 정하고 돌려받음
+_INSERT_TRANSCRIPT = (
+    "INSERT INTO transcript (call_id, seq, timestamp, source, text) "
+    "SELECT ?, COALESCE(MAX(seq), 0) + 1, ?, ?, ? FROM transcript WHERE call_id = ? RETURNING seq"
+)
+_INSERT_RISK = (
+    "INSERT INTO risk_timeline (call_id, timestamp, risk_level, stage, chunk_id, provisional) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+_UPSERT_AGITATION = (
+    "INSERT INTO call_agitation (call_id, agitation, updated_at) VALUES (?, ?, ?) "
+    "ON CONFLICT(call_id) DO UPDATE SET agitation = excluded.agitation, updated_at = excluded.updated_at"
+)
+
+
+def _chunk_number(chunk_id) -> int:
+    # 클라이언트가 정하는 chunk_id는 숫자가 아닐 수도 있음 (시계열에는 64비트 정수만 보관, 아니면 0)
+    try:
+        number = int(chunk_id or 0)
+    except (TypeError, ValueError, OverflowError):
+        return 0
+    return number if -(1 << 63) <= number < 1 << 63 else 0
+
+
+class TranscriptEntry:
+    __slots__ = ("seq", "timestamp", "source", "text")
+
+    def __init__(self, seq: int, timestamp: float, source: str, text: str):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.source = source
+        self.text = text
+
+    def as_dict(self) -> Dict:
+        return {"seq": self.seq, "timestamp": self.timestamp, "source": self.source, "text": self.text}
+
+
+class RiskTimeline:
+    """
+    위험도 시계열 (시각, 위험도, 단계, 청크 ID, 잠정 여부를 열별 타입 배열로 보관)
+    """
+
+    __slots__ = ("timestamps", "levels", "stages", "chunk_ids", "provisional")
+
+    def __init__(self):
+        self.timestamps = array("d")
+        self.levels = array("B")
+        self.stages = array("B")
+        self.chunk_ids = array("q")
+        self.provisional = array("B")
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def append(self, timestamp: float, risk_level: int, stage: int, chunk_id: int, provisional: bool):
+        self.timestamps.append(timestamp)
+        self.levels.append(max(0, min(100, int(risk_level))))
+        self.stages.append(stage)
+        self.chunk_ids.append(chunk_id)
+        self.provisional.append(1 if provisional else 0)
+
+    def peak(self) -> int:
+        return max(self.levels) if self.levels else 0
+
+    def as_dict(self, limit: Optional[int] = None) -> Dict:
+        start = max(0, len(self) - limit) if limit else 0
+        return {
+            "timestamps": self.timestamps[start:].tolist(),
+            "risk_levels": self.levels[start:].tolist(),
+            "risk_stages": [RISK_STAGES[stage] for stage in self.stages[start:]],
+            "chunk_ids": self.chunk_ids[start:].tolist(),
+            "provisional": [bool(flag) for flag in self.provisional[start:]],
+        }
+
+
+class CallSession:
+    """
+    통화 하나의 전사 기록, 위험도 시계열과 마지막 요약/스크립트
+    """
+
+    __slots__ = (
+        "call_id", "created_at", "updated_at", "transcript", "timeline",
+        "summary", "summary_seq", "script", "script_seq", "agitation", "agitation_at", "agitation_checked",
+        "connections", "_store",
+    )
+
+    def __init__(self, call_id: str, store: "CallStore", created_at: Optional[float] = None):
+        self.call_id = call_id
+        self.created_at = created_at or time.time()
+        self.updated_at = self.created_at
+        self.transcript: List[TranscriptEntry] = []
+        self.timeline = RiskTimeline()
+        self.summary: Optional[str] = None
+        self.summary_seq = 0
+        self.script: Optional[str] = None
+        self.script_seq = 0
+        # 음성 스트림의 최근 흥분도 (다른 워커와 공유하도록 SQLite에 기록)
+        self.agitation: Optional[float] = None
+        self.agitation_at = 0.0
+        self.agitation_checked = 0.0
+        # 이 세션을 사용 중인 웹소켓 수 (0보다 크면 메모리에서 내보내지 않음)
+        self.connections = 0
+        self._store = store
+
+    @property
+    def last_seq(self) -> int:
+        return self.transcript[-1].seq if self.transcript else 0
+
+    @property
+    def last_entry(self) -> Optional[TranscriptEntry]:
+        return self.transcript[-1] if self.transcript else None
+
+    def append_transcript(self, text: str, source: str, persist: bool = True) -> Optional[TranscriptEntry]:
+        """
+        전사 기록에 텍스트를 추가합니다. 비어 있거나 최근 항목과 같으면 추가하지 않습니다.
+
+        persist=False는 다른 워커가 이미 기록한 전사를 메모리에만 반영할 때 사용합니다.
+        """
+        text = text.strip()
+        if not text or any(entry.text == text for entry in self.transcript[-DUPLICATE_LOOKBACK:]):
+            return None
+        # 저장소가 있으면 기록할 때 SQLite가 정한 번호로 바뀜 (assign_seqs)
+        entry = TranscriptEntry(self.last_seq + 1, time.time(), source, text)
+        self.transcript.append(entry)
+        self.updated_at = entry.timestamp
+        if persist:
+            self._store.enqueue_transcript(self, entry)
+            self._store.mark_dirty(self)
+        return entry
+
+    def assign_seqs(self, assigned: Dict[int, int]) -> bool:
+        """
+        기록된 항목(id(entry) -> seq)의 번호를 SQLite가 정한 번호로 바꿉니다.
+
+        뒤따르는 아직 기록되지 않은 항목은 순서가 유지되도록 임시 번호를 밀고,
+        바뀐 번호를 가리키던 summary_seq/script_seq도 함께 옮기고, 옮겼으면 True를 반환합니다.
+        """
+        moved: Dict[int, int] = {}
+        previous = 0
+        for entry in self.transcript:
+            seq = assigned.get(id(entry))
+            if seq is None:
+                seq = max(entry.seq, previous + 1)
+            if seq != entry.seq:
+                moved[entry.seq] = seq
+                entry.seq = seq
+            previous = seq
+        if self.summary_seq not in moved and self.script_seq not in moved:
+            return False
+        self.summary_seq = moved.get(self.summary_seq, self.summary_seq)
+        self.script_seq = moved.get(self.script_seq, self.script_seq)
+        return True
+
+    def update_agitation(self, agitation: float):
+        self.agitation = agitation
+        self.agitation_at = time.time()
+        self._store.enqueue_agitation(self)
+
+    def recent_agitation(self, max_age: float) -> Optional[float]:
+        """
+        max_age초 안에 들어온 음성 흥분도 (없으면 None)
+        """
+        if self.agitation is None or time.time() - self.agitation_at > max_age:
+            return None
+        return self.agitation
+
+    def record_risk(self, result: Dict):
+        """
+        risk_analysis 메시지(잠정/최종)를 위험도 시계열에 추가합니다.
+        """
+        now = time.time()
+        stage = RISK_STAGES.index(result["risk_stage"]) if result.get("risk_stage") in RISK_STAGES else 0
+        chunk_id = _chunk_number(result.get("chunk_id"))
+        provisional = bool(result.get("provisional"))
+        risk_level = int(result.get("risk_level") or 0)
+        self.timeline.append(now, risk_level, stage, chunk_id, provisional)
+        self.updated_at = now
+        self._store.enqueue(_INSERT_RISK, (self.call_id, now, risk_level, stage, chunk_id, int(provisional)))
+        self._store.mark_dirty(self)
+
+    def save_result(self, kind: str, value: str, upto: Optional[TranscriptEntry]):
+        """
+        전사 기록 upto 항목까지를 반영한 요약(summary)/스크립트(script)를 저장합니다.
+
+        번호가 기록 중에 바뀔 수 있으므로 번호 대신 항목을 받아 저장 시점의 번호를 사용합니다.
+        """
+        seq = upto.seq if upto is not None else 0
+        if kind == "summary":
+            self.summary, self.summary_seq = value, seq
+        else:
+            self.script, self.script_seq = value, seq
+        self.updated_at = time.time()
+        self._store.mark_dirty(self)
+
+    def transcript_text(self, after_seq: int = 0) -> str:
+        return " ".join(entry.text for entry in self.transcript if entry.seq > after_seq)
+
+    def as_row(self) -> Tuple:
+        return (
+            self.call_id, self.created_at, self.updated_at,
+            self.summary, self.summary_seq, self.script, self.script_seq,
+        )
+
+    def as_dict(self, timeline_limit: Optional[int] = None) -> Dict:
+        return {
+            "call_id": self.call_id,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "transcript": [entry.as_dict() for entry in self.transcript],
+            "risk_timeline": self.timeline.as_dict(timeline_limit),
+            "peak_risk_level": self.timeline.peak(),
+            "summary": self.summary,
+            "summary_seq": self.summary_seq,
+            "script": self.script,
+            "script_seq": self.script_seq,
+        }
+
+
+class CallStore:
+    """
+    통화 세션 저장소
+
+    db_path가 없으면 메모리에만 보관하며, 메모리에서 밀려난 세션은 사라집니다.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        max_active: int = 1000,
+        batch_size: int = 256,
+        flush_interval: float = 1.0,
+        retention_days: float = 0,
+    ):
+        self.max_active = max_active
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self._sessions: "OrderedDict[str, CallSession]" = OrderedDict()
+
+        # 기록 대기 중인 전사 항목, 행 (SQL별), 갱신할 세션과 흥분도
+        self._transcript: List[Tuple[CallSession, TranscriptEntry]] = []
+        self._pending: Dict[str, List[Tuple]] = {_INSERT_RISK: []}
+        self._pending_rows = 0
+        self._dirty: Dict[str, CallSession] = {}
+        self._agitation: Dict[str, Tuple] = {}
+        self._flush_requested: Optional[asyncio.Event] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = threading.Lock()
+        # 주기적 기록과 load()의 기록이 겹쳐 트랜잭션 순서(= 전사 번호 순서)가 바뀌지 않도록 직렬화
+        self._flushing = asyncio.Lock()
+        self._flush_failures = 0
+        self._purged_at = 0.0
+
+        self._conn: Optional[sqlite3.Connection] = None
+        if db_path:
+            # 쓰기 트랜잭션을 처음부터 잠가 다른 워커와 같은 전사 번호를 정하지 않도록 함
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level="IMMEDIATE")
+            # 여러 워커가 같은 파일을 쓰더라도 읽기가 쓰기를 막지 않도록 WAL 사용
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in _SCHEMA:
+                self._conn.execute(statement)
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def persistent(self) -> bool:
+        return self._conn is not None
+
+    def enqueue(self, sql: str, row: Tuple):
+        if self._conn is None:
+            return
+        self._pending[sql].append(row)
+        self._pending_rows += 1
+        if self._pending_rows >= self.batch_size and self._flush_requested is not None:
+            self._flush_requested.set()
+
+    def enqueue_transcript(self, session: CallSession, entry: TranscriptEntry):
+        if self._conn is None:
+            return
+        self._transcript.append((session, entry))
+        self._pending_rows += 1
+        if self._pending_rows >= self.batch_size and self._flush_requested is not None:
+            self._flush_requested.set()
+
+    def enqueue_agitation(self, session: CallSession):
+        # 통화별 마지막 값만 기록
+        if self._conn is not None:
+            self._agitation[session.call_id] = (session.call_id, session.agitation, session.agitation_at)
+
+    def mark_dirty(self, session: CallSession):
+        if self._conn is not None:
+            self._dirty[session.call_id] = session
+
+    def _remember(self, session: CallSession):
+        self._sessions[session.call_id] = session
+        self._sessions.move_to_end(session.call_id)
+        while len(self._sessions) > self.max_active:
+            # 연결이 없는 세션 중 가장 오래 사용하지 않은 것을 내보냄 (모두 연결 중이면 그대로 둠)
+            idle = next((call_id for call_id, item in self._sessions.items() if not item.connections), None)
+            if idle is None:
+                break
+            del self._sessions[idle]
+
+    async def get_or_create(self, call_id: Optional[str] = None) -> CallSession:
+        """
+        call_id의 세션을 반환합니다. 없으면(또는 call_id가 없으면) 새로 만듭니다.
+        """
+        if call_id:
+            session = await self.load(call_id)
+            if session is not None:
+                return session
+        session = CallSession(call_id or uuid.uuid4().hex, self)
+        self._remember(session)
+        self.mark_dirty(session)
+        return session
+
+    async def attach(self, call_id: Optional[str] = None) -> CallSession:
+        """
+        웹소켓이 사용할 세션을 반환합니다. detach를 호출할 때까지 메모리에서 내보내지 않습니다.
+        """
+        session = await self.get_or_create(call_id)
+        session.connections += 1
+        return session
+
+    def detach(self, session: CallSession):
+        session.connections = max(0, session.connections - 1)
+
+    def apply_event(self, call_id: str, event: Dict) -> Optional[CallSession]:
+        """
+        다른 워커가 알린 통화 변경(확정 전사, 음성 흥분도)을 메모리의 세션에 반영합니다.
+
+        SQLite 기록은 알린 워커가 하므로 여기서는 기록하지 않고, 이 워커가 들고 있지 않은
+        통화는 무시합니다. (필요할 때 SQLite에서 불러옴)
+        """
+        session = self._sessions.get(call_id)
+        if session is None:
+            return None
+        kind = event.get("type")
+        if kind == "transcript":
+            session.append_transcript(event.get("text", ""), event.get("source", "stt"), persist=False)
+        elif kind == "agitation" and event.get("at", 0.0) > session.agitation_at:
+            session.agitation, session.agitation_at = event["agitation"], event["at"]
+        return session
+
+    async def recent_agitation(self, session: CallSession, max_age: float) -> Optional[float]:
+        """
+        max_age초 안에 들어온 음성 흥분도
+
+        음성 스트림이 다른 워커에 연결되어 있을 수 있으므로 메모리에 최근 값이 없으면
+        SQLite에 기록된 값을 (AGITATION_POLL_INTERVAL초에 한 번) 확인합니다.
+        """
+        agitation = session.recent_agitation(max_age)
+        if agitation is not None or self._conn is None:
+            return agitation
+        now = time.time()
+        if now - session.agitation_checked < AGITATION_POLL_INTERVAL:
+            return None
+        session.agitation_checked = now
+        row = await asyncio.to_thread(self._read_agitation, session.call_id)
+        if row is not None and row[1] > session.agitation_at:
+            session.agitation, session.agitation_at = row
+        return session.recent_agitation(max_age)
+
+    def _read_agitation(self, call_id: str) -> Optional[Tuple[float, float]]:
+        with self._flush_lock:
+            return self._conn.execute(
+                "SELECT agitation, updated_at FROM call_agitation WHERE call_id = ?", (call_id,)
+            ).fetchone()
+
+    async def load(self, call_id: str) -> Optional[CallSession]:
+        session = self._sessions.get(call_id)
+        if session is not None:
+            self._sessions.move_to_end(call_id)
+            return session
+        if self._conn is None:
+            return None
+        # 아직 기록하지 않은 행이 있으면 먼저 기록한 뒤 불러옴
+        await self.flush()
+        session = await asyncio.to_thread(self._read_session, call_id)
+        if session is not None:
+            # 불러오는 동안 다른 요청이 먼저 만들었으면 그것을 사용
+            session = self._sessions.get(call_id, session)
+            self._remember(session)
+        return session
+
+    def _read_session(self, call_id: str) -> Optional[CallSession]:
+        with self._flush_lock:
+            row = self._conn.execute(
+                "SELECT created_at, updated_at, summary, summary_seq, script, script_seq FROM calls WHERE call_id = ?",
+                (call_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            transcript = self._conn.execute(
+                "SELECT seq, timestamp, source, text FROM transcript WHERE call_id = ? ORDER BY seq", (call_id,)
+            ).fetchall()
+            risks = self._conn.execute(
+                "SELECT timestamp, risk_level, stage, chunk_id, provisional FROM risk_timeline "
+                "WHERE call_id = ? ORDER BY timestamp",
+                (call_id,),
+            ).fetchall()
+
+        session = CallSession(call_id, self, created_at=row[0])
+        session.updated_at, session.summary, session.summary_seq, session.script, session.script_seq = row[1:]
+        session.transcript = [TranscriptEntry(*entry) for entry in transcript]
+        for timestamp, risk_level, stage, chunk_id, provisional in risks:
+            session.timeline.append(timestamp, risk_level, stage, chunk_id, bool(provisional))
+        return session
+
+    def _write_batch(self, calls: List[Tuple], transcript: List[Tuple], pending: Dict[str, List[Tuple]]) -> List[int]:
+        with self._flush_lock:
+            with self._conn:
+                if calls:
+                    self._conn.executemany(_UPSERT_CALL, calls)
+                seqs = [self._conn.execute(_INSERT_TRANSCRIPT, row).fetchone()[0] for row in transcript]
+                for sql, rows in pending.items():
+                    if rows:
+                        self._conn.executemany(sql, rows)
+        return seqs
+
+    async def flush(self) -> bool:
+        """
+        모아 둔 쓰기를 한 트랜잭션으로 기록합니다. 실패하면 쓰기를 대기열에 되돌리고 False를 반환합니다.
+        """
+        async with self._flushing:
+            return await self._flush()
+
+    def _requeue(
+        self,
+        entries: List[Tuple[CallSession, TranscriptEntry]],
+        risks: List[Tuple],
+        dirty: Dict[str, CallSession],
+        agitation: Dict[str, Tuple],
+    ):
+        # 실패한 쓰기를 그 뒤에 쌓인 쓰기보다 앞에 두어 기록 순서를 유지 (흥분도는 더 최근 값을 우선)
+        self._transcript = entries + self._transcript
+        self._pending[_INSERT_RISK] = risks + self._pending[_INSERT_RISK]
+        self._pending_rows += len(entries) + len(risks)
+        self._dirty = {**dirty, **self._dirty}
+        self._agitation = {**agitation, **self._agitation}
+
+    async def _flush(self) -> bool:
+        if self._conn is None or not (self._pending_rows or self._dirty or self._agitation):
+            return True
+        dirty, agitation = self._dirty, self._agitation
+        calls = [session.as_row() for session in self._dirty.values()]
+        entries = self._transcript
+        transcript = [
+            (session.call_id, entry.timestamp, entry.source, entry.text, session.call_id) for session, entry in entries
+        ]
+        pending = self._pending
+        pending[_UPSERT_AGITATION] = list(self._agitation.values())
+        self._transcript = []
+        self._pending = {_INSERT_RISK: []}
+        self._pending_rows = 0
+        self._dirty = {}
+        self._agitation = {}
+        try:
+            with STAGE_SECONDS.time(stage="store_flush"):
+                seqs = await asyncio.to_thread(self._write_batch, calls, transcript, pending)
+        except Exception as e:
+            rows = len(transcript) + sum(len(rows) for rows in pending.values())
+            self._flush_failures += 1
+            logger.error(f"상담 세션 저장 실패, 다시 시도합니다 (행 {rows}개, {self._flush_failures}번째): {e}")
+            self._requeue(entries, pending[_INSERT_RISK], dirty, agitation)
+            return False
+        self._flush_failures = 0
+        # SQLite가 정한 전사 번호를 메모리의 항목에 반영
+        assigned: Dict[str, Tuple[CallSession, Dict[int, int]]] = {}
+        for (session, entry), seq in zip(entries, seqs):
+            assigned.setdefault(session.call_id, (session, {}))[1][id(entry)] = seq
+        moved = [session for session, seqs_by_entry in assigned.values() if session.assign_seqs(seqs_by_entry)]
+        if moved:
+            # 방금 기록한 요약/스크립트 위치가 임시 번호였으면 바로 고쳐 기록 (실패하면 다음 기록에 포함)
+            try:
+                await asyncio.to_thread(self._write_batch, [session.as_row() for session in moved], [], {})
+            except Exception as e:
+                logger.error(f"상담 세션 저장 실패 (세션 {len(moved)}개): {e}")
+                for session in moved:
+                    self.mark_dirty(session)
+        return True
+
+    def _purge_rows(self, cutoff: float) -> List[str]:
+        with self._flush_lock:
+            with self._conn:
+                expired = [row[0] for row in self._conn.execute("SELECT call_id FROM calls WHERE updated_at < ?", (cutoff,))]
+                if expired:
+                    for statement in _PURGE:
+                        self._conn.execute(statement, (cutoff,))
+        return expired
+
+    async def purge(self) -> int:
+        """
+        retention_days보다 오래 갱신되지 않은 통화를 SQLite와 메모리에서 삭제하고 삭제한 통화 수를 반환합니다.
+        """
+        if self._conn is None or self.retention_days <= 0:
+            return 0
+        self._purged_at = time.time()
+        cutoff = self._purged_at - self.retention_days * 86400
+        async with self._flushing:
+            expired = await asyncio.to_thread(self._purge_rows, cutoff)
+        for call_id in expired:
+            session = self._sessions.get(call_id)
+            if session is not None and not session.connections and session.updated_at < cutoff:
+                del self._sessions[call_id]
+        if expired:
+            logger.info(f"보관 기간({self.retention_days:g}일)이 지난 통화 {len(expired)}건 삭제")
+        return len(expired)
+
+    async def _flush_loop(self):
+        while True:
+            if self._flush_failures:
+                # 기록 실패(잠금 경합 등) 뒤에는 지수 백오프로 다시 시도
+                await asyncio.sleep(
+                    self.flush_interval + backoff_delay(self._flush_failures - 1, self.flush_interval, MAX_FLUSH_RETRY_DELAY)
+                )
+            else:
+                try:
+                    await asyncio.wait_for(self._flush_requested.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._flush_requested.clear()
+            await self.flush()
+            if self.retention_days > 0 and time.time() - self._purged_at >= PURGE_INTERVAL:
+                try:
+                    await self.purge()
+                except Exception as e:
+                    logger.error(f"보관 기간이 지난 통화 삭제 실패: {e}")
+
+    def start(self):
+        if self._conn is not None and (self._flush_task is None or self._flush_task.done()):
+            self._flush_requested = asyncio.Event()
+            self._flushing = asyncio.Lock()
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """
+        주기적 기록을 멈추고 남은 쓰기를 기록합니다.
+        """
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        self._flush_task = None
+        self._flush_requested = None
+        for attempt in range(3):
+            if await self.flush():
+                return
+            await asyncio.sleep(backoff_delay(attempt, self.flush_interval, MAX_FLUSH_RETRY_DELAY))
+        logger.error(f"종료 전에 기록하지 못한 상담 세션 쓰기가 있습니다 (행 {self._pending_rows}개)")
+
+    def close(self):
+        if self._conn is not None:
+            with self._flush_lock:
+                self._conn.close()
+            self._conn = None
+
+
+call_store = CallStore(
+    db_path=settings.SESSION_DB_PATH or None,
+    max_active=settings.SESSION_MAX_ACTIVE,
+    batch_size=settings.SESSION_BATCH_SIZE,
+    flush_interval=settings.SESSION_FLUSH_INTERVAL,
+    retention_days=settings.SESSION_RETENTION_DAYS,
+)
+CALL_SESSIONS.set_function(lambda: len(call_store))
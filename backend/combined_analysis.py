@@ -0,0 +1,100 @@
+"""
+위험도/요약/스크립트 통합 분석
+
+한 번의 모델 호출로 세 섹션을 순서대로 생성하고, 토큰 스트림에서 섹션이
+완성되는 즉시 내보냅니다. (위험도 → 요약 → 스크립트)
+"""
+
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from inference import inference
+from prompts import COMBINED_ANALYSIS_SYSTEM_PROMPT
+from risk_analysis import parse_realtime_risk
+from risk_lexicon import RiskPrescreener
+
+SECTIONS = ["risk", "summary", "script"]
+
+
+class SectionStreamParser:
+    """
+    [RISK], [SUMMARY], [SCRIPT] 구분자로 나뉜 토큰 스트림을 섹션 단위로 분리합니다.
+
+    다음 구분자가 나타나면 현재 섹션이 완성된 것으로 보고 반환합니다.
+    """
+
+    def __init__(self, sections: List[str]):
+        self._markers = {f"[{name.upper()}]": name for name in sections}
+        self._buffer = ""
+        self._current: Optional[str] = None
+
+    def feed(self, delta: str) -> List[Tuple[str, str]]:
+        self._buffer += delta
+        completed = []
+        while True:
+            found = None
+            for marker, name in self._markers.items():
+                index = self._buffer.find(marker)
+                if index != -1 and (found is None or index < found[0]):
+                    found = (index, marker, name)
+            if found is None:
+                return completed
+
+            index, marker, name = found
+            if self._current is not None:
+                completed.append((self._current, self._buffer[:index].strip()))
+            self._current = name
+            self._buffer = self._buffer[index + len(marker):]
+
+    def close(self) -> List[Tuple[str, str]]:
+        if self._current is None:
+            return []
+        completed = [(self._current, self._buffer.strip())]
+        self._current = None
+        self._buffer = ""
+        return completed
+
+
+def _build_section(name: str, content: str, fallback: Dict) -> Dict:
+    if name == "risk":
+        return {"section": "risk", "provisional": False, **parse_realtime_risk(content, fallback=fallback)}
+    return {"section": name, name: content}
+
+
+async def stream_combined_analysis(
+    text: str,
+    prescreener: RiskPrescreener,
+    session: Optional[str] = None,
+) -> AsyncIterator[Dict]:
+    """
+    섹션 결과를 완성되는 순서대로 내보냅니다.
+
+    모델 응답 전에 로컬 사전 점수화 결과를 잠정 위험도로 먼저 보냅니다.
+    session은 모델 호출 스케줄러의 '위험' 단계 승격에 사용할 통화 ID입니다.
+    """
+    prescreen = prescreener.score(text).as_result()
+    yield {"section": "risk", "provisional": True, **prescreen}
+
+    parser = SectionStreamParser(SECTIONS)
+    async for delta in inference.chat_stream(
+        model="gpt-3.5-turbo",
+        messages=[
+            {
+                "role": "system",
+                "content": COMBINED_ANALYSIS_SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": f"다음 고객 대화 내용을 분석해주세요: {text}"
+            }
+        ],
+        max_tokens=1200,
+        temperature=0.2,
+        session=session
+    ):
+        for name, content in parser.feed(delta):
+            yield _build_section(name, content, prescreen)
+
+    for name, content in parser.close():
+        yield _build_section(name, content, prescreen)
+
+    yield {"section": "done"}
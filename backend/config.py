@@ -9,12 +9,128 @@ class Settings:
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY")
     
     # API 키가 없으면 경고 메시지 출력
-    if not OPENAI_API_KEY:
+    if not OPENAI_API_KEY and os.getenv("MODEL_PROVIDER", "openai").lower() == "openai":
         print("⚠️  경고: OPENAI_API_KEY 환경 변수가 설정되지 않았습니다.")
         print("   .env 파일에 OPENAI_API_KEY=your_api_key_here 를 추가해주세요.")
         print("   또는 환경 변수로 설정해주세요.")
     
+    # 로깅: 큐 기반 비동기 출력, JSON 형식, 청크별 로그 샘플링/초당 제한, 상담 내용 가림
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json").lower()  # json | text
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    LOG_HOT_SAMPLE_RATE: float = float(os.getenv("LOG_HOT_SAMPLE_RATE", "0.05"))  # 청크별 로그 출력 비율
+    LOG_RATE_LIMIT: float = float(os.getenv("LOG_RATE_LIMIT", "20"))  # 이벤트별 초당 최대 로그 수
+    LOG_RATE_BURST: float = float(os.getenv("LOG_RATE_BURST", "50"))
+    LOG_REDACT_TRANSCRIPTS: bool = os.getenv("LOG_REDACT_TRANSCRIPTS", "true").lower() == "true"
+    
     UPLOAD_DIR: str = "uploads"
     MAX_FILE_SIZE: int = 50 * 1024 * 1024  # 50MB
+    
+    # 디버그용: 실시간 음성 청크를 업로드 디렉토리에 WAV 파일로 보존
+    DEBUG_SAVE_AUDIO_CHUNKS: bool = os.getenv("DEBUG_SAVE_AUDIO_CHUNKS", "false").lower() == "true"
+    
+    # 음성 구간 검출(VAD): 무음 청크는 Whisper로 보내지 않음
+    VAD_ENABLED: bool = os.getenv("VAD_ENABLED", "true").lower() == "true"
+    VAD_ENERGY_THRESHOLD_DB: float = float(os.getenv("VAD_ENERGY_THRESHOLD_DB", "-45"))  # dBFS
+    VAD_MIN_SPEECH_RATIO: float = float(os.getenv("VAD_MIN_SPEECH_RATIO", "0.1"))  # 음성 프레임 최소 비율
+    
+    # 음향 특징(음량/피치/말 속도/고함): 흥분도 신호 전송 최소 간격(초), 텍스트 위험도와 결합할 때 가중치
+    ACOUSTIC_ENABLED: bool = os.getenv("ACOUSTIC_ENABLED", "true").lower() == "true"
+    ACOUSTIC_SEND_INTERVAL: float = float(os.getenv("ACOUSTIC_SEND_INTERVAL", "0.2"))
+    ACOUSTIC_FUSION_WEIGHT: float = float(os.getenv("ACOUSTIC_FUSION_WEIGHT", "0.3"))
+    ACOUSTIC_MAX_AGE: float = float(os.getenv("ACOUSTIC_MAX_AGE", "10"))  # 이보다 오래된 흥분도는 결합하지 않음
+    
+    # 음성 프레임: 순서가 바뀐 프레임을 기다리는 최대 프레임 수, 유실 구간 무음 채움 최대 길이(초)
+    AUDIO_REORDER_WINDOW: int = int(os.getenv("AUDIO_REORDER_WINDOW", "4"))
+    AUDIO_MAX_GAP_FILL_SECONDS: float = float(os.getenv("AUDIO_MAX_GAP_FILL_SECONDS", "1.0"))
+    
+    # 슬라이딩 윈도우 전사: 청크마다 최근 윈도우를 겹쳐서 전사
+    STREAM_WINDOW_SECONDS: float = float(os.getenv("STREAM_WINDOW_SECONDS", "6"))
+    STREAM_BUFFER_SECONDS: float = float(os.getenv("STREAM_BUFFER_SECONDS", "30"))  # 링 버퍼 용량
+    
+    # 웹소켓 송신 큐와 하트비트
+    WS_SEND_QUEUE_SIZE: int = int(os.getenv("WS_SEND_QUEUE_SIZE", "512"))  # 연결별 최대 대기 메시지 수
+    WS_SEND_TIMEOUT: float = float(os.getenv("WS_SEND_TIMEOUT", "5"))  # 메시지 하나의 전송 제한 시간(초)
+    WS_HEARTBEAT_INTERVAL: float = float(os.getenv("WS_HEARTBEAT_INTERVAL", "20"))  # 수신이 없으면 ping 전송
+    WS_IDLE_TIMEOUT: float = float(os.getenv("WS_IDLE_TIMEOUT", "60"))  # 수신이 없으면 연결 종료 (0이면 사용 안 함, 음성 스트림은 제외)
+    
+    # 다중 워커: 워커 간 브로드캐스트와 세션 목록은 메시지 버스로 공유
+    WORKERS: int = int(os.getenv("WORKERS", "1"))  # python main.py 실행 시 uvicorn 워커 수
+    BUS_URL: str = os.getenv("BUS_URL", "")  # redis://호스트:포트 | unix:///소켓경로 (비어 있으면 프로세스 내부 버스)
+    
+    # 통화 세션 저장소: 통화별 전사 기록과 위험도 시계열 (SQLite, 비어 있으면 메모리에만 보관)
+    SESSION_DB_PATH: str = os.getenv("SESSION_DB_PATH", "sessions.db")
+    SESSION_MAX_ACTIVE: int = int(os.getenv("SESSION_MAX_ACTIVE", "1000"))  # 메모리에 유지할 최대 세션 수
+    SESSION_BATCH_SIZE: int = int(os.getenv("SESSION_BATCH_SIZE", "256"))  # 이만큼 쌓이면 바로 기록
+    SESSION_FLUSH_INTERVAL: float = float(os.getenv("SESSION_FLUSH_INTERVAL", "1.0"))  # 기록 주기(초)
+    SESSION_RETENTION_DAYS: float = float(os.getenv("SESSION_RETENTION_DAYS", "30"))  # 전사 보관 기간(일), 지나면 삭제 (0이면 계속 보관)
+    
+    # 통화 요약: 이전 요약에 새 전사만 합치는 증분 요약, 긴 텍스트는 구간별 요약 후 합침(map-reduce)
+    SUMMARY_DIRECT_MAX_CHARS: int = int(os.getenv("SUMMARY_DIRECT_MAX_CHARS", "4000"))  # 이보다 길면 구간별 요약
+    SUMMARY_SEGMENT_CHARS: int = int(os.getenv("SUMMARY_SEGMENT_CHARS", "2000"))  # 구간 길이
+    SUMMARY_FAN_IN: int = int(os.getenv("SUMMARY_FAN_IN", "4"))  # 한 번에 합칠 구간 요약 수
+    SUMMARY_ROLLING_TRIGGER_CHARS: int = int(os.getenv("SUMMARY_ROLLING_TRIGGER_CHARS", "1500"))  # 미리 요약 (0이면 사용 안 함)
+    SUMMARY_DIRECT_MAX_TOKENS: int = int(os.getenv("SUMMARY_DIRECT_MAX_TOKENS", "3000"))  # 토큰 수로도 제한
+    
+    # 모델 입력 토큰 예산: 반복된 전사 조각은 항상 제거, 예산을 넘으면 위험도는 최근 발화 위주로 자르고
+    # 스크립트는 앞부분을 요약으로 압축 (0이면 제한 없음)
+    RISK_INPUT_TOKEN_BUDGET: int = int(os.getenv("RISK_INPUT_TOKEN_BUDGET", "1500"))
+    SCRIPT_INPUT_TOKEN_BUDGET: int = int(os.getenv("SCRIPT_INPUT_TOKEN_BUDGET", "3000"))
+    
+    # 실시간 위험도 분석: 세션별 최소 호출 간격(초)
+    REALTIME_ANALYSIS_MIN_INTERVAL: float = float(os.getenv("REALTIME_ANALYSIS_MIN_INTERVAL", "0.5"))
+    
+    # 로컬 위험 어휘 사전 점수화: 실시간 청크와 배치는 임계값 이상이거나 샘플링된 텍스트만 LLM으로 전달
+    # (/analyze-risk는 사전 점수와 관계없이 항상 LLM으로 분석)
+    RISK_LEXICON_PATH: str = os.getenv("RISK_LEXICON_PATH", "")  # 비어 있으면 기본 사전 사용
+    PRESCREEN_ESCALATE_THRESHOLD: int = int(os.getenv("PRESCREEN_ESCALATE_THRESHOLD", "10"))  # 어휘 하나(분노)만 있어도 전달
+    PRESCREEN_SAMPLE_RATE: float = float(os.getenv("PRESCREEN_SAMPLE_RATE", "0.1"))  # 임계값 미만 텍스트 중 전달할 비율
+    
+    # 응답 캐시 (/summarize, /generate-script, /analyze-risk)
+    CACHE_ENABLED: bool = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+    CACHE_TTL_SECONDS: float = float(os.getenv("CACHE_TTL_SECONDS", "3600"))
+    CACHE_DB_PATH: str = os.getenv("CACHE_DB_PATH", "")  # 지정하면 SQLite 디스크 캐시 사용
+
+    # 모델 제공자: openai (OpenAI 또는 OPENAI_BASE_URL의 호환 서버) | local (오프라인 로컬 대역)
+    MODEL_PROVIDER: str = os.getenv("MODEL_PROVIDER", "openai").lower()
+    OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL", "")
+    
+    # 로컬 대역 제공자: 지연 시간(초)과 장애 주입 비율
+    LOCAL_STT_LATENCY: float = float(os.getenv("LOCAL_STT_LATENCY", "0.3"))
+    LOCAL_CHAT_LATENCY: float = float(os.getenv("LOCAL_CHAT_LATENCY", "0.5"))  # 첫 토큰까지
+    LOCAL_TOKEN_INTERVAL: float = float(os.getenv("LOCAL_TOKEN_INTERVAL", "0.02"))  # 스트리밍 토큰 간격
+    LOCAL_LATENCY_JITTER: float = float(os.getenv("LOCAL_LATENCY_JITTER", "0.2"))  # 지연 시간 변동 비율(±)
+    LOCAL_ERROR_RATE: float = float(os.getenv("LOCAL_ERROR_RATE", "0"))
+    LOCAL_SEED: int = int(os.getenv("LOCAL_SEED", "0"))
+    
+    # 모델 호출 설정
+    OPENAI_TIMEOUT: float = float(os.getenv("OPENAI_TIMEOUT", "30"))  # 요청별 타임아웃(초)
+    OPENAI_MAX_RETRIES: int = int(os.getenv("OPENAI_MAX_RETRIES", "2"))  # 일시적 오류 재시도 횟수 (지수 백오프 + 지터)
+    MODEL_RETRY_BASE_DELAY: float = float(os.getenv("MODEL_RETRY_BASE_DELAY", "0.2"))  # 첫 재시도 최대 대기(초)
+    MODEL_REALTIME_TIMEOUT: float = float(os.getenv("MODEL_REALTIME_TIMEOUT", "8"))  # 실시간 위험도/전사 시도별 타임아웃(초)
+    MODEL_REALTIME_DEADLINE: float = float(os.getenv("MODEL_REALTIME_DEADLINE", "12"))  # 실시간 호출 전체 제한 시간(재시도 포함)
+    MODEL_DEADLINE: float = float(os.getenv("MODEL_DEADLINE", "90"))  # 그 외 호출 전체 제한 시간(재시도 포함)
+    MODEL_HEDGE_ENABLED: bool = os.getenv("MODEL_HEDGE_ENABLED", "true").lower() == "true"  # 실시간 호출이 p95보다 늦으면 중복 요청
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))  # 연속 실패 시 회로 차단
+    CIRCUIT_RESET_SECONDS: float = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))  # 차단 후 시험 호출까지(초)
+    MODEL_MAX_CONCURRENCY: int = int(os.getenv("MODEL_MAX_CONCURRENCY", "16"))  # 동시 업스트림 호출 수
+    
+    # 모델 호출 스케줄러: 우선순위(위험도 > 전사 > 요약/스크립트 > 배치), 요청 한도, 대기 제한 시간
+    MODEL_RPM_LIMIT: float = float(os.getenv("MODEL_RPM_LIMIT", "0"))  # 채팅 분당 요청 수 (0이면 제한 없음, 워커 수로 나눔)
+    MODEL_TPM_LIMIT: float = float(os.getenv("MODEL_TPM_LIMIT", "0"))  # 채팅 분당 토큰 수
+    STT_RPM_LIMIT: float = float(os.getenv("STT_RPM_LIMIT", "0"))  # 음성 변환 분당 요청 수
+    SCHEDULER_RESERVED_SLOTS: int = int(os.getenv("SCHEDULER_RESERVED_SLOTS", "2"))  # 실시간 처리 전용 동시 호출 슬롯
+    SCHEDULER_MAX_QUEUE: int = int(os.getenv("SCHEDULER_MAX_QUEUE", "256"))  # 우선순위별 최대 대기 요청 수 (넘으면 거절)
+    SCHEDULER_RISK_DEADLINE: float = float(os.getenv("SCHEDULER_RISK_DEADLINE", "3"))  # 최대 대기 시간(초, 0이면 제한 없음)
+    SCHEDULER_TRANSCRIPTION_DEADLINE: float = float(os.getenv("SCHEDULER_TRANSCRIPTION_DEADLINE", "10"))
+    SCHEDULER_SUMMARY_DEADLINE: float = float(os.getenv("SCHEDULER_SUMMARY_DEADLINE", "30"))
+    SCHEDULER_BATCH_DEADLINE: float = float(os.getenv("SCHEDULER_BATCH_DEADLINE", "0"))
+    
+    # 긴 통화 녹음 분할 전사 (/transcribe, PCM WAV 전용)
+    LONG_AUDIO_MIN_SECONDS: float = float(os.getenv("LONG_AUDIO_MIN_SECONDS", "120"))  # 이 길이 이상이면 자동 분할
+    LONG_AUDIO_SEGMENT_SECONDS: float = float(os.getenv("LONG_AUDIO_SEGMENT_SECONDS", "60"))  # 목표 구간 길이
+    LONG_AUDIO_SEARCH_SECONDS: float = float(os.getenv("LONG_AUDIO_SEARCH_SECONDS", "10"))  # 무음 탐색 범위(±)
+    LONG_AUDIO_WORKERS: int = int(os.getenv("LONG_AUDIO_WORKERS", "4"))  # 요청당 동시 전사 구간 수
 
 settings = Settings() 
\ No newline at end of file
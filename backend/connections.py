@@ -0,0 +1,387 @@
+"""
+웹소켓 연결 관리
+
+- 연결은 세션 ID를 키로 하는 dict에 보관합니다.
+- 연결마다 크기가 제한된 송신 큐와 전용 송신 태스크를 두어, 느린 클라이언트가
+  수신 루프나 다른 연결의 전송을 막지 않습니다.
+- merge_key가 같은 메시지(미확정 전사, 위험도 갱신 등)는 큐에 최신 것 하나만 남기고,
+  큐가 가득 차면 merge_key가 있는 오래된 메시지부터 버립니다. 버릴 메시지가 없으면
+  따라오지 못하는 클라이언트로 보고 연결을 종료합니다.
+- 일정 시간 수신이 없는 연결에는 ping을 보내고, 그래도 응답이 없으면 종료합니다.
+  ping에 응답할 수 없는 연결(음성 스트림: 클라이언트가 오디오만 보내므로 음소거/보류 중에는
+  수신이 없음)은 reap_idle=False로 정리 대상에서 빼고, 끊긴 연결은 웹소켓 프로토콜 ping에 맡깁니다.
+- 통화 상태는 연결을 받은 워커의 메모리에 있으므로, 변경(확정 전사, 음성 흥분도)을 메시지 버스로
+  다른 워커에 알려 같은 통화의 음성/분석 연결이 서로 다른 워커에 붙어도 상태를 공유합니다.
+- 세션 목록은 버스의 해시에 워커별로 등록해 전체 워커에서 조회할 수 있습니다.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from fastapi import WebSocket
+
+from bus import BusError, MessageBus, create_bus
+from config import settings
+from metrics import ACTIVE_CONNECTIONS, STAGE_SECONDS, WS_MESSAGES_DROPPED, WS_QUEUED_MESSAGES
+
+logger = logging.getLogger(__name__)
+
+Payload = Union[str, Dict]
+CallEventHandler = Callable[[str, Dict], object]
+
+CALL_EVENTS_CHANNEL = "counselor:call_events"
+SESSIONS_KEY = "counselor:sessions"
+
+# 종료 처리처럼 기다리지 않는 태스크가 가비지 컬렉션되지 않도록 참조 보관
+_background_tasks = set()
+
+
+def _spawn(coro):
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def risk_merge_key(message: Dict) -> Optional[str]:
+    """
+    위험도 메시지는 잠정/최종 결과별로 최신 것만 전송하면 됩니다.
+    """
+    if message.get("type") != "risk_analysis":
+        return None
+    return "risk:provisional" if message.get("provisional") else "risk:final"
+
+
+def _merge(old: Payload, new: Payload) -> Payload:
+    # 대체되는 위험도 결과의 chunk_id는 새 결과의 chunk_ids에 합쳐서 전달
+    if isinstance(old, dict) and isinstance(new, dict) and "chunk_ids" in old and "chunk_ids" in new:
+        merged = list(old["chunk_ids"]) + [c for c in new["chunk_ids"] if c not in old["chunk_ids"]]
+        return {**new, "chunk_ids": merged}
+    return new
+
+
+class Connection:
+    """
+    세션 하나의 웹소켓과 송신 큐
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        websocket: WebSocket,
+        kind: str,
+        max_queue: int,
+        send_timeout: float,
+        accepts_ping: bool,
+        reap_idle: bool = True,
+    ):
+        self.session_id = session_id
+        self.websocket = websocket
+        self.kind = kind
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.accepts_ping = accepts_ping
+        self.reap_idle = reap_idle
+        self.closed = False
+        self.ping_sent = False
+        self.last_seen = asyncio.get_running_loop().time()
+        self.connected_at = time.time()
+
+        self._queue: Deque[Tuple[Optional[str], Payload]] = deque()
+        self._ready = asyncio.Event()
+        self._flushed = asyncio.Event()
+        self._flushed.set()
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def touch(self):
+        """
+        클라이언트로부터 메시지를 받을 때마다 호출합니다. (하트비트)
+        """
+        self.last_seen = asyncio.get_running_loop().time()
+        self.ping_sent = False
+
+    def send(self, payload: Payload, merge_key: Optional[str] = None):
+        """
+        메시지를 송신 큐에 넣고 바로 반환합니다. dict는 송신 태스크에서 JSON으로 직렬화합니다.
+        """
+        if self.closed:
+            raise ConnectionError("웹소켓 연결이 종료되었습니다.")
+
+        queue = self._queue
+        if merge_key is not None:
+            for index, (key, old) in enumerate(queue):
+                if key == merge_key:
+                    del queue[index]
+                    payload = _merge(old, payload)
+                    WS_MESSAGES_DROPPED.inc(reason="merged")
+                    break
+
+        if len(queue) >= self.max_queue:
+            for index, (key, _) in enumerate(queue):
+                if key is not None:
+                    del queue[index]
+                    WS_MESSAGES_DROPPED.inc(reason="overflow")
+                    break
+            else:
+                WS_MESSAGES_DROPPED.inc(reason="slow_consumer")
+                logger.warning(f"송신 큐가 가득 차 연결을 종료합니다: {self.session_id}")
+                # 닫히기 전에 다른 태스크가 보내려 하면 바로 ConnectionError가 나도록 먼저 표시
+                self.closed = True
+                _spawn(self.close(code=1013, drain=False))
+                raise ConnectionError("클라이언트가 메시지를 따라오지 못해 연결을 종료했습니다.")
+
+        queue.append((merge_key, payload))
+        self._flushed.clear()
+        self._ready.set()
+
+    async def _write_loop(self):
+        queue = self._queue
+        try:
+            while True:
+                if not queue:
+                    self._flushed.set()
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+                _, payload = queue.popleft()
+                text = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+                with STAGE_SECONDS.time(stage="send"):
+                    await asyncio.wait_for(self.websocket.send_text(text), self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"웹소켓 전송 실패로 연결을 종료합니다: {self.session_id} ({e})")
+            self.closed = True
+            queue.clear()
+            self._flushed.set()
+            try:
+                await self.websocket.close(code=1011)
+            except Exception:
+                pass
+
+    async def close(self, code: int = 1000, drain: bool = True, timeout: float = 2.0):
+        """
+        남은 메시지를 보낸 뒤(drain) 송신 태스크와 소켓을 닫습니다.
+        """
+        if drain and not self.closed:
+            try:
+                await asyncio.wait_for(self._flushed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self.closed = True
+        self.stop()
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+    def stop(self):
+        self.closed = True
+        self._queue.clear()
+        if not self._writer.done():
+            self._writer.cancel()
+
+
+class ConnectionManager:
+    """
+    세션 ID별 연결 관리, 하트비트 기반 유휴 연결 정리, 워커 간 통화 변경 전달
+
+    웹소켓과 통화 상태는 연결을 받은 워커에만 있으므로, 통화 변경은 버스로 발행하고
+    다른 워커는 on_call_event로 등록한 처리기로 자신의 메모리에 반영합니다.
+    """
+
+    def __init__(
+        self,
+        bus: MessageBus,
+        max_queue: int = 512,
+        send_timeout: float = 5.0,
+        heartbeat_interval: float = 20.0,
+        idle_timeout: float = 60.0,
+        worker_id: Optional[str] = None,
+    ):
+        self.bus = bus
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._connections: Dict[str, Connection] = {}
+        self._reaper: Optional[asyncio.Task] = None
+        self._call_handlers: List[CallEventHandler] = []
+        self._subscribed = False
+
+    @property
+    def _reap_interval(self) -> float:
+        if self.idle_timeout <= 0:
+            return max(1.0, self.heartbeat_interval / 2)
+        return max(1.0, min(self.heartbeat_interval, self.idle_timeout) / 2)
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+    def get(self, session_id: str) -> Optional[Connection]:
+        return self._connections.get(session_id)
+
+    async def connect(
+        self, websocket: WebSocket, kind: str, accepts_ping: bool = False, reap_idle: bool = True
+    ) -> Connection:
+        await websocket.accept()
+        connection = Connection(
+            session_id=uuid.uuid4().hex,
+            websocket=websocket,
+            kind=kind,
+            max_queue=self.max_queue,
+            send_timeout=self.send_timeout,
+            accepts_ping=accepts_ping,
+            reap_idle=reap_idle,
+        )
+        self._connections[connection.session_id] = connection
+        logger.info(f"웹소켓 연결됨 ({kind}, {connection.session_id}). 총 연결 수: {len(self)}")
+        await self._register([connection])
+        return connection
+
+    def disconnect(self, connection: Connection):
+        """
+        연결을 목록에서 제거하고 송신 태스크를 멈춥니다. 여러 번 호출해도 안전합니다.
+        """
+        connection.stop()
+        if self._connections.pop(connection.session_id, None) is not None:
+            logger.info(f"웹소켓 연결 해제됨 ({connection.kind}, {connection.session_id}). 총 연결 수: {len(self)}")
+            _spawn(self._unregister(connection.session_id))
+
+    async def close(self, connection: Connection, code: int = 1000):
+        """
+        서버 쪽에서 연결을 종료합니다. (남은 메시지 전송 후)
+        """
+        await connection.close(code=code)
+        self.disconnect(connection)
+
+    def on_call_event(self, handler: CallEventHandler):
+        """
+        다른 워커가 발행한 통화 변경을 받을 처리기(call_id, event)를 등록합니다.
+        """
+        self._call_handlers.append(handler)
+
+    def publish_call_event(self, call_id: str, event: Dict):
+        """
+        통화 변경을 다른 워커에 알립니다. 기다리지 않으며, 프로세스 내부 버스면 받을 워커가 없어 생략합니다.
+        """
+        if self.bus.name == "memory":
+            return
+        _spawn(self._publish_call_event({"origin": self.worker_id, "call_id": call_id, "event": event}))
+
+    async def _publish_call_event(self, message: Dict):
+        try:
+            await self.bus.publish(CALL_EVENTS_CHANNEL, message)
+        except BusError as e:
+            logger.warning(f"통화 변경 발행 실패: {e}")
+
+    def _on_call_event(self, message: Dict):
+        # 자신이 발행한 변경은 이미 반영되어 있음
+        if message.get("origin") == self.worker_id:
+            return
+        for handler in self._call_handlers:
+            try:
+                handler(message["call_id"], message["event"])
+            except Exception as e:
+                logger.error(f"통화 변경 반영 실패: {e}")
+
+    async def _register(self, connections):
+        now = time.time()
+        mapping = {
+            connection.session_id: {
+                "worker": self.worker_id,
+                "kind": connection.kind,
+                "connected_at": connection.connected_at,
+                "seen": now,
+            }
+            for connection in connections
+        }
+        try:
+            await self.bus.hset(SESSIONS_KEY, mapping)
+        except BusError as e:
+            logger.warning(f"세션 목록 갱신 실패: {e}")
+
+    async def _unregister(self, *session_ids: str):
+        try:
+            await self.bus.hdel(SESSIONS_KEY, *session_ids)
+        except BusError as e:
+            logger.warning(f"세션 목록에서 제거 실패: {e}")
+
+    async def sessions(self) -> Dict[str, Dict]:
+        """
+        전체 워커의 세션 목록. 갱신이 끊긴(종료된 워커의) 항목은 제외하고 정리합니다.
+        """
+        sessions = await self.bus.hgetall(SESSIONS_KEY)
+        expired_before = time.time() - self._reap_interval * 3
+        stale = [session_id for session_id, info in sessions.items() if info.get("seen", 0) < expired_before]
+        if stale:
+            await self._unregister(*stale)
+        return {session_id: info for session_id, info in sessions.items() if session_id not in stale}
+
+    def queued_messages(self) -> int:
+        return sum(len(connection) for connection in self._connections.values())
+
+    async def _reap(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self._reap_interval)
+            now = loop.time()
+            for connection in list(self._connections.values()):
+                idle = now - connection.last_seen
+                if not connection.reap_idle:
+                    continue
+                if 0 < self.idle_timeout <= idle:
+                    logger.info(f"유휴 연결 종료: {connection.session_id} ({idle:.0f}초 동안 수신 없음)")
+                    _spawn(self.close(connection, code=1001))
+                elif idle >= self.heartbeat_interval and connection.accepts_ping and not connection.ping_sent:
+                    try:
+                        connection.send({"type": "ping"})
+                        connection.ping_sent = True
+                    except ConnectionError:
+                        pass
+            # 세션 목록 항목의 갱신 시각(seen)을 한 번에 갱신
+            if self._connections:
+                await self._register(list(self._connections.values()))
+
+    async def start(self):
+        """
+        버스 구독과 하트비트를 시작합니다.
+        """
+        if not self._subscribed:
+            self.bus.subscribe(CALL_EVENTS_CHANNEL, self._on_call_event)
+            self._subscribed = True
+        await self.bus.start()
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap())
+
+    async def stop(self):
+        if self._reaper is not None and not self._reaper.done():
+            self._reaper.cancel()
+            try:
+                await self._reaper
+            except asyncio.CancelledError:
+                pass
+        if self._connections:
+            await self._unregister(*self._connections)
+        await self.bus.aclose()
+
+
+manager = ConnectionManager(
+    bus=create_bus(settings),
+    max_queue=settings.WS_SEND_QUEUE_SIZE,
+    send_timeout=settings.WS_SEND_TIMEOUT,
+    heartbeat_interval=settings.WS_HEARTBEAT_INTERVAL,
+    idle_timeout=settings.WS_IDLE_TIMEOUT,
+)
+ACTIVE_CONNECTIONS.set_function(lambda: len(manager))
+WS_QUEUED_MESSAGES.set_function(manager.queued_messages)
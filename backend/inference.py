@@ -0,0 +1,393 @@
+"""
+모델 호출을 위한 비동기 추론 계층
+"""
+
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from config import settings
+from metrics import (
+    MODEL_FALLBACKS,
+    STAGE_SECONDS,
+    UPSTREAM_ERRORS,
+    UPSTREAM_HEDGES,
+    UPSTREAM_REQUESTS,
+    UPSTREAM_RETRIES,
+)
+from model_scheduler import (
+    PRIORITY_NAMES,
+    PRIORITY_RISK,
+    PRIORITY_SUMMARY,
+    PRIORITY_TRANSCRIPTION,
+    ModelScheduler,
+    SchedulerRejected,
+    estimate_tokens,
+    model_scheduler,
+)
+from providers import AudioFile, ModelProvider, create_fallback_provider, create_provider, is_retryable
+from resilience import CircuitBreaker, LatencyTracker, backoff_delay
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 작업 종류별 단계 이름 (STAGE_SECONDS)
+_STAGES = {"stt": "stt", "chat": "llm"}
+
+
+def _replayable_audio(file: AudioFile) -> Tuple[Callable[[], AudioFile], bool]:
+    """
+    시도마다 처음부터 읽을 수 있는 업로드 인자를 만드는 함수와, 동시에 여러 번 보내도 되는지 여부를 반환합니다.
+
+    메모리 버퍼(BytesIO)는 바이트로 복사해 헤지 요청과 공유하고, 디스크 파일은 시작 위치로 되감습니다.
+    """
+    fileobj = file[1] if isinstance(file, tuple) else file
+    if isinstance(fileobj, (bytes, bytearray)):
+        return lambda: file, True
+    position = fileobj.tell()
+    if hasattr(fileobj, "getbuffer"):
+        data = fileobj.read()
+        fileobj.seek(position)
+        replay = (file[0], data, *file[2:]) if isinstance(file, tuple) else ("audio.wav", data)
+        return lambda: replay, True
+
+    def rewind() -> AudioFile:
+        fileobj.seek(position)
+        return file
+
+    return rewind, False
+
+
+class InferenceClient:
+    """
+    모든 엔드포인트가 공유하는 비동기 모델 클라이언트
+
+    설정된 제공자(OpenAI, 로컬 대역 등)에 호출을 위임하고, 호출마다 다음을 적용합니다.
+    호출 순서와 동시 호출 수, 요청 한도는 스케줄러(model_scheduler.py)가 정합니다.
+
+    - 시도별 타임아웃과 재시도를 포함한 전체 제한 시간(deadline)
+    - 일시적 오류(시간 초과, 연결 실패, 429/5xx)의 지터 재시도 (스트리밍은 첫 토큰 전까지만)
+    - 실시간 호출(위험도/전사)이 최근 p95 응답 시간보다 늦으면 같은 요청을 한 번 더 보내 먼저 온 결과 사용
+    - 작업 종류별 회로 차단기: 업스트림 장애 중에는 바로 실패하고, 실시간 위험도 분석은
+      로컬 대역(사전 점수화 결과)으로 대체
+
+    priority는 호출의 우선순위, session은 '위험' 단계 승격에 사용할 통화 ID입니다.
+    """
+
+    def __init__(
+        self,
+        provider: ModelProvider,
+        timeout: float,
+        scheduler: ModelScheduler,
+        fallback: Optional[ModelProvider] = None,
+        max_retries: int = 2,
+        retry_base_delay: float = 0.2,
+        realtime_timeout: float = 8.0,
+        realtime_deadline: float = 12.0,
+        deadline: float = 90.0,
+        hedge: bool = True,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ):
+        self.provider = provider
+        self.timeout = timeout
+        self.scheduler = scheduler
+        self.fallback = fallback
+        self.max_retries = max(0, max_retries)
+        self.retry_base_delay = retry_base_delay
+        self.realtime_timeout = realtime_timeout
+        self.realtime_deadline = realtime_deadline
+        self.deadline = deadline
+        self.hedge = hedge
+        self.breakers = {
+            operation: CircuitBreaker(operation, failure_threshold, reset_timeout)
+            for operation in ("stt", "chat")
+        }
+        # (작업 종류, 우선순위)별 최근 응답 시간 (헤지 지연 기준)
+        self._latency: Dict[Tuple[str, int], LatencyTracker] = {}
+
+    @property
+    def available(self) -> bool:
+        return self.provider.available
+
+    @property
+    def provider_name(self) -> str:
+        return self.provider.name
+
+    def circuit_states(self) -> Dict[str, str]:
+        return {operation: breaker.state for operation, breaker in self.breakers.items()}
+
+    def _limits(self, priority: int, timeout: Optional[float], deadline: Optional[float]) -> Tuple[float, float]:
+        # 시도별 타임아웃과 전체 제한 시간
+        realtime = priority <= PRIORITY_TRANSCRIPTION
+        timeout = timeout or (self.realtime_timeout if realtime else self.timeout)
+        deadline = deadline or (self.realtime_deadline if realtime else self.deadline)
+        return timeout, deadline
+
+    def _queue_deadline(self, priority: int, remaining: float) -> float:
+        # 스케줄러 대기 제한 시간도 남은 전체 제한 시간을 넘지 않게
+        return min(self.scheduler.deadlines.get(priority) or remaining, remaining)
+
+    def _check_circuit(self, operation: str, priority: int, claim: bool = False):
+        # 대기열에 넣기 전에는 확인만 하고, 슬롯을 얻은 뒤(claim=True) 시험 호출 자격을 가져감
+        breaker = self.breakers[operation]
+        if not (breaker.claim() if claim else breaker.allow()):
+            raise self.scheduler.reject("circuit_open", priority, retry_after=breaker.retry_after() or 1.0)
+
+    async def _attempt(self, operation: str, priority: int, call: Callable[[float], Awaitable[T]], timeout: float) -> T:
+        """
+        업스트림 호출 한 번 (회로 차단기와 응답 시간 기록)
+        """
+        breaker = self.breakers[operation]
+        self._check_circuit(operation, priority, claim=True)
+        UPSTREAM_REQUESTS.inc(operation=operation)
+        started = time.perf_counter()
+        try:
+            # 제공자가 타임아웃을 지키지 않아도 시도별 제한 시간을 보장
+            result = await asyncio.wait_for(call(timeout), timeout)
+        except Exception as e:
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage=_STAGES[operation])
+            # 재시도할 수 없는 오류(4xx 등)는 업스트림이 응답한 것이므로 성공으로 셈
+            if is_retryable(e):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise
+        finally:
+            breaker.release()
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=_STAGES[operation])
+        breaker.record_success()
+        self._latency.setdefault((operation, priority), LatencyTracker()).observe(elapsed)
+        return result
+
+    async def _hedged(
+        self,
+        operation: str,
+        priority: int,
+        tokens: int,
+        session: Optional[str],
+        call: Callable[[float], Awaitable[T]],
+        timeout: float,
+    ) -> T:
+        """
+        p95 응답 시간이 지나도 끝나지 않으면 남는 슬롯이 있을 때 같은 요청을 한 번 더 보냅니다.
+        """
+        tracker = self._latency.get((operation, priority))
+        delay = tracker.percentile(0.95) if tracker is not None else None
+        primary = asyncio.ensure_future(self._attempt(operation, priority, call, timeout))
+        if delay is None:
+            return await primary
+
+        tasks = [primary]
+        acquired = False
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and self.breakers[operation].state == "closed":
+                acquired = self.scheduler.try_acquire(priority, operation, tokens, session)
+            if acquired:
+                UPSTREAM_HEDGES.inc(operation=operation, outcome="launched")
+                tasks.append(asyncio.ensure_future(self._attempt(operation, priority, call, timeout)))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            UPSTREAM_HEDGES.inc(operation=operation, outcome="won")
+                        return task.result()
+            # 모두 실패하면 원래 요청의 오류
+            return primary.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if acquired:
+                self.scheduler.release()
+
+    async def _call(
+        self,
+        operation: str,
+        priority: int,
+        tokens: int,
+        session: Optional[str],
+        call: Callable[[float], Awaitable[T]],
+        timeout: Optional[float],
+        deadline: Optional[float],
+        hedge: bool = False,
+    ) -> T:
+        """
+        제한 시간 안에서 일시적 오류를 지터 백오프로 재시도합니다.
+        """
+        loop = asyncio.get_running_loop()
+        timeout, deadline = self._limits(priority, timeout, deadline)
+        deadline_at = loop.time() + deadline
+        attempt = 0
+        while True:
+            self._check_circuit(operation, priority)
+            remaining = deadline_at - loop.time()
+            try:
+                async with self.scheduler.slot(
+                    priority, operation, tokens, session, deadline=self._queue_deadline(priority, remaining)
+                ):
+                    attempt_timeout = min(timeout, max(0.1, deadline_at - loop.time()))
+                    if hedge and self.hedge:
+                        return await self._hedged(operation, priority, tokens, session, call, attempt_timeout)
+                    return await self._attempt(operation, priority, call, attempt_timeout)
+            except SchedulerRejected:
+                raise
+            except Exception as e:
+                UPSTREAM_ERRORS.inc(operation=operation)
+                delay = backoff_delay(attempt, self.retry_base_delay)
+                if not is_retryable(e) or attempt >= self.max_retries or loop.time() + delay >= deadline_at:
+                    raise
+                attempt += 1
+                UPSTREAM_RETRIES.inc(operation=operation)
+                logger.warning(f"모델 호출 재시도 {attempt}/{self.max_retries} ({operation}, {delay:.2f}초 후): {e}")
+                await asyncio.sleep(delay)
+
+    async def transcribe(
+        self,
+        file: AudioFile,
+        model: str = "whisper-1",
+        language: str = "ko",
+        timeout: Optional[float] = None,
+        priority: int = PRIORITY_TRANSCRIPTION,
+        session: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> str:
+        """
+        음성 파일을 텍스트로 변환합니다.
+
+        file은 열린 파일 객체 또는 (파일명, 내용[, MIME]) 튜플입니다.
+        """
+        upload, concurrent = _replayable_audio(file)
+
+        async def call(attempt_timeout: float) -> str:
+            return await self.provider.transcribe(upload(), model, language, attempt_timeout)
+
+        hedge = concurrent and priority <= PRIORITY_TRANSCRIPTION
+        return await self._call("stt", priority, 0, session, call, timeout, deadline, hedge=hedge)
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = "gpt-3.5-turbo",
+        max_tokens: int = 400,
+        temperature: float = 0.1,
+        timeout: Optional[float] = None,
+        priority: int = PRIORITY_SUMMARY,
+        session: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> str:
+        """
+        채팅 완성 결과 텍스트를 반환합니다.
+
+        실시간 위험도 분석(PRIORITY_RISK)은 업스트림 장애/과부하로 실패하면 로컬 대역 결과를 반환합니다.
+        """
+        async def call(attempt_timeout: float) -> str:
+            return await self.provider.chat(messages, model, max_tokens, temperature, attempt_timeout)
+
+        tokens = estimate_tokens(messages, max_tokens)
+        try:
+            return await self._call(
+                "chat", priority, tokens, session, call, timeout, deadline, hedge=priority == PRIORITY_RISK
+            )
+        except Exception as e:
+            if self.fallback is None or priority != PRIORITY_RISK:
+                raise
+            if not isinstance(e, SchedulerRejected) and not is_retryable(e):
+                raise
+            MODEL_FALLBACKS.inc(operation="chat")
+            logger.warning(f"업스트림 장애로 로컬 대역 응답 사용 ({PRIORITY_NAMES[priority]}): {e}")
+            return await self.fallback.chat(messages, model, max_tokens, temperature, 0)
+
+    async def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = "gpt-3.5-turbo",
+        max_tokens: int = 400,
+        temperature: float = 0.1,
+        timeout: Optional[float] = None,
+        priority: int = PRIORITY_SUMMARY,
+        session: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        """
+        채팅 완성 결과를 토큰(델타) 단위로 스트리밍합니다. (스트림이 끝날 때까지 슬롯 사용)
+
+        첫 토큰을 받기 전의 일시적 오류만 재시도합니다.
+        """
+        loop = asyncio.get_running_loop()
+        timeout, deadline = self._limits(priority, timeout, deadline)
+        deadline_at = loop.time() + deadline
+        tokens = estimate_tokens(messages, max_tokens)
+        breaker = self.breakers["chat"]
+        attempt = 0
+        while True:
+            self._check_circuit("chat", priority)
+            remaining = deadline_at - loop.time()
+            first_token = True
+            async with self.scheduler.slot(
+                priority, "chat", tokens, session, deadline=self._queue_deadline(priority, remaining)
+            ):
+                self._check_circuit("chat", priority, claim=True)
+                UPSTREAM_REQUESTS.inc(operation="chat_stream")
+                started = time.perf_counter()
+                try:
+                    async for delta in self.provider.chat_stream(
+                        messages, model, max_tokens, temperature, min(timeout, max(0.1, deadline_at - loop.time()))
+                    ):
+                        if first_token:
+                            STAGE_SECONDS.observe(time.perf_counter() - started, stage="llm_first_token")
+                            breaker.record_success()
+                            first_token = False
+                        yield delta
+                    if first_token:
+                        breaker.record_success()
+                    return
+                except Exception as e:
+                    UPSTREAM_ERRORS.inc(operation="chat_stream")
+                    retryable = is_retryable(e)
+                    if retryable:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                    delay = backoff_delay(attempt, self.retry_base_delay)
+                    if (
+                        not first_token
+                        or not retryable
+                        or attempt >= self.max_retries
+                        or loop.time() + delay >= deadline_at
+                    ):
+                        raise
+                    attempt += 1
+                    UPSTREAM_RETRIES.inc(operation="chat_stream")
+                    logger.warning(f"모델 스트리밍 재시도 {attempt}/{self.max_retries} ({delay:.2f}초 후): {e}")
+                finally:
+                    # 취소되거나 첫 토큰 전에 소비자가 스트림을 닫아도 시험 호출 자격을 돌려줌
+                    breaker.release()
+                    STAGE_SECONDS.observe(time.perf_counter() - started, stage="llm_stream")
+            await asyncio.sleep(delay)
+
+    async def aclose(self):
+        await self.provider.aclose()
+
+
+inference = InferenceClient(
+    provider=create_provider(settings),
+    timeout=settings.OPENAI_TIMEOUT,
+    scheduler=model_scheduler,
+    fallback=create_fallback_provider(),
+    max_retries=settings.OPENAI_MAX_RETRIES,
+    retry_base_delay=settings.MODEL_RETRY_BASE_DELAY,
+    realtime_timeout=settings.MODEL_REALTIME_TIMEOUT,
+    realtime_deadline=settings.MODEL_REALTIME_DEADLINE,
+    deadline=settings.MODEL_DEADLINE,
+    hedge=settings.MODEL_HEDGE_ENABLED,
+    failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=settings.CIRCUIT_RESET_SECONDS,
+)
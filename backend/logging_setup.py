@@ -0,0 +1,218 @@
+"""
+비동기 구조화 로깅
+
+- 로그 레코드는 제한된 크기의 큐에 넣기만 하고, 포맷/출력은 별도 스레드(QueueListener)가
+  담당하므로 느린 출력 대상이 이벤트 루프를 막지 않습니다. 큐가 가득 차면 버립니다.
+- 청크마다 남는 로그(extra의 hot=True)는 LOG_HOT_SAMPLE_RATE 비율로 샘플링하고,
+  모든 로그는 이벤트(호출 위치)별 토큰 버킷으로 초당 개수를 제한합니다.
+- 전사/요약 등 상담 내용 필드(extra)와 메시지 안의 긴 숫자열(계좌/카드/전화번호)은 가립니다.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+from metrics import LOG_RECORDS_DROPPED
+
+# 상담 내용을 담는 extra 필드 (가림 대상)
+CONTENT_FIELDS = {"transcript", "tentative", "text", "summary", "script", "analysis"}
+
+_DIGITS_PATTERN = re.compile(r"\d[\d\- ]{6,}\d")
+
+# 표준 LogRecord 속성 (이외의 속성은 extra 필드로 출력)
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+_INTERNAL_ATTRS = {"hot"}
+
+
+def hot(event: str, **fields) -> Dict:
+    """
+    청크마다 남는 로그용 extra: logger.info(..., extra=hot("audio_chunk", bytes=n))
+    """
+    return {"event": event, "hot": True, **fields}
+
+
+def _extra_fields(record: logging.LogRecord) -> Dict:
+    return {
+        key: value
+        for key, value in vars(record).items()
+        if key not in _RESERVED_ATTRS and key not in _INTERNAL_ATTRS and not key.startswith("_")
+    }
+
+
+class HotPathFilter(logging.Filter):
+    """
+    hot 로그 샘플링과 이벤트별 초당 개수 제한 (이벤트 루프 스레드에서 큐에 넣기 전에 실행)
+
+    제한으로 버려진 개수는 다음에 통과한 같은 이벤트 로그의 suppressed 필드로 알립니다.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, rate: float = 20.0, burst: float = 50.0):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.rate = rate
+        self.burst = burst
+        # 이벤트 -> (남은 토큰, 마지막 갱신 시각, 버려진 개수)
+        self._buckets: Dict[str, Tuple[float, float, int]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "hot", False) and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            LOG_RECORDS_DROPPED.inc(reason="sampled")
+            return False
+
+        if self.rate <= 0:
+            return True
+
+        key = getattr(record, "event", None) or f"{record.name}:{record.lineno}"
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, suppressed = self._buckets.get(key, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1.0:
+                self._buckets[key] = (tokens, now, suppressed + 1)
+                LOG_RECORDS_DROPPED.inc(reason="rate_limited")
+                return False
+            self._buckets[key] = (tokens - 1.0, now, 0)
+
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class RedactionFilter(logging.Filter):
+    """
+    상담 내용 필드를 길이 정보로 바꾸고 메시지 속 긴 숫자열을 가립니다. (로그 출력 스레드에서 실행)
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for field in CONTENT_FIELDS:
+            value = getattr(record, field, None)
+            if isinstance(value, str):
+                setattr(record, field, f"<가림: {len(value)}자>")
+        message = record.getMessage()
+        if _DIGITS_PATTERN.search(message):
+            record.msg = _DIGITS_PATTERN.sub("<숫자 가림>", message)
+            record.args = None
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    한 줄짜리 JSON 레코드 (ts, level, logger, message와 extra 필드)
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **_extra_fields(record),
+        }
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """
+    개발용 텍스트 형식 (extra 필드를 key=value로 덧붙임)
+    """
+
+    def __init__(self):
+        super().__init__("%(levelname)s:%(name)s:%(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    큐가 가득 차면 기다리지 않고 레코드를 버리는 QueueHandler
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 메시지는 미리 합치고 예외는 문자열로 바꿔 extra 필드와 함께 출력 스레드로 전달
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(reason="queue_full")
+
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(
+    level: str = "INFO",
+    fmt: str = "json",
+    queue_size: int = 10000,
+    hot_sample_rate: float = 1.0,
+    rate_limit: float = 20.0,
+    rate_burst: float = 50.0,
+    redact: bool = True,
+) -> QueueListener:
+    """
+    루트 로거를 큐 기반 비동기 로깅으로 구성합니다. 여러 번 호출해도 한 번만 구성합니다.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JSONFormatter() if fmt == "json" else TextFormatter())
+    if redact:
+        output.addFilter(RedactionFilter())
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=queue_size)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(HotPathFilter(hot_sample_rate, rate_limit, rate_burst))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    # 종료 시 큐에 남은 로그 출력
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging():
+    """
+    큐에 남은 로그를 모두 출력하고 출력 스레드를 종료합니다.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
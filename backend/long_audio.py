@@ -0,0 +1,184 @@
+"""
+긴 통화 녹음 분할 전사
+
+PCM WAV 녹음을 무음 지점에서 여러 구간으로 나누고, 제한된 수의 작업자가
+구간을 동시에 전사한 뒤 시간 순서대로 이어 붙입니다.
+
+녹음 전체를 디코딩해 두지 않습니다. 무음 탐색은 파일을 블록 단위로 읽어 프레임 에너지만 모으고,
+전사할 구간은 작업자가 필요할 때 파일에서 읽으므로 메모리 사용량은 녹음 길이와 무관합니다.
+"""
+
+import asyncio
+import logging
+import threading
+import wave
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from audio import WavEncoder, frame_energies, split_at_silence
+from inference import inference
+from model_scheduler import PRIORITY_BATCH
+
+logger = logging.getLogger(__name__)
+
+# 무음 탐색 시 한 번에 읽는 샘플 프레임 수 (16kHz mono 기준 약 8초, 256KB)
+READ_BLOCK_FRAMES = 1 << 17
+# 무음 탐색 에너지 프레임 길이(ms)
+SPLIT_FRAME_MS = 30
+
+
+def _to_mono_int16(raw: bytes, sample_width: int, channels: int) -> np.ndarray:
+    if sample_width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.int16) - 128) << 8
+    elif sample_width == 2:
+        samples = np.frombuffer(raw, dtype="<i2")
+    else:
+        samples = (np.frombuffer(raw, dtype="<i4") >> 16).astype(np.int16)
+
+    if channels > 1:
+        usable = len(samples) - len(samples) % channels
+        samples = samples[:usable].reshape(-1, channels).mean(axis=1, dtype=np.float32).astype(np.int16)
+    return samples
+
+
+class WavAudio:
+    """
+    열어 둔 PCM WAV 녹음
+
+    샘플은 read로 요청한 구간만 파일에서 읽어 int16 mono로 변환합니다.
+    전사 작업자가 여러 스레드에서 동시에 읽을 수 있도록 파일 위치 이동은 잠금으로 보호합니다.
+    """
+
+    def __init__(self, wav: wave.Wave_read):
+        self._wav = wav
+        self._lock = threading.Lock()
+        self.sample_rate = wav.getframerate()
+        self.channels = wav.getnchannels()
+        self.sample_width = wav.getsampwidth()
+        self.n_frames = wav.getnframes()
+
+    def __len__(self) -> int:
+        return self.n_frames
+
+    @property
+    def duration(self) -> float:
+        return self.n_frames / self.sample_rate
+
+    def read(self, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        """
+        [start, end) 샘플 프레임을 int16 mono로 읽습니다. (end가 없으면 끝까지)
+        """
+        end = self.n_frames if end is None else min(end, self.n_frames)
+        with self._lock:
+            self._wav.setpos(start)
+            raw = self._wav.readframes(max(0, end - start))
+        return _to_mono_int16(raw, self.sample_width, self.channels)
+
+    def blocks(self, block_frames: int = READ_BLOCK_FRAMES) -> Iterator[np.ndarray]:
+        for start in range(0, self.n_frames, block_frames):
+            block = self.read(start, start + block_frames)
+            if not len(block):
+                return
+            yield block
+
+    def find_silence_splits(
+        self, target_seconds: float = 60.0, search_seconds: float = 10.0
+    ) -> List[Tuple[int, int]]:
+        """
+        audio.find_silence_splits와 같은 구간을 블록 단위로 읽으며 계산합니다.
+
+        헤더보다 짧게 잘린 파일이면 실제로 읽은 길이로 n_frames를 맞춥니다.
+        """
+        frame_length = max(1, self.sample_rate * SPLIT_FRAME_MS // 1000)
+        # 블록 경계가 에너지 프레임 경계와 맞도록 프레임 길이의 배수로 읽음
+        block_frames = max(1, READ_BLOCK_FRAMES // frame_length) * frame_length
+        energies: List[np.ndarray] = []
+        total = 0
+        for block in self.blocks(block_frames):
+            total += len(block)
+            energies.append(frame_energies(block, frame_length))
+        self.n_frames = total
+        return split_at_silence(
+            np.concatenate(energies) if energies else np.empty(0, dtype=np.float32),
+            total, frame_length, target_seconds, search_seconds, SPLIT_FRAME_MS,
+        )
+
+
+def open_wav(fileobj: BinaryIO, min_seconds: float = 0.0) -> Optional[WavAudio]:
+    """
+    PCM WAV 파일의 헤더를 읽어 WavAudio를 반환합니다. 샘플은 아직 읽지 않습니다.
+
+    WAV가 아니거나(압축 포맷 포함) min_seconds보다 짧으면 None을 반환하며,
+    이때 파일 위치는 처음으로 되돌립니다. fileobj는 WavAudio를 다 쓸 때까지 열어 두어야 합니다.
+    """
+    fileobj.seek(0)
+    try:
+        wav = wave.open(fileobj, "rb")
+    except (wave.Error, EOFError):
+        fileobj.seek(0)
+        return None
+    if wav.getsampwidth() not in (1, 2, 4) or wav.getnframes() < min_seconds * wav.getframerate():
+        fileobj.seek(0)
+        return None
+    return WavAudio(wav)
+
+
+async def transcribe_segments(
+    audio: WavAudio,
+    segment_seconds: float = 60.0,
+    search_seconds: float = 10.0,
+    workers: int = 4,
+    language: str = "ko",
+) -> Dict:
+    """
+    무음 지점으로 나눈 구간을 workers개의 작업자로 동시에 전사합니다.
+
+    각 작업자는 자기 구간만 파일에서 읽고 자신의 WavEncoder 버퍼를 재사용하므로
+    메모리 사용량은 녹음 길이나 구간 수와 관계없이 작업자 수에 비례합니다.
+    """
+    bounds = await asyncio.to_thread(audio.find_silence_splits, segment_seconds, search_seconds)
+    results: List[Optional[str]] = [None] * len(bounds)
+
+    queue: "asyncio.Queue[Tuple[int, int, int]]" = asyncio.Queue()
+    for index, (start, end) in enumerate(bounds):
+        queue.put_nowait((index, start, end))
+
+    async def worker():
+        encoder = WavEncoder(sample_rate=audio.sample_rate, filename="segment.wav")
+        while True:
+            try:
+                index, start, end = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            samples = await asyncio.to_thread(audio.read, start, end)
+            # 녹음 파일 전사는 실시간 처리보다 뒤로 (배치 우선순위)
+            results[index] = await inference.transcribe(
+                encoder.as_upload(samples),
+                language=language,
+                priority=PRIORITY_BATCH
+            )
+
+    tasks = [asyncio.create_task(worker()) for _ in range(max(1, min(workers, len(bounds))))]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # 한 구간이라도 실패하면 나머지 작업자도 중단
+        for task in tasks:
+            task.cancel()
+        raise
+
+    segments = []
+    for (start, end), text in zip(bounds, results):
+        segments.append({
+            "start": round(start / audio.sample_rate, 2),
+            "end": round(end / audio.sample_rate, 2),
+            "text": (text or "").strip(),
+        })
+
+    logger.info(f"분할 전사 완료: {len(segments)}개 구간, {audio.duration:.1f}초")
+    return {
+        "text": " ".join(segment["text"] for segment in segments if segment["text"]),
+        "segments": segments,
+        "duration": round(audio.duration, 2),
+    }
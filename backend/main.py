@@ -1,21 +1,54 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 import aiofiles
 import os
 import tempfile
-from openai import OpenAI
 from config import settings
+from inference import inference
+from response_cache import response_cache, make_cache_key, prompt_version
+from prompts import realtime_risk_messages, summary_messages, script_messages
+from audio import WavEncoder, VoiceActivityDetector
+from acoustic import AcousticAnalyzer, fuse_risk
+from audio_frames import FRAMING_PARAM, FRAMING_V1, AudioStreamDecoder, FrameError
+from streaming import PCMRingBuffer, TranscriptMerger
+from risk_analysis import (
+    RiskAnalysisScheduler, analyze_risk_text, create_prescreener, lexicon_weigher, parse_realtime_risk
+)
+from risk_lexicon import RISK_STAGES
+from combined_analysis import stream_combined_analysis
+from long_audio import open_wav, transcribe_segments
+from metrics import (
+    AUDIO_CHUNKS, STAGE_SECONDS, TRANSCRIPTS_FILTERED,
+    CONTENT_TYPE as METRICS_CONTENT_TYPE, loop_lag_monitor, registry
+)
+from logging_setup import hot, setup_logging
+from connections import manager, risk_merge_key
+from call_store import CallSession, call_store
+from summarizer import summarizer
+from token_budget import observe_saved, prepare_text
+from model_scheduler import PRIORITY_BATCH, PRIORITY_RISK, SchedulerRejected, model_scheduler, retry_after_seconds
+from bus import BusError
+from uploads import AUDIO_UPLOAD_OPENAPI, receive_upload
 import logging
 import json
 import asyncio
-import wave
+import time
+import uuid
 import numpy as np
-from typing import List
+from typing import Optional, Tuple
 
 # 로깅 설정
-logging.basicConfig(level=logging.INFO)
+setup_logging(
+    level=settings.LOG_LEVEL,
+    fmt=settings.LOG_FORMAT,
+    queue_size=settings.LOG_QUEUE_SIZE,
+    hot_sample_rate=settings.LOG_HOT_SAMPLE_RATE,
+    rate_limit=settings.LOG_RATE_LIMIT,
+    rate_burst=settings.LOG_RATE_BURST,
+    redact=settings.LOG_REDACT_TRANSCRIPTS
+)
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="AI 상담사 정서 케어 API", version="1.0.0")
@@ -29,45 +62,104 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# OpenAI 클라이언트 초기화
-if settings.OPENAI_API_KEY:
-    client = OpenAI(api_key=settings.OPENAI_API_KEY)
-else:
-    client = None
+# 모델 제공자 확인
+logger.info(f"모델 제공자: {inference.provider_name}")
+if not inference.available:
     logger.warning("OpenAI API 키가 설정되지 않았습니다. AI 기능이 제한됩니다.")
 
+# 같은 통화의 연결이 다른 워커에 붙어 있으면, 그 워커가 알린 전사/흥분도를 이 워커의 세션에 반영
+manager.on_call_event(call_store.apply_event)
+
+# 로컬 위험 어휘 사전 점수화기
+prescreener = create_prescreener()
+
+risk_weight = lexicon_weigher(prescreener)
+
 # 업로드 디렉토리 생성
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 
-# 웹소켓 연결 관리
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+# 요청 모델
+class SummaryRequest(BaseModel):
+    text: str = ""
+    # text 없이 call_id만 보내면 저장된 통화 전사 기록을 사용
+    call_id: Optional[str] = None
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        logger.info(f"웹소켓 연결됨. 총 연결 수: {len(self.active_connections)}")
+async def request_text(request: SummaryRequest) -> Tuple[str, Optional[CallSession]]:
+    """
+    요청 텍스트를 반환합니다. text가 비어 있고 call_id가 있으면 저장된 전사 기록과 그 세션을 반환합니다.
+    """
+    if request.text.strip() or not request.call_id:
+        return request.text, None
+    call = await call_store.load(request.call_id)
+    if call is None:
+        raise HTTPException(status_code=404, detail="상담 세션을 찾을 수 없습니다.")
+    return call.transcript_text(), call
 
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-        logger.info(f"웹소켓 연결 해제됨. 총 연결 수: {len(self.active_connections)}")
+async def cached_chat(endpoint: str, text: str, **chat_kwargs) -> str:
+    """
+    동일한 텍스트에 대한 모델 응답을 캐시를 거쳐 가져옵니다.
+    """
+    version = prompt_version(
+        chat_kwargs["messages"][0]["content"],
+        max_tokens=chat_kwargs.get("max_tokens"),
+        temperature=chat_kwargs.get("temperature")
+    )
+    # 제공자가 다르면 응답도 다르므로 키에 제공자 이름 포함
+    key = make_cache_key(endpoint, f"{inference.provider_name}/{chat_kwargs['model']}", version, text)
+    return await response_cache.get_or_compute(key, lambda: inference.chat(**chat_kwargs))
 
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
+def overloaded_error(error: SchedulerRejected) -> HTTPException:
+    """
+    스케줄러가 거절한 요청에 대한 503 응답 (Retry-After 포함)
+    """
+    return HTTPException(status_code=503, detail=str(error), headers={"Retry-After": retry_after_seconds(error)})
 
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except Exception as e:
-                logger.error(f"웹소켓 메시지 전송 실패: {e}")
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    """
+    Server-Sent Events 형식의 이벤트 문자열을 만듭니다.
+    """
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def script_input(text: str, session: Optional[str] = None) -> str:
+    """
+    스크립트 생성 입력: 반복된 전사 조각을 제거하고, 토큰 예산을 넘으면 앞부분을 요약으로 압축합니다.
+    """
+    prepared = prepare_text("generate-script", text, observe=False)
+    compacted = await summarizer.compact(
+        prepared, settings.SCRIPT_INPUT_TOKEN_BUDGET, "generate-script", session=session
+    )
+    observe_saved("generate-script", text, compacted)
+    return compacted
 
-manager = ConnectionManager()
+async def stream_script(text: str, session: Optional[str] = None):
+    """
+    상담 스크립트 토큰을 도착하는 즉시 전달합니다. (전체 응답을 모아두지 않음)
+    """
+    deltas = inference.chat_stream(
+        model="gpt-3.5-turbo",
+        messages=script_messages(await script_input(text, session)),
+        max_tokens=600,
+        temperature=0.3,
+        session=session
+    )
+    async for delta in deltas:
+        yield delta
 
-# 요청 모델
-class SummaryRequest(BaseModel):
-    text: str
+async def stream_delta_events(deltas):
+    """
+    토큰 스트림을 SSE 이벤트로 전달합니다. 마지막에 done 또는 error 이벤트를 보냅니다.
+    """
+    try:
+        async for delta in deltas:
+            yield sse_event({"delta": delta})
+        yield sse_event({}, event="done")
+    except SchedulerRejected as e:
+        logger.warning(f"GPT 스트리밍 거절: {e.reason}")
+        yield sse_event({"message": str(e), "code": e.reason, "retry_after": e.retry_after}, event="error")
+    except Exception as e:
+        logger.error(f"GPT 스트리밍 오류: {str(e)}")
+        yield sse_event({"message": f"생성 중 오류가 발생했습니다: {str(e)}"}, event="error")
 
 @app.get("/")
 async def root():
@@ -77,234 +169,403 @@ async def root():
 async def websocket_audio_stream(websocket: WebSocket):
     """
     실시간 음성 스트리밍을 위한 웹소켓 엔드포인트
+
+    framing=v1로 연결하면 바이너리 프레임(audio_frames.py: 시퀀스/타임스탬프/포맷 헤더 + PCM16/µ-law/A-law)을,
+    그렇지 않으면 헤더 없는 16kHz/16bit/mono PCM을 받습니다.
     """
-    await manager.connect(websocket)
-    logger.info("실시간 음성 스트리밍 웹소켓 연결됨")
+    # 클라이언트는 오디오만 보내 ping에 응답할 수 없고 음소거/보류 중에는 수신이 없으므로 유휴 정리에서 제외
+    connection = await manager.connect(websocket, kind="audio", reap_idle=False)
+    
+    # 모델 제공자를 사용할 수 없으면 청크마다 실패하는 대신 한 번 알리고 종료
+    if not inference.available:
+        logger.error("OpenAI API 키가 설정되지 않아 실시간 음성 변환을 시작할 수 없습니다.")
+        connection.send({
+            "type": "error",
+            "message": "OpenAI API 키가 설정되지 않았습니다. .env 파일에 OPENAI_API_KEY를 추가해주세요."
+        })
+        await manager.close(connection, code=1011)
+        return
+    
+    # 통화 세션: 확정 전사를 기록 (같은 call_id로 분석 웹소켓/REST 요청과 공유)
+    call = await call_store.attach(websocket.query_params.get("call_id"))
+    connection.send({"type": "session", "call_id": call.call_id})
+    
+    # 세션별 프레임 디코더(순서 재정렬, 16kHz 변환), 오디오 링 버퍼와 증분 텍스트 병합기
+    decoder = AudioStreamDecoder(
+        framed=websocket.query_params.get(FRAMING_PARAM) == FRAMING_V1,
+        reorder_window=settings.AUDIO_REORDER_WINDOW,
+        max_gap_fill=settings.AUDIO_MAX_GAP_FILL_SECONDS
+    )
+    ring_buffer = PCMRingBuffer(capacity_seconds=settings.STREAM_BUFFER_SECONDS)
+    merger = TranscriptMerger()
+    
+    # 세션별로 재사용하는 인메모리 WAV 인코더 (16kHz, 16bit, mono)
+    wav_encoder = WavEncoder()
+    vad = VoiceActivityDetector(
+        energy_threshold_db=settings.VAD_ENERGY_THRESHOLD_DB,
+        min_speech_ratio=settings.VAD_MIN_SPEECH_RATIO
+    )
+    # 음향 특징: 전사와 무관하게 모든 청크(무음 포함)에서 흥분도를 계산해 바로 전송
+    acoustic = AcousticAnalyzer() if settings.ACOUSTIC_ENABLED else None
+    acoustic_sent_at = 0.0
+    chunk_seq = 0
+    last_hypothesis = None
     
-    # 중복 텍스트 방지를 위한 변수
-    last_transcript = ""
+    async def send_transcript_update(update):
+        # 확정된 텍스트는 transcription, 미확정 꼬리만 바뀐 경우 partial_transcription
+        if not update.committed and not update.tentative:
+            TRANSCRIPTS_FILTERED.inc(reason="empty")
+            return
+        entry = call.append_transcript(update.committed, source="stt") if update.committed else None
+        if entry is not None:
+            manager.publish_call_event(call.call_id, {"type": "transcript", "text": entry.text, "source": entry.source})
+            summarizer.schedule(call)
+        # 아직 보내지 못한 미확정 결과는 새 결과로 대체
+        connection.send(
+            {
+                "type": "transcription" if update.committed else "partial_transcription",
+                "text": update.committed,
+                "tentative": update.tentative,
+                "timestamp": asyncio.get_event_loop().time()
+            },
+            merge_key=None if update.committed else "partial_transcription"
+        )
     
     try:
         while True:
             # 클라이언트로부터 오디오 청크 수신
-            data = await websocket.receive_bytes()
-            logger.info(f"오디오 청크 수신됨: {len(data)} bytes")
+            message = await websocket.receive_bytes()
+            received_at = time.perf_counter()
+            connection.touch()
             
-            # 임시 파일로 저장
-            temp_file_path = os.path.join(settings.UPLOAD_DIR, f"temp_chunk_{id(websocket)}_{int(asyncio.get_event_loop().time())}.wav")
+            # 프레임 디코딩 (앞선 프레임을 기다리는 중이면 아직 처리할 오디오 없음)
+            try:
+                data = decoder.feed(message)
+            except FrameError as e:
+                logger.warning(f"잘못된 음성 프레임: {e}")
+                connection.send({"type": "error", "message": f"음성 프레임을 해석할 수 없습니다: {e}"})
+                continue
+            if not data:
+                continue
+            chunk_seq += 1
+            logger.info(f"오디오 청크 수신됨: {len(message)} bytes", extra=hot("audio_chunk"))
+            
+            if acoustic is not None:
+                with STAGE_SECONDS.time(stage="acoustic"):
+                    features = acoustic.feed(data)
+                if features is not None:
+                    call.update_agitation(features.agitation)
+                    manager.publish_call_event(
+                        call.call_id, {"type": "agitation", "agitation": call.agitation, "at": call.agitation_at}
+                    )
+                    # 아직 보내지 못한 이전 흥분도는 최신 값으로 대체
+                    if received_at - acoustic_sent_at >= settings.ACOUSTIC_SEND_INTERVAL:
+                        acoustic_sent_at = received_at
+                        connection.send(features.as_message(), merge_key="acoustic")
+            
+            # 무음/잡음 청크는 Whisper 호출 없이 건너뜀
+            if settings.VAD_ENABLED:
+                vad_result = vad.analyze(data)
+                if not vad_result.is_speech:
+                    AUDIO_CHUNKS.inc(result="silence")
+                    logger.debug(
+                        f"무음 청크 건너뜀: 음성 비율 {vad_result.speech_ratio:.2f}, {vad_result.rms_db:.1f} dBFS",
+                        extra=hot("silent_chunk")
+                    )
+                    # 발화가 끝났으므로 미확정 텍스트를 확정하고 윈도우 초기화
+                    if len(ring_buffer):
+                        ring_buffer.clear()
+                        await send_transcript_update(merger.flush())
+                    continue
+            
+            ring_buffer.append(data)
+            AUDIO_CHUNKS.inc(result="speech")
+            STAGE_SECONDS.observe(time.perf_counter() - received_at, stage="chunk_receive")
             
             try:
-                # WAV 파일로 저장 (16kHz, 16bit, mono)
-                with wave.open(temp_file_path, 'wb') as wav_file:
-                    wav_file.setnchannels(1)  # mono
-                    wav_file.setsampwidth(2)  # 16bit
-                    wav_file.setframerate(16000)  # 16kHz
-                    wav_file.writeframes(data)
+                # 이전 청크와 겹치는 최근 윈도우를 WAV로 구성
+                with STAGE_SECONDS.time(stage="wav_build"):
+                    window = ring_buffer.latest(settings.STREAM_WINDOW_SECONDS)
+                    upload = wav_encoder.as_upload(window)
                 
-                logger.info(f"임시 파일 저장됨: {temp_file_path}")
+                # 디버그 모드에서만 청크를 디스크에 보존
+                if settings.DEBUG_SAVE_AUDIO_CHUNKS:
+                    debug_file_path = os.path.join(
+                        settings.UPLOAD_DIR,
+                        f"debug_chunk_{id(websocket)}_{chunk_seq}_{uuid.uuid4().hex[:8]}.wav"
+                    )
+                    async with aiofiles.open(debug_file_path, 'wb') as f:
+                        await f.write(upload[1].getbuffer())
+                    logger.info(f"디버그 청크 저장됨: {debug_file_path}")
                 
                 # OpenAI Whisper API 호출
-                with open(temp_file_path, "rb") as audio_file:
-                    transcript = client.audio.transcriptions.create(
-                        model="whisper-1",
-                        file=audio_file,
-                        language="ko"
-                    )
+                transcript_text = await inference.transcribe(upload, language="ko", session=call.call_id)
                 
-                current_text = transcript.text.strip()
-                logger.info(f"실시간 음성 변환 완료: {current_text}")
+                current_text = transcript_text.strip()
+                logger.info("실시간 음성 변환 완료", extra=hot("transcription", transcript=current_text))
                 
                 # 불필요한 텍스트 필터링 (더 관대하게)
                 filtered_text = current_text.replace('시청해주셔서 감사합니다.', '').replace('감사합니다.', '').replace('고맙습니다.', '').strip()
+                if filtered_text != current_text:
+                    TRANSCRIPTS_FILTERED.inc(reason="hallucination")
+                if filtered_text and filtered_text == last_hypothesis:
+                    TRANSCRIPTS_FILTERED.inc(reason="duplicate")
+                last_hypothesis = filtered_text
                 
-                # 중복 텍스트 방지 (더 관대하게)
-                if filtered_text and filtered_text != last_transcript and len(filtered_text) > 1:
-                    last_transcript = filtered_text
-                    
-                    # 결과를 클라이언트로 전송
-                    await manager.send_personal_message(
-                        json.dumps({
-                            "type": "transcription",
-                            "text": filtered_text,
-                            "timestamp": asyncio.get_event_loop().time()
-                        }, ensure_ascii=False),
-                        websocket
-                    )
-                    logger.info(f"중복되지 않은 텍스트 전송: {filtered_text}")
-                else:
-                    logger.info("중복 텍스트 또는 빈 텍스트로 전송 건너뜀")
+                # 겹치는 윈도우 결과를 확정 텍스트/미확정 꼬리로 병합
+                update = merger.update(filtered_text)
+                await send_transcript_update(update)
+                if update.committed:
+                    logger.info("확정 텍스트 전송", extra=hot("transcript_commit", transcript=update.committed))
                 
             except Exception as e:
                 logger.error(f"Whisper API 오류: {str(e)}")
-                await manager.send_personal_message(
-                    json.dumps({
-                        "type": "error",
-                        "message": f"음성 변환 중 오류가 발생했습니다: {str(e)}"
-                    }, ensure_ascii=False),
-                    websocket
-                )
-            finally:
-                # 임시 파일 삭제
-                if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
-                    logger.info(f"임시 파일 삭제됨: {temp_file_path}")
+                connection.send({
+                    "type": "error",
+                    "message": f"음성 변환 중 오류가 발생했습니다: {str(e)}"
+                })
                     
     except WebSocketDisconnect:
         logger.info("실시간 음성 스트리밍 웹소켓 연결 해제됨")
-        manager.disconnect(websocket)
     except Exception as e:
         logger.error(f"웹소켓 오류: {str(e)}")
-        manager.disconnect(websocket)
+    finally:
+        manager.disconnect(connection)
+        call_store.detach(call)
 
 @app.websocket("/ws/real-time-analysis")
 async def websocket_real_time_analysis(websocket: WebSocket):
     """
     실시간 위험도 분석을 위한 웹소켓 엔드포인트
     """
-    await manager.connect(websocket)
-    logger.info("실시간 분석 웹소켓 연결됨")
+    # 클라이언트가 pong으로 응답하므로 유휴 시 서버 ping 허용
+    connection = await manager.connect(websocket, kind="analysis", accepts_ping=True)
+    
+    # 통화 세션: 텍스트 청크와 위험도 결과를 기록하고, 텍스트 없는 요약/스크립트 요청에 사용
+    call = await call_store.attach(websocket.query_params.get("call_id"))
+    connection.send({"type": "session", "call_id": call.call_id})
+    
+    async def analyze_text(text):
+        # 위험도 분석 수행
+        # 모아진 청크가 길면 최근 발화 위주로 줄임 (대체 결과는 전체 텍스트로 계산)
+        model_text = prepare_text(
+            "realtime-risk", text, settings.RISK_INPUT_TOKEN_BUDGET, risk_weight, keep_repeats=True
+        )
+        analysis_text = await inference.chat(
+            model="gpt-3.5-turbo",
+            messages=realtime_risk_messages(model_text),
+            max_tokens=200,
+            temperature=0.1,
+            priority=PRIORITY_RISK,
+            session=call.call_id
+        )
+        # JSON 파싱 실패 시 사전 점수화 결과로 대체
+        return parse_realtime_risk(analysis_text, fallback=prescreener.score(text).as_result())
+    
+    async def send_result(result):
+        # 분석 결과를 송신 큐에 추가 (아직 보내지 못한 이전 위험도 결과는 최신 결과로 대체)
+        if result.get("type") == "risk_analysis":
+            call.record_risk(result)
+            # 같은 통화의 음성 스트림에서 최근 흥분도가 있으면 텍스트 위험도와 결합한 점수를 함께 전송
+            agitation = await call_store.recent_agitation(call, settings.ACOUSTIC_MAX_AGE)
+            if agitation is not None:
+                result = {**result, **fuse_risk(result, agitation, settings.ACOUSTIC_FUSION_WEIGHT)}
+            # '위험' 단계 통화의 모델 호출은 스케줄러에서 먼저 실행 (해제는 최종 결과로만)
+            stage = result.get("fused_risk_stage") or result.get("risk_stage")
+            if stage == RISK_STAGES[-1] or not result.get("provisional"):
+                model_scheduler.set_urgent(call.call_id, stage == RISK_STAGES[-1])
+        connection.send(result, merge_key=risk_merge_key(result))
+    
+    # 진행 중인 분석 동안 도착한 청크는 모아서 한 번에 분석
+    scheduler = RiskAnalysisScheduler(
+        analyze_text,
+        send_result,
+        min_interval=settings.REALTIME_ANALYSIS_MIN_INTERVAL
+    )
+    
+    async def send_error(request_id, error, context):
+        # 별도 태스크의 오류 전송: 연결이 이미 끊겼으면 보낼 곳이 없으므로 조용히 종료
+        if connection.closed:
+            logger.info(f"연결이 끊겨 {context}을(를) 중단합니다: {request_id}")
+            return
+        logger.error(f"{context} 오류: {error}")
+        try:
+            await send_result({
+                "type": "error",
+                "request_id": request_id,
+                "error": str(error)
+            })
+        except ConnectionError:
+            pass
+    
+    async def send_combined_analysis(text, request_id):
+        # 통합 분석 섹션을 완성되는 순서대로 전송
+        try:
+            async for section in stream_combined_analysis(text, prescreener, session=call.call_id):
+                await send_result({"type": "analysis_section", "request_id": request_id, **section})
+        except Exception as e:
+            await send_error(request_id, e, "통합 분석")
+    
+    async def send_token_stream(message_type, text, request_id):
+        # 모델 토큰을 도착하는 즉시 전송 (text가 없으면 통화 전사 기록 사용, 요약은 증분 요약)
+        if message_type == "summarize_stream":
+            kind = "summary"
+            deltas = summarizer.stream_text(text, session=call.call_id) if text.strip() else summarizer.stream_call(call)
+        else:
+            kind = "script"
+            deltas = stream_script(text if text.strip() else call.transcript_text(), session=call.call_id)
+        try:
+            async for delta in deltas:
+                await send_result({"type": "token", "request_id": request_id, "kind": kind, "delta": delta})
+            await send_result({"type": "stream_end", "request_id": request_id, "kind": kind})
+        except Exception as e:
+            await send_error(request_id, e, "GPT 스트리밍")
+    
+    # 수신 루프를 막지 않도록 통합 분석/토큰 스트리밍은 별도 태스크로 실행
+    analysis_tasks = set()
     
     try:
         while True:
             # 클라이언트로부터 메시지 수신
             data = await websocket.receive_text()
+            # 서버 ping에 대한 pong을 포함해 모든 수신 메시지가 하트비트 역할
+            connection.touch()
             message_data = json.loads(data)
             
             message_type = message_data.get("type")
             
             if message_type == "text_chunk":
-                # 텍스트 청크를 받아서 위험도 분석
+                # 텍스트 청크를 받아서 위험도 분석 대기열에 추가
                 text_chunk = message_data.get("text", "")
                 chunk_id = message_data.get("chunk_id", 0)
                 
                 if text_chunk.strip():
-                    try:
-                        # 위험도 분석 수행
-                        response = client.chat.completions.create(
-                            model="gpt-3.5-turbo",
-                            messages=[
-                                {
-                                    "role": "system",
-                                    "content": "당신은 은행 상담사 정서 케어를 위한 AI 어시스턴트입니다. 고객의 대화 내용을 실시간으로 분석하여 위험도를 판단해주세요.\n\n다음 기준으로 위험도를 분류해주세요:\n\n1. 정상 단계 (0-30점): 일반적인 문의나 불만, 정상적인 감정 표현\n2. 경고 단계 (31-70점): 강한 불만, 감정적 표현, 약간의 공격적 어조\n3. 위험 단계 (71-100점): 극도의 분노, 폭력적 표현, 자해/타해 위험, 심각한 감정적 위기\n\n분석 결과를 다음 JSON 형식으로 반환해주세요:\n{\n  \"risk_level\": 점수(0-100),\n  \"risk_stage\": \"정상\" 또는 \"경고\" 또는 \"위험\",\n  \"emotion\": 주요 감정 상태,\n  \"analysis\": 위험도 판단 근거\n}"
-                                },
-                                {
-                                    "role": "user",
-                                    "content": f"다음 고객 대화 내용의 위험도를 실시간으로 분석해주세요: {text_chunk}"
-                                }
-                            ],
-                            max_tokens=200,
-                            temperature=0.1
-                        )
-                        
-                        analysis_text = response.choices[0].message.content.strip()
-                        
-                        # JSON 파싱 시도
-                        try:
-                            analysis_data = json.loads(analysis_text)
-                            risk_result = {
-                                "type": "risk_analysis",
-                                "chunk_id": chunk_id,
-                                "risk_level": analysis_data.get("risk_level", 0),
-                                "risk_stage": analysis_data.get("risk_stage", "정상"),
-                                "emotion": analysis_data.get("emotion", ""),
-                                "analysis": analysis_data.get("analysis", ""),
-                                "text_chunk": text_chunk
-                            }
-                        except json.JSONDecodeError:
-                            # JSON 파싱 실패 시 기본값 사용
-                            risk_result = {
-                                "type": "risk_analysis",
-                                "chunk_id": chunk_id,
-                                "risk_level": 0,
-                                "risk_stage": "정상",
-                                "emotion": "",
-                                "analysis": analysis_text,
-                                "text_chunk": text_chunk
-                            }
-                        
-                        # 분석 결과를 클라이언트에 전송
-                        await manager.send_personal_message(
-                            json.dumps(risk_result, ensure_ascii=False),
-                            websocket
-                        )
-                        
-                        logger.info(f"실시간 위험도 분석 완료 - 청크 {chunk_id}: {risk_result['risk_stage']}")
-                        
-                    except Exception as e:
-                        logger.error(f"실시간 위험도 분석 오류: {e}")
-                        error_result = {
-                            "type": "error",
-                            "chunk_id": chunk_id,
-                            "error": str(e)
-                        }
-                        await manager.send_personal_message(
-                            json.dumps(error_result, ensure_ascii=False),
-                            websocket
+                    entry = call.append_transcript(text_chunk, source="text_chunk")
+                    if entry is not None:
+                        manager.publish_call_event(
+                            call.call_id, {"type": "transcript", "text": entry.text, "source": entry.source}
                         )
+                        summarizer.schedule(call)
+                    # 로컬 사전 점수화 결과를 즉시 잠정 결과로 전송
+                    prescreen = prescreener.score(text_chunk)
+                    await send_result({
+                        "type": "risk_analysis",
+                        "chunk_id": chunk_id,
+                        "chunk_ids": [chunk_id],
+                        **prescreen.as_result(),
+                        "text_chunk": text_chunk,
+                        "provisional": True
+                    })
+                    
+                    # 임계값을 넘었거나 샘플링된 경우에만 LLM 분석 (모델 제공자를 사용할 수 없으면 사전 점수만 사용)
+                    if inference.available and prescreener.should_escalate(prescreen):
+                        scheduler.submit(chunk_id, text_chunk)
+            
+            elif message_type == "analyze_all":
+                # 위험도/요약/스크립트 통합 분석
+                text = message_data.get("text", "") or call.transcript_text()
+                if text.strip():
+                    task = asyncio.create_task(send_combined_analysis(text, message_data.get("request_id")))
+                    analysis_tasks.add(task)
+                    task.add_done_callback(analysis_tasks.discard)
+            
+            elif message_type in ("summarize_stream", "generate_script_stream"):
+                # 요약/스크립트 토큰 스트리밍
+                text = message_data.get("text", "")
+                if text.strip() or call.transcript:
+                    task = asyncio.create_task(send_token_stream(message_type, text, message_data.get("request_id")))
+                    analysis_tasks.add(task)
+                    task.add_done_callback(analysis_tasks.discard)
             
             elif message_type == "ping":
                 # 연결 상태 확인
-                await manager.send_personal_message(
-                    json.dumps({"type": "pong"}),
-                    websocket
-                )
+                connection.send({"type": "pong"})
                 
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
         logger.info("실시간 분석 웹소켓 연결 해제됨")
     except Exception as e:
         logger.error(f"웹소켓 오류: {e}")
-        manager.disconnect(websocket)
+    finally:
+        manager.disconnect(connection)
+        call_store.detach(call)
+        model_scheduler.set_urgent(call.call_id, False)
+        await scheduler.close()
+        for task in list(analysis_tasks):
+            task.cancel()
 
-@app.post("/transcribe")
-async def transcribe_audio(file: UploadFile = File(...)):
+@app.post("/transcribe", openapi_extra=AUDIO_UPLOAD_OPENAPI)
+async def transcribe_audio(request: Request, long_audio: Optional[bool] = None):
     """
     음성 파일을 텍스트로 변환하는 API
+
+    PCM WAV 파일은 LONG_AUDIO_MIN_SECONDS 이상이면(또는 long_audio=true) 무음 지점에서
+    나누어 병렬로 전사하고 구간별 타임스탬프를 함께 반환합니다.
+    long_audio=false이면 항상 한 번에 전사합니다.
     """
+    form = None
     try:
+        # 본문을 청크 단위로 읽으며 파일 크기 검증 (최대 MAX_FILE_SIZE)
+        form, file = await receive_upload(request, "file", settings.MAX_FILE_SIZE)
+        
         # 파일 형식 검증
-        if not file.content_type.startswith('audio/'):
+        if not (file.content_type or "").startswith('audio/'):
             raise HTTPException(status_code=400, detail="오디오 파일만 업로드 가능합니다.")
         
-        # 파일 크기 검증
-        if file.size and file.size > settings.MAX_FILE_SIZE:
-            raise HTTPException(status_code=400, detail="파일 크기가 너무 큽니다. (최대 50MB)")
+        logger.info(f"파일 업로드 완료: {file.filename} ({file.size} bytes)")
         
-        # 임시 파일로 저장
-        temp_file_path = os.path.join(settings.UPLOAD_DIR, f"temp_{file.filename}")
+        # 긴 녹음 분할 전사 (WAV가 아니면 단일 요청으로 처리)
+        recording = None
+        if long_audio is not False:
+            min_seconds = 0.0 if long_audio else settings.LONG_AUDIO_MIN_SECONDS
+            recording = await asyncio.to_thread(open_wav, file.file, min_seconds)
+            if recording is None and long_audio:
+                logger.info(f"분할 전사는 PCM WAV만 지원하여 단일 요청으로 처리합니다: {file.filename}")
         
-        async with aiofiles.open(temp_file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
-        
-        logger.info(f"파일 업로드 완료: {file.filename}")
+        if recording is not None:
+            try:
+                result = await transcribe_segments(
+                    recording,
+                    segment_seconds=settings.LONG_AUDIO_SEGMENT_SECONDS,
+                    search_seconds=settings.LONG_AUDIO_SEARCH_SECONDS,
+                    workers=settings.LONG_AUDIO_WORKERS,
+                    language="ko"
+                )
+            except SchedulerRejected as e:
+                raise overloaded_error(e)
+            except Exception as e:
+                logger.error(f"Whisper API 오류: {str(e)}")
+                raise HTTPException(status_code=500, detail=f"음성 변환 중 오류가 발생했습니다: {str(e)}")
+            
+            return JSONResponse(content={
+                "success": True,
+                "text": result["text"],
+                "segments": result["segments"],
+                "duration": result["duration"],
+                "filename": file.filename,
+                "language": "ko"
+            })
         
-        # OpenAI Whisper API 호출
+        # OpenAI Whisper API 호출 (스풀된 업로드 파일을 복사 없이 전달)
         try:
-            with open(temp_file_path, "rb") as audio_file:
-                transcript = client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    language="ko"  # 한국어로 설정
-                )
+            transcript_text = await inference.transcribe(
+                (file.filename or "audio", file.file, file.content_type),
+                language="ko",  # 한국어로 설정
+                priority=PRIORITY_BATCH  # 녹음 파일은 실시간 처리보다 뒤로
+            )
             
             logger.info(f"음성 변환 완료: {file.filename}")
             
-            # 임시 파일 삭제
-            os.remove(temp_file_path)
-            
             return JSONResponse(content={
                 "success": True,
-                "text": transcript.text,
+                "text": transcript_text,
                 "filename": file.filename,
                 "language": "ko"
             })
             
+        except SchedulerRejected as e:
+            raise overloaded_error(e)
         except Exception as e:
             logger.error(f"Whisper API 오류: {str(e)}")
-            # 임시 파일 삭제
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
             raise HTTPException(status_code=500, detail=f"음성 변환 중 오류가 발생했습니다: {str(e)}")
             
     except HTTPException:
@@ -312,57 +573,64 @@ async def transcribe_audio(file: UploadFile = File(...)):
     except Exception as e:
         logger.error(f"예상치 못한 오류: {str(e)}")
         raise HTTPException(status_code=500, detail="서버 오류가 발생했습니다.")
+    finally:
+        if form is not None:
+            await form.close()
 
 @app.post("/summarize")
 async def summarize_text(request: SummaryRequest):
     """
     텍스트를 요약하는 API
     """
+    text, call = await request_text(request)
     try:
         # API 키 확인
-        if not settings.OPENAI_API_KEY:
+        if not inference.available:
             logger.error("OpenAI API 키가 설정되지 않았습니다.")
             raise HTTPException(
                 status_code=500, 
                 detail="OpenAI API 키가 설정되지 않았습니다. .env 파일에 OPENAI_API_KEY를 추가해주세요."
             )
         
-        if not request.text.strip():
+        if not text.strip():
             raise HTTPException(status_code=400, detail="요약할 텍스트가 없습니다.")
         
         # 텍스트 길이 검증 (10자 이상으로 변경)
-        if len(request.text.strip()) < 10:
+        if len(text.strip()) < 10:
             raise HTTPException(status_code=400, detail="요약할 텍스트가 너무 짧습니다. 최소 10자 이상이 필요합니다.")
         
-        logger.info(f"요약 요청 받음: 텍스트 길이 {len(request.text)}자")
+        logger.info(f"요약 요청 받음: 텍스트 길이 {len(text)}자")
         
         # OpenAI GPT API 호출
         try:
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "당신은 은행 상담사 정서 케어를 위한 AI 어시스턴트입니다. 고객의 문의 내용을 분석하여 3-4문장으로 간결하고 명확하게 요약해주세요.\n\n다음 순서로 요약해주세요:\n1. 고객의 주요 문의사항과 상황\n2. 고객의 감정 상태와 배경\n3. 고객이 직면한 문제나 어려움\n4. 고객이 원하는 해결책이나 추가 문의사항\n\n격식체로 작성하고, 자연스럽게 연결되는 문장들로 구성해주세요. 전체 내용을 종합적으로 분석하여 요약해주세요."
-                    },
-                    {
-                        "role": "user",
-                        "content": f"다음 고객 문의 내용을 전체적으로 분석하여 요약해주세요: {request.text}"
-                    }
-                ],
-                max_tokens=400,
-                temperature=0.1
-            )
+            if call is not None:
+                # 저장된 통화는 이전 요약에 새 전사만 합치는 증분 요약
+                summary = await summarizer.summarize_call(call)
+            else:
+                # 반복된 전사 조각을 제거하고, 그래도 길면 구간별 요약 후 합침
+                model_text = prepare_text("summarize", text)
+                if summarizer.fits_direct(model_text):
+                    summary = await cached_chat(
+                        "summarize",
+                        model_text,
+                        model="gpt-3.5-turbo",
+                        messages=summary_messages(model_text),
+                        max_tokens=400,
+                        temperature=0.1
+                    )
+                else:
+                    summary = await summarizer.map_reduce(model_text)
             
-            summary = response.choices[0].message.content.strip()
-            logger.info(f"텍스트 요약 완료: {summary}")
+            logger.info(f"텍스트 요약 완료: {len(summary)}자", extra={"summary": summary})
             
             return JSONResponse(content={
                 "success": True,
                 "summary": summary,
-                "original_text": request.text
+                "original_text": text
             })
             
+        except SchedulerRejected as e:
+            raise overloaded_error(e)
         except Exception as e:
             logger.error(f"GPT API 오류: {str(e)}")
             raise HTTPException(status_code=500, detail=f"요약 중 오류가 발생했습니다: {str(e)}")
@@ -378,51 +646,52 @@ async def generate_script(request: SummaryRequest):
     """
     고객 대화 내용을 분석하여 맞춤형 상담 스크립트를 생성하는 API
     """
+    text, call = await request_text(request)
+    last_entry = call.last_entry if call is not None else None
     try:
         # API 키 확인
-        if not settings.OPENAI_API_KEY:
+        if not inference.available:
             logger.error("OpenAI API 키가 설정되지 않았습니다.")
             raise HTTPException(
                 status_code=500, 
                 detail="OpenAI API 키가 설정되지 않았습니다. .env 파일에 OPENAI_API_KEY를 추가해주세요."
             )
         
-        if not request.text.strip():
+        if not text.strip():
             logger.error("스크립트를 생성할 텍스트가 없습니다.")
             raise HTTPException(status_code=400, detail="스크립트를 생성할 텍스트가 없습니다.")
         
-        logger.info(f"스크립트 생성 요청 받음: 텍스트 길이 {len(request.text)}자")
-        logger.info(f"스크립트 생성할 텍스트 미리보기: {request.text[:100]}...")
+        logger.info(f"스크립트 생성 요청 받음: 텍스트 길이 {len(text)}자")
+        logger.info("스크립트 생성할 텍스트 미리보기", extra={"text": text[:100]})
         
         # OpenAI GPT API 호출
         try:
             logger.info("OpenAI GPT API 호출 시작...")
-            response = client.chat.completions.create(
+            session = call.call_id if call is not None else None
+            model_text = await script_input(text, session)
+            script = await cached_chat(
+                "generate-script",
+                model_text,
                 model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "당신은 은행 상담사 정서 케어를 위한 AI 어시스턴트입니다. 고객의 문의 내용을 분석하여 상담사가 사용할 수 있는 맞춤형 대응 스크립트를 생성해주세요.\n\n다음 3단계로 구성된 자연스러운 대화 스크립트를 작성해주세요:\n\n먼저 고객의 상황과 감정에 대한 이해와 공감을 표현하고, 그 다음 고객의 문제에 대한 구체적이고 실용적인 해결 방안을 제시하며, 마지막으로 향후 유사한 문제 방지를 위한 추가 서비스나 안내를 제공해주세요.\n\n각 단계는 자연스럽게 연결되며, '1단계', '2단계' 등의 번호 표기는 사용하지 말고 고객의 감정 상태와 문의 내용에 맞는 따뜻하고 전문적인 톤으로 자연스러운 대화 형식으로 작성해주세요. 반드시 완전한 문장으로 끝내주세요."
-                    },
-                    {
-                        "role": "user",
-                        "content": f"다음 고객 문의 내용을 바탕으로 상담 스크립트를 생성해주세요: {request.text}"
-                    }
-                ],
+                messages=script_messages(model_text),
                 max_tokens=600,
-                temperature=0.3
+                temperature=0.3,
+                session=session
             )
             
-            script = response.choices[0].message.content.strip()
-            logger.info(f"상담 스크립트 생성 완료: {script[:100]}...")
+            logger.info("상담 스크립트 생성 완료", extra={"script": script[:100]})
+            if call is not None:
+                call.save_result("script", script, last_entry)
             logger.info(f"스크립트 길이: {len(script)}자")
             
             return JSONResponse(content={
                 "success": True,
                 "script": script,
-                "original_text": request.text
+                "original_text": text
             })
             
+        except SchedulerRejected as e:
+            raise overloaded_error(e)
         except Exception as e:
             logger.error(f"GPT API 오류: {str(e)}")
             raise HTTPException(status_code=500, detail=f"스크립트 생성 중 오류가 발생했습니다: {str(e)}")
@@ -433,79 +702,102 @@ async def generate_script(request: SummaryRequest):
         logger.error(f"예상치 못한 오류: {str(e)}")
         raise HTTPException(status_code=500, detail="서버 오류가 발생했습니다.")
 
+@app.post("/summarize/stream")
+async def summarize_text_stream(request: SummaryRequest):
+    """
+    텍스트 요약 결과를 토큰 단위로 스트리밍하는 API (SSE)
+    """
+    text, call = await request_text(request)
+    # API 키 확인
+    if not inference.available:
+        logger.error("OpenAI API 키가 설정되지 않았습니다.")
+        raise HTTPException(
+            status_code=500, 
+            detail="OpenAI API 키가 설정되지 않았습니다. .env 파일에 OPENAI_API_KEY를 추가해주세요."
+        )
+    
+    if not text.strip():
+        raise HTTPException(status_code=400, detail="요약할 텍스트가 없습니다.")
+    
+    if len(text.strip()) < 10:
+        raise HTTPException(status_code=400, detail="요약할 텍스트가 너무 짧습니다. 최소 10자 이상이 필요합니다.")
+    
+    logger.info(f"요약 스트리밍 요청 받음: 텍스트 길이 {len(text)}자")
+    
+    # 저장된 통화는 증분 요약, 직접 보낸 텍스트는 (길면 계층적으로) 전체 요약
+    deltas = summarizer.stream_call(call) if call is not None else summarizer.stream_text(text)
+    return StreamingResponse(
+        stream_delta_events(deltas),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+@app.post("/generate-script/stream")
+async def generate_script_stream(request: SummaryRequest):
+    """
+    상담 스크립트를 토큰 단위로 스트리밍하는 API (SSE)
+    """
+    text, call = await request_text(request)
+    # API 키 확인
+    if not inference.available:
+        logger.error("OpenAI API 키가 설정되지 않았습니다.")
+        raise HTTPException(
+            status_code=500, 
+            detail="OpenAI API 키가 설정되지 않았습니다. .env 파일에 OPENAI_API_KEY를 추가해주세요."
+        )
+    
+    if not text.strip():
+        raise HTTPException(status_code=400, detail="스크립트를 생성할 텍스트가 없습니다.")
+    
+    logger.info(f"스크립트 스트리밍 요청 받음: 텍스트 길이 {len(text)}자")
+    
+    return StreamingResponse(
+        stream_delta_events(stream_script(text, session=call.call_id if call is not None else None)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
 @app.post("/analyze-risk")
 async def analyze_risk(request: SummaryRequest):
     """
     고객 대화 내용을 분석하여 위험도를 판단하는 API
     """
+    text, _ = await request_text(request)
     try:
-        # API 키 확인
-        if not settings.OPENAI_API_KEY:
-            logger.error("OpenAI API 키가 설정되지 않았습니다.")
-            raise HTTPException(
-                status_code=500, 
-                detail="OpenAI API 키가 설정되지 않았습니다. .env 파일에 OPENAI_API_KEY를 추가해주세요."
-            )
-        
-        if not request.text.strip():
+        if not text.strip():
             raise HTTPException(status_code=400, detail="분석할 텍스트가 없습니다.")
         
-        logger.info(f"위험도 분석 요청 받음: 텍스트 길이 {len(request.text)}자")
+        logger.info(f"위험도 분석 요청 받음: 텍스트 길이 {len(text)}자")
         
-        # OpenAI GPT API 호출
-        try:
-            response = client.chat.completions.create(
+        async def chat(model_text, messages):
+            # API 키 확인 (사전 점수화만으로 끝나면 모델을 호출하지 않으므로 필요할 때만)
+            if not inference.available:
+                logger.error("OpenAI API 키가 설정되지 않았습니다.")
+                raise HTTPException(
+                    status_code=500, 
+                    detail="OpenAI API 키가 설정되지 않았습니다. .env 파일에 OPENAI_API_KEY를 추가해주세요."
+                )
+            return await cached_chat(
+                "analyze-risk",
+                model_text,
                 model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "당신은 은행 상담사 정서 케어를 위한 AI 어시스턴트입니다. 고객의 대화 내용을 분석하여 위험도를 판단해주세요.\n\n다음 기준으로 위험도를 분류해주세요:\n\n1. 정상 단계 (0-30점): 일반적인 문의나 불만, 정상적인 감정 표현\n2. 경고 단계 (31-70점): 강한 불만, 감정적 표현, 약간의 공격적 어조\n3. 위험 단계 (71-100점): 극도의 분노, 폭력적 표현, 자해/타해 위험, 심각한 감정적 위기\n\n분석 결과를 다음 JSON 형식으로 반환해주세요:\n{\n  \"risk_level\": 점수(0-100),\n  \"risk_stage\": \"정상\" 또는 \"경고\" 또는 \"위험\",\n  \"emotion\": 주요 감정 상태,\n  \"analysis\": 위험도 판단 근거\n}"
-                    },
-                    {
-                        "role": "user",
-                        "content": f"다음 고객 대화 내용의 위험도를 분석해주세요: {request.text}"
-                    }
-                ],
+                messages=messages,
                 max_tokens=300,
                 temperature=0.1
             )
+        
+        # 명시적인 분석 요청은 사전에 없는 위협 표현도 놓치지 않도록 사전 점수와 관계없이 모델로 분석
+        # (모델 제공자가 없으면 이전처럼 사전 점수 임계값 이상일 때만 모델 호출 시도)
+        try:
+            result = await analyze_risk_text(
+                text, prescreener, chat, settings.RISK_INPUT_TOKEN_BUDGET, gate=not inference.available
+            )
+            return JSONResponse(content={"success": True, **result})
             
-            analysis_text = response.choices[0].message.content.strip()
-            logger.info(f"위험도 분석 완료: {analysis_text}")
-            
-            # JSON 파싱 시도
-            try:
-                import json
-                analysis_data = json.loads(analysis_text)
-                return JSONResponse(content={
-                    "success": True,
-                    "risk_level": analysis_data.get("risk_level", 0),
-                    "risk_stage": analysis_data.get("risk_stage", "정상"),
-                    "emotion": analysis_data.get("emotion", ""),
-                    "analysis": analysis_data.get("analysis", ""),
-                    "raw_response": analysis_text
-                })
-            except json.JSONDecodeError:
-                # JSON 파싱 실패 시 텍스트에서 정보 추출
-                risk_level = 0
-                risk_stage = "정상"
-                
-                if "위험" in analysis_text:
-                    risk_stage = "위험"
-                    risk_level = 80
-                elif "경고" in analysis_text:
-                    risk_stage = "경고"
-                    risk_level = 50
-                
-                return JSONResponse(content={
-                    "success": True,
-                    "risk_level": risk_level,
-                    "risk_stage": risk_stage,
-                    "emotion": "",
-                    "analysis": analysis_text,
-                    "raw_response": analysis_text
-                })
-            
+        except HTTPException:
+            raise
+        except SchedulerRejected as e:
+            raise overloaded_error(e)
         except Exception as e:
             logger.error(f"GPT API 오류: {str(e)}")
             raise HTTPException(status_code=500, detail=f"위험도 분석 중 오류가 발생했습니다: {str(e)}")
@@ -516,13 +808,125 @@ async def analyze_risk(request: SummaryRequest):
         logger.error(f"예상치 못한 오류: {str(e)}")
         raise HTTPException(status_code=500, detail="서버 오류가 발생했습니다.")
 
+@app.post("/analyze-all")
+async def analyze_all(request: SummaryRequest):
+    """
+    위험도, 요약, 상담 스크립트를 한 번의 모델 호출로 생성하여
+    섹션이 완성되는 순서대로 스트리밍하는 API (NDJSON)
+    """
+    text, _ = await request_text(request)
+    # API 키 확인
+    if not inference.available:
+        logger.error("OpenAI API 키가 설정되지 않았습니다.")
+        raise HTTPException(
+            status_code=500, 
+            detail="OpenAI API 키가 설정되지 않았습니다. .env 파일에 OPENAI_API_KEY를 추가해주세요."
+        )
+    
+    if not text.strip():
+        raise HTTPException(status_code=400, detail="분석할 텍스트가 없습니다.")
+    
+    logger.info(f"통합 분석 요청 받음: 텍스트 길이 {len(text)}자")
+    
+    async def section_stream():
+        try:
+            async for section in stream_combined_analysis(text, prescreener):
+                yield json.dumps(section, ensure_ascii=False) + "\n"
+        except SchedulerRejected as e:
+            logger.warning(f"통합 분석 거절: {e.reason}")
+            yield json.dumps({
+                "section": "error",
+                "message": str(e),
+                "code": e.reason,
+                "retry_after": e.retry_after
+            }, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.error(f"통합 분석 오류: {str(e)}")
+            yield json.dumps({
+                "section": "error",
+                "message": f"통합 분석 중 오류가 발생했습니다: {str(e)}"
+            }, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(section_stream(), media_type="application/x-ndjson")
+
+@app.get("/calls/{call_id}")
+async def get_call(call_id: str, timeline_limit: Optional[int] = None):
+    """
+    통화 세션의 전사 기록, 위험도 시계열과 마지막 요약/스크립트
+    """
+    call = await call_store.load(call_id)
+    if call is None:
+        raise HTTPException(status_code=404, detail="상담 세션을 찾을 수 없습니다.")
+    return call.as_dict(timeline_limit)
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """
+    응답 캐시 적중/미스 통계
+    """
+    return response_cache.stats()
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus 형식 메트릭 (단계별 처리 시간, 카운터, 연결 수, 이벤트 루프 지연)
+    """
+    return PlainTextResponse(registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.on_event("startup")
+async def start_background_monitors():
+    """
+    이벤트 루프 지연 측정, 메시지 버스 구독, 웹소켓 하트비트와 통화 세션 주기적 기록 시작
+    """
+    loop_lag_monitor.start()
+    await manager.start()
+    call_store.start()
+
+@app.on_event("shutdown")
+async def shutdown_inference_client():
+    """
+    공유 모델 클라이언트의 커넥션 풀과 캐시 정리, 남은 통화 세션 기록
+    """
+    await loop_lag_monitor.stop()
+    await manager.stop()
+    await summarizer.close()
+    await call_store.stop()
+    await inference.aclose()
+    response_cache.close()
+
 @app.get("/health")
 async def health_check():
     """
     서버 상태 확인
     """
-    return {"status": "healthy", "message": "서버가 정상적으로 작동 중입니다."}
+    return {
+        "status": "healthy",
+        "message": "서버가 정상적으로 작동 중입니다.",
+        "worker": manager.worker_id,
+        "connections": len(manager),
+        "upstream": inference.circuit_states()
+    }
+
+@app.get("/sessions")
+async def list_sessions():
+    """
+    전체 워커의 웹소켓 세션 목록 (메시지 버스의 세션 목록 기준)
+    """
+    try:
+        sessions = await manager.sessions()
+    except BusError as e:
+        raise HTTPException(status_code=503, detail=f"메시지 버스에 연결할 수 없습니다: {e}")
+    workers = sorted({info["worker"] for info in sessions.values()})
+    return {"bus": manager.bus.name, "workers": workers, "count": len(sessions), "sessions": sessions}
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    if settings.WORKERS > 1:
+        if not settings.BUS_URL:
+            # 워커들이 공유할 버스가 없으면 로컬 대역 버스 서버를 이 프로세스에서 실행
+            from bus_server import start_background_server
+            os.environ["BUS_URL"] = start_background_server()
+            print(f"로컬 메시지 버스 서버 실행: {os.environ['BUS_URL']}")
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=settings.WORKERS)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,388 @@
+"""
+Prometheus 텍스트 형식 메트릭
+
+외부 의존성 없이 카운터/게이지/히스토그램을 제공하고 /metrics 엔드포인트에서
+Prometheus 노출 형식(text/plain; version=0.0.4)으로 내보냅니다.
+"""
+
+import asyncio
+import bisect
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 파이프라인 단계별 지연 시간(초) 버킷
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} 레이블이 올바르지 않습니다: {sorted(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(Metric):
+    """
+    현재 값 게이지. set_function으로 수집 시점에 값을 읽어올 수도 있습니다.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float]):
+        self._function = function
+
+    def _samples(self) -> List[str]:
+        if self._function is not None:
+            return [f"{self.name} {_format_value(self._function())}"]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 레이블 조합 -> [버킷별 개수(누적 아님)..., +Inf 개수], 합계
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            self._sums[key] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """
+        with 블록의 실행 시간을 기록합니다. (예외가 발생해도 기록)
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(self._key(labels), []))
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key in sorted(self._counts):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), self._counts[key]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(self._sums[key])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"이미 등록된 메트릭입니다: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+class EventLoopLagMonitor:
+    """
+    interval마다 깨어나 예정 시각보다 늦어진 시간을 이벤트 루프 지연으로 기록합니다.
+
+    최근 값과 최근 window초 동안의 최댓값을 게이지로 내보냅니다.
+    """
+
+    def __init__(self, last_gauge: Gauge, max_gauge: Gauge, interval: float = 0.5, window: float = 60.0):
+        self.interval = interval
+        self._last_gauge = last_gauge
+        self._max_gauge = max_gauge
+        self._recent: deque = deque(maxlen=max(1, int(window / interval)))
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self._recent.append(lag)
+            self._last_gauge.set(lag)
+            self._max_gauge.set(max(self._recent))
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "counselor_stage_seconds",
+    "파이프라인 단계별 처리 시간(초)",
+    ["stage"],
+)
+AUDIO_CHUNKS = registry.counter(
+    "counselor_audio_chunks_total",
+    "수신한 음성 청크 수 (VAD 결과별)",
+    ["result"],
+)
+AUDIO_FRAMES = registry.counter(
+    "counselor_audio_frames_total",
+    "수신한 음성 프레임 수 (in_order/reordered/late/lost)",
+    ["result"],
+)
+AUDIO_BYTES = registry.counter(
+    "counselor_audio_bytes_total",
+    "수신한 음성 웹소켓 메시지 크기(바이트, 코덱별)",
+    ["codec"],
+)
+TRANSCRIPTS_FILTERED = registry.counter(
+    "counselor_transcripts_filtered_total",
+    "전송하지 않거나 걸러낸 전사 결과 수 (사유별)",
+    ["reason"],
+)
+JSON_PARSE_FALLBACKS = registry.counter(
+    "counselor_json_parse_fallbacks_total",
+    "모델 응답 JSON 파싱 실패로 대체 값을 사용한 횟수",
+    ["source"],
+)
+UPSTREAM_REQUESTS = registry.counter(
+    "counselor_upstream_requests_total",
+    "모델 제공자 호출 수",
+    ["operation"],
+)
+UPSTREAM_ERRORS = registry.counter(
+    "counselor_upstream_errors_total",
+    "모델 제공자 호출 실패 수",
+    ["operation"],
+)
+UPSTREAM_RETRIES = registry.counter(
+    "counselor_upstream_retries_total",
+    "모델 제공자 호출 재시도 수",
+    ["operation"],
+)
+UPSTREAM_HEDGES = registry.counter(
+    "counselor_upstream_hedges_total",
+    "느린 호출에 보낸 헤지(중복) 요청 수 (launched/won)",
+    ["operation", "outcome"],
+)
+CIRCUIT_STATE = registry.gauge(
+    "counselor_circuit_state",
+    "업스트림 회로 차단기 상태 (0: closed, 1: half_open, 2: open)",
+    ["operation"],
+)
+MODEL_FALLBACKS = registry.counter(
+    "counselor_model_fallbacks_total",
+    "업스트림 장애로 로컬 대역(사전 점수화) 응답을 사용한 횟수",
+    ["operation"],
+)
+ACTIVE_CONNECTIONS = registry.gauge(
+    "counselor_active_connections",
+    "현재 열린 웹소켓 연결 수",
+)
+WS_QUEUED_MESSAGES = registry.gauge(
+    "counselor_ws_queued_messages",
+    "웹소켓 송신 큐에 대기 중인 메시지 수 (전체 연결 합계)",
+)
+WS_MESSAGES_DROPPED = registry.counter(
+    "counselor_ws_messages_dropped_total",
+    "웹소켓 송신 큐에서 버리거나 합친 메시지 수 (merged/overflow/slow_consumer)",
+    ["reason"],
+)
+BUS_MESSAGES = registry.counter(
+    "counselor_bus_messages_total",
+    "워커 간 메시지 버스로 발행/수신한 메시지 수",
+    ["direction"],
+)
+BUS_ERRORS = registry.counter(
+    "counselor_bus_errors_total",
+    "메시지 버스 명령/구독 실패 수",
+    ["operation"],
+)
+CACHE_REQUESTS = registry.counter(
+    "counselor_cache_requests_total",
+    "모델 응답 캐시 조회 결과별 횟수 (memory_hit/disk_hit/coalesced/miss)",
+    ["result"],
+)
+CACHE_ENTRIES = registry.gauge(
+    "counselor_cache_entries",
+    "메모리 응답 캐시 항목 수",
+)
+CACHE_INFLIGHT = registry.gauge(
+    "counselor_cache_inflight",
+    "응답 캐시에서 진행 중인(공유되는) 업스트림 호출 수",
+)
+SUMMARY_UPDATES = registry.counter(
+    "counselor_summary_updates_total",
+    "통화 요약 처리 방식별 횟수 (cached/fold/full/map_reduce/compact)",
+    ["mode"],
+)
+PROMPT_TOKENS_SAVED = registry.histogram(
+    "counselor_prompt_tokens_saved",
+    "요청 하나에서 입력 전처리로 줄인 토큰 수 (엔드포인트별)",
+    ["endpoint"],
+    buckets=(0, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000),
+)
+PROMPT_TOKENS_SAVED_TOTAL = registry.counter(
+    "counselor_prompt_tokens_saved_total",
+    "입력 전처리로 줄인 토큰 수 합계 (dedupe/truncate/compact)",
+    ["endpoint", "technique"],
+)
+SCHEDULER_QUEUED = registry.gauge(
+    "counselor_scheduler_queued",
+    "모델 호출 스케줄러에서 실행을 기다리는 요청 수 (우선순위별)",
+    ["priority"],
+)
+SCHEDULER_WAIT_SECONDS = registry.histogram(
+    "counselor_scheduler_wait_seconds",
+    "모델 호출이 실행되기까지 대기한 시간(초, 우선순위별)",
+    ["priority"],
+)
+SCHEDULER_REJECTED = registry.counter(
+    "counselor_scheduler_rejected_total",
+    "실행하지 않고 거절하거나 버린 모델 호출 수 (overloaded/deadline/circuit_open)",
+    ["priority", "reason"],
+)
+CALL_SESSIONS = registry.gauge(
+    "counselor_call_sessions",
+    "메모리에 있는 통화 세션 수",
+)
+EVENT_LOOP_LAG = registry.gauge(
+    "counselor_event_loop_lag_seconds",
+    "가장 최근에 측정한 이벤트 루프 지연(초)",
+)
+EVENT_LOOP_LAG_MAX = registry.gauge(
+    "counselor_event_loop_lag_max_seconds",
+    "최근 60초 동안의 최대 이벤트 루프 지연(초)",
+)
+LOG_RECORDS_DROPPED = registry.counter(
+    "counselor_log_records_dropped_total",
+    "출력하지 않고 버린 로그 레코드 수 (샘플링/초당 제한/큐 가득 참)",
+    ["reason"],
+)
+
+loop_lag_monitor = EventLoopLagMonitor(EVENT_LOOP_LAG, EVENT_LOOP_LAG_MAX)
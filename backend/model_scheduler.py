@@ -0,0 +1,341 @@
+"""
+프로세스 전체 모델 호출 스케줄러
+
+모든 업스트림 모델 호출(STT, 채팅)은 호출 전에 여기서 실행 순서를 받습니다.
+
+- 우선순위: 실시간 위험도 분석 > 실시간 전사 > 요약/스크립트 > 배치
+  같은 우선순위 안에서는 도착 순서대로 실행합니다.
+- '위험' 단계 통화(set_urgent)의 요청은 같은 우선순위의 다른 통화보다 먼저 실행되고,
+  요약/스크립트도 실시간 처리용으로 남겨 둔 동시 호출 슬롯을 사용할 수 있습니다.
+- 업스트림 요청 한도(분당 요청 수/토큰 수)에 맞춘 토큰 버킷으로 호출 속도를 제한합니다.
+  버킷은 작업(chat/stt)별이므로 채팅이 한도에 걸려 기다리는 동안에도 전사 요청은 실행됩니다.
+- 대기 제한 시간(deadline)이 지나도록 실행되지 못한 요청은 버립니다. (실시간 결과는 늦으면 쓸모 없음)
+- 우선순위별 대기열이 가득 차면 새 요청을 바로 거절합니다. (SchedulerRejected, HTTP 503)
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from config import settings
+from metrics import SCHEDULER_QUEUED, SCHEDULER_REJECTED, SCHEDULER_WAIT_SECONDS
+from token_budget import count_message_tokens
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_RISK = 0
+PRIORITY_TRANSCRIPTION = 1
+PRIORITY_SUMMARY = 2
+PRIORITY_BATCH = 3
+PRIORITY_NAMES = {
+    PRIORITY_RISK: "risk",
+    PRIORITY_TRANSCRIPTION: "transcription",
+    PRIORITY_SUMMARY: "summary",
+    PRIORITY_BATCH: "batch",
+}
+
+
+class SchedulerRejected(RuntimeError):
+    """
+    업스트림에 보내지 않고 거절한 요청
+
+    reason: overloaded(대기열 가득 참), deadline(대기 제한 시간 초과), circuit_open(업스트림 장애로 회로 차단)
+    """
+
+    MESSAGES = {
+        "overloaded": "요청이 많아 지금은 처리할 수 없습니다. 잠시 후 다시 시도해주세요.",
+        "deadline": "요청이 많아 제한 시간 안에 처리하지 못했습니다. 잠시 후 다시 시도해주세요.",
+        "circuit_open": "모델 서버 응답이 원활하지 않아 잠시 사용할 수 없습니다. 잠시 후 다시 시도해주세요.",
+    }
+
+    def __init__(self, reason: str, priority: int, retry_after: float = 1.0):
+        self.reason = reason
+        self.priority = priority
+        self.retry_after = retry_after
+        super().__init__(self.MESSAGES[reason])
+
+
+def estimate_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    """
+    채팅 요청이 사용할 토큰 수 (입력 토큰 수 + 최대 출력 max_tokens)
+    """
+    return count_message_tokens(messages) + max_tokens
+
+
+class TokenBucket:
+    """
+    분당 rate_per_minute만큼 채워지는 토큰 버킷 (최대 1분 치까지 모아 둠)
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(rate_per_minute)
+        self.tokens = self.capacity
+        self._updated: Optional[float] = None
+
+    def _refill(self, now: float):
+        if self._updated is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """
+        amount만큼 꺼낼 수 있을 때까지 기다려야 하는 시간(초)
+        """
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+
+
+class _Ticket:
+    __slots__ = ("priority", "seq", "operation", "tokens", "session", "future", "enqueued")
+
+    def __init__(self, priority, seq, operation, tokens, session, future, enqueued):
+        self.priority = priority
+        self.seq = seq
+        self.operation = operation
+        self.tokens = tokens
+        self.session = session
+        self.future = future
+        self.enqueued = enqueued
+
+
+class ModelScheduler:
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        reserved_slots: int = 2,
+        max_queue: int = 256,
+        deadlines: Optional[Dict[int, float]] = None,
+        chat_rpm: float = 0,
+        chat_tpm: float = 0,
+        stt_rpm: float = 0,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        # 실시간 처리(위험도/전사)만 사용할 수 있는 슬롯 수
+        self.reserved_slots = min(max(0, reserved_slots), self.max_concurrency - 1)
+        self.max_queue = max_queue
+        self.deadlines = deadlines or {}
+        # 작업 종류별 토큰 버킷: (버킷, 요청 토큰 수를 사용하는지)
+        self._buckets: Dict[str, List[Tuple[TokenBucket, bool]]] = {"chat": [], "stt": []}
+        if chat_rpm > 0:
+            self._buckets["chat"].append((TokenBucket(chat_rpm), False))
+        if chat_tpm > 0:
+            self._buckets["chat"].append((TokenBucket(chat_tpm), True))
+        if stt_rpm > 0:
+            self._buckets["stt"].append((TokenBucket(stt_rpm), False))
+
+        self._queue: List[Tuple[int, int, _Ticket]] = []
+        self._waiting: Dict[int, int] = {priority: 0 for priority in PRIORITY_NAMES}
+        self._active = 0
+        self._urgent: Set[str] = set()
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def queued(self) -> Dict[str, int]:
+        return {PRIORITY_NAMES[priority]: count for priority, count in self._waiting.items()}
+
+    def _rank(self, ticket: _Ticket) -> int:
+        # 위험 단계 통화는 같은 우선순위 안에서 가장 앞 (다음 우선순위보다는 뒤)
+        return ticket.priority * 2 - (ticket.session in self._urgent)
+
+    def set_urgent(self, session: str, urgent: bool):
+        """
+        통화의 위험 단계 여부를 갱신합니다. 대기 중인 요청의 순서도 바로 다시 정합니다.
+        """
+        if urgent == (session in self._urgent):
+            return
+        if urgent:
+            self._urgent.add(session)
+        else:
+            self._urgent.discard(session)
+        if any(ticket.session == session for _, _, ticket in self._queue):
+            self._queue = [
+                (self._rank(ticket), ticket.seq, ticket)
+                for _, _, ticket in self._queue
+                if not ticket.future.done()
+            ]
+            heapq.heapify(self._queue)
+            self._dispatch()
+
+    def _slots_for(self, ticket: _Ticket) -> int:
+        if ticket.priority <= PRIORITY_TRANSCRIPTION or ticket.session in self._urgent:
+            return self.max_concurrency
+        return self.max_concurrency - self.reserved_slots
+
+    def _bucket_delay(self, ticket: _Ticket, now: float) -> float:
+        return max(
+            (bucket.delay(ticket.tokens if by_tokens else 1, now) for bucket, by_tokens in self._buckets[ticket.operation]),
+            default=0.0,
+        )
+
+    def _dispatch(self):
+        """
+        빈 슬롯과 토큰이 있는 동안 가장 앞선 요청부터 실행을 허가합니다.
+
+        토큰을 기다리는 요청은 건너뛰고, 버킷이 다른 작업(chat/stt)의 뒤 요청은 계속 실행합니다.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        skipped: List[Tuple[int, int, _Ticket]] = []
+        throttled: Set[str] = set()
+        wake: Optional[float] = None
+        while self._queue and len(throttled) < len(self._buckets):
+            ticket = self._queue[0][2]
+            if ticket.future.done():
+                # 대기 제한 시간이 지났거나 호출한 쪽이 취소한 요청
+                heapq.heappop(self._queue)
+                continue
+            if self._active >= self._slots_for(ticket):
+                break
+            if ticket.operation in throttled:
+                # 앞선 같은 작업 요청이 토큰을 기다리는 동안 뒤 요청이 먼저 가져가지 않도록 그대로 대기
+                skipped.append(heapq.heappop(self._queue))
+                continue
+            delay = self._bucket_delay(ticket, now)
+            if delay > 0:
+                throttled.add(ticket.operation)
+                wake = delay if wake is None else min(wake, delay)
+                skipped.append(heapq.heappop(self._queue))
+                continue
+            heapq.heappop(self._queue)
+            for bucket, by_tokens in self._buckets[ticket.operation]:
+                bucket.take(ticket.tokens if by_tokens else 1, now)
+            self._active += 1
+            self._dequeued(ticket)
+            SCHEDULER_WAIT_SECONDS.observe(now - ticket.enqueued, priority=PRIORITY_NAMES[ticket.priority])
+            ticket.future.set_result(None)
+        for entry in skipped:
+            heapq.heappush(self._queue, entry)
+        if wake is not None:
+            self._timer = loop.call_later(wake, self._dispatch)
+
+    def _dequeued(self, ticket: _Ticket):
+        self._waiting[ticket.priority] -= 1
+        SCHEDULER_QUEUED.dec(priority=PRIORITY_NAMES[ticket.priority])
+
+    def try_acquire(self, priority: int, operation: str = "chat", tokens: int = 0, session: Optional[str] = None) -> bool:
+        """
+        기다리는 요청이 없고 슬롯과 토큰이 남아 있을 때만 바로 슬롯을 받습니다. (헤지 요청용, release로 반납)
+        """
+        ticket = _Ticket(priority, -1, operation, tokens, session, None, 0.0)
+        now = asyncio.get_running_loop().time()
+        if self._queue or self._active >= self._slots_for(ticket) or self._bucket_delay(ticket, now) > 0:
+            return False
+        for bucket, by_tokens in self._buckets[operation]:
+            bucket.take(tokens if by_tokens else 1, now)
+        self._active += 1
+        return True
+
+    def release(self):
+        self._release()
+
+    def reject(self, reason: str, priority: int, retry_after: float = 1.0) -> SchedulerRejected:
+        SCHEDULER_REJECTED.inc(priority=PRIORITY_NAMES[priority], reason=reason)
+        return SchedulerRejected(reason, priority, retry_after)
+
+    async def _acquire(self, priority: int, operation: str, tokens: int, session: Optional[str], deadline: Optional[float]):
+        loop = asyncio.get_running_loop()
+        urgent = session in self._urgent
+        if not urgent and self._waiting[priority] >= self.max_queue:
+            raise self.reject("overloaded", priority)
+
+        ticket = _Ticket(priority, next(self._seq), operation, tokens, session, loop.create_future(), loop.time())
+        deadline = self.deadlines.get(priority, 0) if deadline is None else deadline
+        if deadline and not urgent:
+            # 요청 한도 때문에 제한 시간 안에 시작할 수 없는 요청은 대기열에 넣지 않음
+            delay = self._bucket_delay(ticket, ticket.enqueued)
+            if delay > deadline:
+                raise self.reject("overloaded", priority, retry_after=delay)
+
+        heapq.heappush(self._queue, (self._rank(ticket), ticket.seq, ticket))
+        self._waiting[priority] += 1
+        SCHEDULER_QUEUED.inc(priority=PRIORITY_NAMES[priority])
+        self._dispatch()
+        if ticket.future.done():
+            return
+
+        try:
+            if deadline:
+                await asyncio.wait_for(asyncio.shield(ticket.future), deadline)
+            else:
+                await ticket.future
+        except asyncio.TimeoutError:
+            if ticket.future.done():
+                return
+            ticket.future.cancel()
+            self._dequeued(ticket)
+            logger.warning(f"대기 제한 시간({deadline}초)이 지나 모델 호출을 버립니다: {PRIORITY_NAMES[priority]}")
+            raise self.reject("deadline", priority)
+        except asyncio.CancelledError:
+            if ticket.future.done() and not ticket.future.cancelled():
+                # 허가된 직후 취소되면 받은 슬롯을 돌려줌
+                self._release()
+            else:
+                ticket.future.cancel()
+                self._dequeued(ticket)
+            raise
+
+    def _release(self):
+        self._active -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        priority: int,
+        operation: str = "chat",
+        tokens: int = 0,
+        session: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[None]:
+        """
+        실행 순서를 기다린 뒤 with 블록 동안 동시 호출 슬롯 하나를 사용합니다.
+
+        operation은 "chat" 또는 "stt", tokens는 채팅 요청의 예상 토큰 수입니다.
+        deadline을 주지 않으면 우선순위별 기본 대기 제한 시간을 사용합니다. (0이면 제한 없음)
+        """
+        await self._acquire(priority, operation, tokens, session, deadline)
+        try:
+            yield
+        finally:
+            self._release()
+
+
+def retry_after_seconds(error: SchedulerRejected) -> str:
+    """
+    Retry-After 헤더 값 (정수 초)
+    """
+    return str(max(1, math.ceil(error.retry_after)))
+
+
+# 요청 한도는 계정 단위이므로 워커 수로 나눠서 적용
+model_scheduler = ModelScheduler(
+    max_concurrency=settings.MODEL_MAX_CONCURRENCY,
+    reserved_slots=settings.SCHEDULER_RESERVED_SLOTS,
+    max_queue=settings.SCHEDULER_MAX_QUEUE,
+    deadlines={
+        PRIORITY_RISK: settings.SCHEDULER_RISK_DEADLINE,
+        PRIORITY_TRANSCRIPTION: settings.SCHEDULER_TRANSCRIPTION_DEADLINE,
+        PRIORITY_SUMMARY: settings.SCHEDULER_SUMMARY_DEADLINE,
+        PRIORITY_BATCH: settings.SCHEDULER_BATCH_DEADLINE,
+    },
+    chat_rpm=settings.MODEL_RPM_LIMIT / max(1, settings.WORKERS),
+    chat_tpm=settings.MODEL_TPM_LIMIT / max(1, settings.WORKERS),
+    stt_rpm=settings.STT_RPM_LIMIT / max(1, settings.WORKERS),
+)
@@ -0,0 +1,304 @@
+"""
+음성 인식(STT)/채팅 완성 모델 제공자
+
+핸들러는 InferenceClient만 사용하고, 실제 호출은 MODEL_PROVIDER 설정에 따라
+선택된 제공자가 담당합니다.
+
+- openai: OpenAI API 또는 OpenAI 호환 자체 호스팅 서버(OPENAI_BASE_URL)
+- local: 네트워크 없이 동작하는 결정적 로컬 대역 (부하 테스트/개발용)
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, BinaryIO, Dict, List, Optional, Tuple, Union
+
+from openai import APIConnectionError, AsyncOpenAI
+
+from audio import WAV_HEADER_SIZE
+from risk_lexicon import RiskPrescreener
+
+AudioFile = Union[BinaryIO, Tuple]
+
+
+class ProviderError(RuntimeError):
+    """
+    제공자 호출 실패 (로컬 대역의 장애 주입 포함)
+
+    retryable이 False이면 다시 시도해도 같은 결과인 오류입니다. (예: API 키 없음)
+    """
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    업스트림 상태 때문에 실패해 다시 시도하면 성공할 수 있는 오류인지 판단합니다.
+
+    시간 초과, 연결 실패, 429/5xx 응답이 해당하고, 그 외 4xx 응답은 요청 자체의 문제로 봅니다.
+    """
+    if isinstance(error, ProviderError):
+        return error.retryable
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    return isinstance(error, (asyncio.TimeoutError, ConnectionError, APIConnectionError))
+
+
+class ModelProvider(ABC):
+    """
+    STT/채팅 완성 제공자 인터페이스
+    """
+
+    name = ""
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    @abstractmethod
+    async def transcribe(self, file: AudioFile, model: str, language: str, timeout: float) -> str:
+        ...
+
+    @abstractmethod
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        timeout: float,
+    ) -> str:
+        ...
+
+    @abstractmethod
+    def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        timeout: float,
+    ) -> AsyncIterator[str]:
+        ...
+
+    async def aclose(self):
+        pass
+
+
+class OpenAIProvider(ModelProvider):
+    """
+    OpenAI API 제공자
+
+    하나의 AsyncOpenAI 인스턴스(내부 HTTP 커넥션 풀 공유)를 재사용합니다.
+    base_url을 지정하면 OpenAI 호환 자체 호스팅 서버를 사용합니다.
+    재시도는 InferenceClient가 담당하므로 SDK 자체 재시도는 끕니다. (max_retries=0)
+    """
+
+    name = "openai"
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        timeout: float,
+        max_retries: int,
+        base_url: Optional[str] = None,
+    ):
+        self._client = (
+            AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=max_retries)
+            if api_key
+            else None
+        )
+
+    @property
+    def available(self) -> bool:
+        return self._client is not None
+
+    def _require_client(self) -> AsyncOpenAI:
+        if self._client is None:
+            raise ProviderError("OpenAI API 키가 설정되지 않았습니다.", retryable=False)
+        return self._client
+
+    async def transcribe(self, file: AudioFile, model: str, language: str, timeout: float) -> str:
+        transcript = await self._require_client().audio.transcriptions.create(
+            model=model,
+            file=file,
+            language=language,
+            timeout=timeout,
+        )
+        return transcript.text
+
+    async def chat(self, messages, model, max_tokens, temperature, timeout) -> str:
+        response = await self._require_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            timeout=timeout,
+        )
+        return response.choices[0].message.content.strip()
+
+    async def chat_stream(self, messages, model, max_tokens, temperature, timeout) -> AsyncIterator[str]:
+        stream = await self._require_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+            timeout=timeout,
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+
+
+# 로컬 대역이 돌려주는 상담 발화 예시
+LOCAL_UTTERANCES = [
+    "안녕하세요 카드 결제 내역 때문에 전화드렸습니다.",
+    "지난달에 해지했는데 아직도 요금이 빠져나가고 있어요.",
+    "대출 이자가 왜 이렇게 많이 올랐는지 설명해 주세요.",
+    "몇 번을 전화했는데 아직도 처리가 안 됐다니 정말 짜증나네요.",
+    "계좌 이체가 실패했다고 나오는데 돈은 빠져나갔어요.",
+    "책임자 바꿔 주세요 이건 말이 안 되잖아요.",
+    "인터넷 뱅킹 비밀번호를 다섯 번 틀려서 잠겼습니다.",
+    "적금 만기일이 언제인지 확인하고 싶습니다.",
+]
+
+LOCAL_BLOCK_BYTES = 32000
+
+_TOKEN_PATTERN = re.compile(r"\S+\s*|\s+")
+
+
+class LocalProvider(ModelProvider):
+    """
+    네트워크 호출 없이 응답하는 결정적 로컬 대역
+
+    - 응답과 지연 시간은 입력 내용과 seed로만 결정되므로 같은 입력은 항상 같은 결과를 냅니다.
+    - latency(초)에 ±jitter 비율의 변동을 주고, error_rate 확률로 ProviderError를 발생시킵니다.
+    - 위험도 응답은 로컬 어휘 사전 점수로 만들어 실제 응답과 같은 JSON 형식을 유지합니다.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        stt_latency: float = 0.3,
+        chat_latency: float = 0.5,
+        token_interval: float = 0.02,
+        jitter: float = 0.2,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.stt_latency = stt_latency
+        self.chat_latency = chat_latency
+        self.token_interval = token_interval
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.seed = seed
+        self._prescreener = RiskPrescreener()
+
+    def _rng(self, kind: str, payload: bytes) -> random.Random:
+        digest = hashlib.sha256(f"{self.seed}:{kind}:".encode("utf-8") + payload).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    async def _simulate(self, rng: random.Random, latency: float, timeout: float):
+        delay = max(0.0, latency * (1 + rng.uniform(-self.jitter, self.jitter)))
+        if timeout and delay > timeout:
+            await asyncio.sleep(timeout)
+            raise asyncio.TimeoutError(f"로컬 모델 응답 시간 초과 ({timeout}초)")
+        await asyncio.sleep(delay)
+        if rng.random() < self.error_rate:
+            raise ProviderError("로컬 모델 오류 (장애 주입)")
+
+    @staticmethod
+    def _read_audio(file: AudioFile) -> bytes:
+        fileobj = file[1] if isinstance(file, tuple) else file
+        if isinstance(fileobj, (bytes, bytearray)):
+            return bytes(fileobj)
+        position = fileobj.tell()
+        data = fileobj.read()
+        fileobj.seek(position)
+        return data
+
+    async def transcribe(self, file: AudioFile, model: str, language: str, timeout: float) -> str:
+        audio = self._read_audio(file)
+        rng = self._rng("stt", audio)
+        await self._simulate(rng, self.stt_latency, timeout)
+        # 1초(16kHz/16bit 기준) 블록마다 블록 내용으로 정해지는 한 문장
+        # 겹치는 슬라이딩 윈도우도 같은 블록에는 같은 문장을 돌려줌
+        if audio[:4] == b"RIFF":
+            audio = audio[WAV_HEADER_SIZE:]
+        sentences = []
+        for offset in range(0, max(len(audio), 1), LOCAL_BLOCK_BYTES):
+            block_rng = self._rng("utterance", audio[offset:offset + LOCAL_BLOCK_BYTES])
+            sentences.append(LOCAL_UTTERANCES[block_rng.randrange(len(LOCAL_UTTERANCES))])
+        return " ".join(sentences)
+
+    def _respond(self, messages: List[Dict[str, str]]) -> str:
+        system = messages[0]["content"] if messages else ""
+        text = messages[-1]["content"] if messages else ""
+        text = text.split(": ", 1)[-1]
+
+        risk = self._prescreener.score(text).as_result()
+        summary = f"고객은 다음 내용으로 문의하였습니다: {text[:120]}"
+        script = "고객님, 불편을 드려 정말 죄송합니다. 말씀하신 내용을 바로 확인하여 처리해 드리겠습니다. 추가로 궁금하신 점이 있으시면 언제든지 말씀해 주세요."
+
+        if "[RISK]" in system:
+            return f"[RISK]\n{json.dumps(risk, ensure_ascii=False)}\n[SUMMARY]\n{summary}\n[SCRIPT]\n{script}"
+        if "risk_level" in system:
+            return json.dumps(risk, ensure_ascii=False)
+        if "스크립트" in system:
+            return script
+        return summary
+
+    async def chat(self, messages, model, max_tokens, temperature, timeout) -> str:
+        payload = json.dumps(messages, ensure_ascii=False).encode("utf-8")
+        await self._simulate(self._rng("chat", payload), self.chat_latency, timeout)
+        return self._respond(messages)
+
+    async def chat_stream(self, messages, model, max_tokens, temperature, timeout) -> AsyncIterator[str]:
+        payload = json.dumps(messages, ensure_ascii=False).encode("utf-8")
+        await self._simulate(self._rng("chat", payload), self.chat_latency, timeout)
+        for token in _TOKEN_PATTERN.findall(self._respond(messages)):
+            if self.token_interval:
+                await asyncio.sleep(self.token_interval)
+            yield token
+
+
+def create_provider(settings) -> ModelProvider:
+    """
+    설정(MODEL_PROVIDER)에 맞는 제공자를 생성합니다.
+    """
+    if settings.MODEL_PROVIDER == "local":
+        return LocalProvider(
+            stt_latency=settings.LOCAL_STT_LATENCY,
+            chat_latency=settings.LOCAL_CHAT_LATENCY,
+            token_interval=settings.LOCAL_TOKEN_INTERVAL,
+            jitter=settings.LOCAL_LATENCY_JITTER,
+            error_rate=settings.LOCAL_ERROR_RATE,
+            seed=settings.LOCAL_SEED,
+        )
+    if settings.MODEL_PROVIDER != "openai":
+        raise ValueError(f"지원하지 않는 MODEL_PROVIDER입니다: {settings.MODEL_PROVIDER}")
+    return OpenAIProvider(
+        api_key=settings.OPENAI_API_KEY,
+        timeout=settings.OPENAI_TIMEOUT,
+        max_retries=0,
+        base_url=settings.OPENAI_BASE_URL or None,
+    )
+
+
+def create_fallback_provider() -> ModelProvider:
+    """
+    업스트림 장애 시 사용할 지연 없는 로컬 대역 (위험도는 로컬 사전 점수화 결과)
+    """
+    return LocalProvider(stt_latency=0, chat_latency=0, token_interval=0, jitter=0, error_rate=0)
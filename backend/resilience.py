@@ -0,0 +1,124 @@
+"""
+업스트림 모델 호출 복원력 도구
+
+- CircuitBreaker: 연속 실패가 쌓이면 일정 시간 호출을 막고(open), 이후 한 번의 시험 호출로 회복을 확인
+- LatencyTracker: 최근 응답 시간의 백분위수 (헤지 요청 지연 기준)
+- backoff_delay: 지터를 준 지수 백오프 대기 시간
+"""
+
+import logging
+import random
+import time
+from collections import deque
+from typing import Optional
+
+from metrics import CIRCUIT_STATE
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_HALF_OPEN = "half_open"
+CIRCUIT_OPEN = "open"
+_STATE_VALUES = {CIRCUIT_CLOSED: 0, CIRCUIT_HALF_OPEN: 1, CIRCUIT_OPEN: 2}
+
+
+def backoff_delay(attempt: int, base: float = 0.2, cap: float = 2.0) -> float:
+    """
+    attempt번째 재시도 전 대기 시간 (0 ~ base * 2^attempt 사이 균등 분포, full jitter)
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    연속 failure_threshold번 실패하면 reset_timeout초 동안 호출을 막습니다.
+
+    그 뒤에는 호출 하나만 시험으로 허용(half_open)하고, 성공하면 다시 닫고 실패하면 다시 엽니다.
+    실패로 세는 것은 업스트림 상태 때문인 오류(시간 초과, 연결 실패, 429/5xx)뿐입니다.
+
+    allow는 대기열에 넣기 전 확인용이고, 시험 호출 자격은 슬롯을 얻은 뒤 claim으로 가져갑니다.
+    claim한 호출은 어떻게 끝나든(취소 포함) release를 호출해야 합니다.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        CIRCUIT_STATE.set(0, operation=name)
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            logger.warning(f"업스트림 회로 차단기 상태 변경 ({self.name}): {self.state} -> {state}")
+            self.state = state
+            CIRCUIT_STATE.set(_STATE_VALUES[state], operation=self.name)
+
+    def retry_after(self) -> float:
+        """
+        다시 호출을 허용하기까지 남은 시간(초)
+        """
+        if self.state != CIRCUIT_OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """
+        호출을 시작해도 되는지 (half_open이면 진행 중인 시험 호출이 없을 때만, 시험 호출 자격은 가져가지 않음)
+        """
+        if self.state == CIRCUIT_OPEN and self.retry_after() <= 0:
+            self._set_state(CIRCUIT_HALF_OPEN)
+            self._probing = False
+        if self.state == CIRCUIT_CLOSED:
+            return True
+        return self.state == CIRCUIT_HALF_OPEN and not self._probing
+
+    def claim(self) -> bool:
+        """
+        업스트림을 실제로 호출하기 직전에 호출합니다. half_open이면 이 호출을 시험 호출로 잡습니다.
+        """
+        if not self.allow():
+            return False
+        if self.state == CIRCUIT_HALF_OPEN:
+            self._probing = True
+        return True
+
+    def record_success(self):
+        self._failures = 0
+        self._probing = False
+        self._set_state(CIRCUIT_CLOSED)
+
+    def record_failure(self):
+        self._failures += 1
+        self._probing = False
+        if self.state == CIRCUIT_HALF_OPEN or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._set_state(CIRCUIT_OPEN)
+
+    def release(self):
+        # 시험 호출이 결과 없이 끝나면(취소, 스트림 중단) 다음 호출이 다시 시험할 수 있게 함
+        self._probing = False
+
+
+class LatencyTracker:
+    """
+    최근 window개 응답 시간의 백분위수 (min_samples개 미만이면 None)
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: deque = deque(maxlen=window)
+        self._sorted: Optional[list] = None
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+        self._sorted = None
+
+    def percentile(self, q: float = 0.95) -> Optional[float]:
+        if len(self._samples) < self.min_samples:
+            return None
+        if self._sorted is None:
+            self._sorted = sorted(self._samples)
+        return self._sorted[min(len(self._sorted) - 1, int(q * len(self._sorted)))]
@@ -0,0 +1,229 @@
+"""
+모델 응답 캐시
+
+정규화한 입력 텍스트와 엔드포인트/모델/프롬프트 버전의 해시를 키로 사용합니다.
+메모리(LRU + TTL) 계층과 선택적인 SQLite 디스크 계층으로 구성되며,
+같은 키의 동시 요청은 하나의 업스트림 호출을 공유합니다.
+
+공유되는 호출은 어느 요청에도 속하지 않는 별도 태스크에서 실행하므로, 요청 하나가 취소되어도
+(클라이언트 연결 끊김) 그 요청만 대기에서 빠지고 나머지 요청과 캐시 저장은 계속됩니다.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from config import settings
+from metrics import CACHE_ENTRIES, CACHE_INFLIGHT, CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+def prompt_version(system_prompt: str, **params) -> str:
+    """
+    시스템 프롬프트와 생성 파라미터로 프롬프트 버전을 계산합니다.
+    프롬프트가 바뀌면 이전 캐시 항목은 자동으로 무효화됩니다.
+    """
+    payload = json.dumps([system_prompt, params], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def make_cache_key(endpoint: str, model: str, version: str, text: str) -> str:
+    payload = "\x1f".join((endpoint, model, version, normalize_text(text)))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryCache:
+    """
+    TTL이 있는 LRU 메모리 캐시
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class SQLiteCache:
+    """
+    재시작 후에도 유지되는 SQLite 디스크 캐시 (값은 JSON으로 저장)
+
+    블로킹 I/O는 스레드에서 실행합니다.
+    """
+
+    def __init__(self, path: str, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def _set(self, key: str, value: Any):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), time.time() + self.ttl),
+            )
+            self._conn.commit()
+
+    async def get(self, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: Any):
+        await asyncio.to_thread(self._set, key, value)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """
+    메모리/디스크 2계층 응답 캐시와 진행 중 요청 병합(single-flight)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 3600.0,
+        db_path: Optional[str] = None,
+        enabled: bool = True,
+    ):
+        self.enabled = enabled
+        self._memory = MemoryCache(max_entries, ttl)
+        self._disk = SQLiteCache(db_path, ttl) if db_path else None
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+        }
+
+    def _count(self, counter: str, result: str):
+        self._counters[counter] += 1
+        CACHE_REQUESTS.inc(result=result)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.enabled:
+            return await compute()
+
+        value = self._memory.get(key)
+        if value is not None:
+            self._count("memory_hits", "memory_hit")
+            return value
+
+        # 같은 키로 진행 중인 업스트림 호출이 있으면 결과를 공유
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._count("coalesced", "coalesced")
+        else:
+            inflight = asyncio.create_task(self._fill(key, compute))
+            inflight.add_done_callback(lambda task: self._finish(key, task))
+            self._inflight[key] = inflight
+        # 취소되면 이 요청만 대기에서 빠지고 호출은 계속됨 (결과는 캐시에 저장되어 재요청에 사용)
+        return await asyncio.shield(inflight)
+
+    async def _fill(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        if self._disk is not None:
+            value = await self._disk.get(key)
+            if value is not None:
+                self._count("disk_hits", "disk_hit")
+                self._memory.set(key, value)
+                return value
+
+        self._count("misses", "miss")
+        value = await compute()
+        self._memory.set(key, value)
+        if self._disk is not None:
+            try:
+                await self._disk.set(key, value)
+            except Exception as e:
+                logger.error(f"디스크 캐시 저장 실패: {e}")
+        return value
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 기다리던 요청이 모두 취소된 뒤 실패해도 미확인 예외 경고가 남지 않도록 확인
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self._counters["memory_hits"] + self._counters["disk_hits"] + self._counters["coalesced"]
+        total = hits + self._counters["misses"]
+        return {
+            "enabled": self.enabled,
+            **self._counters,
+            "hits": hits,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "memory_entries": len(self._memory),
+            "inflight": self.inflight,
+            "disk_enabled": self._disk is not None,
+        }
+
+    def close(self):
+        if self._disk is not None:
+            self._disk.close()
+
+
+response_cache = ResponseCache(
+    max_entries=settings.CACHE_MAX_ENTRIES,
+    ttl=settings.CACHE_TTL_SECONDS,
+    db_path=settings.CACHE_DB_PATH or None,
+    enabled=settings.CACHE_ENABLED,
+)
+CACHE_ENTRIES.set_function(lambda: len(response_cache))
+CACHE_INFLIGHT.set_function(lambda: response_cache.inflight)
@@ -0,0 +1,195 @@
+"""
+위험도 분석: 대화 텍스트 분석(/analyze-risk, 배치 분석 공용)과 실시간 위험도 분석 요청 스케줄링
+"""
+
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from metrics import JSON_PARSE_FALLBACKS, STAGE_SECONDS
+from prompts import risk_messages
+from risk_lexicon import RiskPrescreener
+from token_budget import prepare_text
+
+logger = logging.getLogger(__name__)
+
+
+def parse_realtime_risk(analysis_text: str, fallback: Optional[Dict] = None) -> Dict:
+    """
+    모델 응답에서 위험도 필드를 추출합니다.
+
+    JSON 파싱 실패 시 fallback(예: 사전 점수화 결과)의 점수를 사용합니다.
+    """
+    try:
+        with STAGE_SECONDS.time(stage="json_parse"):
+            analysis_data = json.loads(analysis_text)
+        return {
+            "risk_level": analysis_data.get("risk_level", 0),
+            "risk_stage": analysis_data.get("risk_stage", "정상"),
+            "emotion": analysis_data.get("emotion", ""),
+            "analysis": analysis_data.get("analysis", ""),
+        }
+    except json.JSONDecodeError:
+        JSON_PARSE_FALLBACKS.inc(source="realtime_risk")
+        fallback = fallback or {}
+        return {
+            "risk_level": fallback.get("risk_level", 0),
+            "risk_stage": fallback.get("risk_stage", "정상"),
+            "emotion": fallback.get("emotion", ""),
+            "analysis": analysis_text,
+        }
+
+
+def create_prescreener() -> RiskPrescreener:
+    """
+    설정(RISK_LEXICON_PATH, PRESCREEN_*)에 따른 로컬 위험 어휘 사전 점수화기
+    """
+    options = dict(
+        escalate_threshold=settings.PRESCREEN_ESCALATE_THRESHOLD,
+        sample_rate=settings.PRESCREEN_SAMPLE_RATE
+    )
+    if settings.RISK_LEXICON_PATH:
+        return RiskPrescreener.from_file(settings.RISK_LEXICON_PATH, **options)
+    return RiskPrescreener(**options)
+
+
+def lexicon_weigher(prescreener: RiskPrescreener) -> Callable[[str], float]:
+    """
+    입력을 최근 발화 위주로 자를 때 쓰는 가중치 (위험 어휘가 있는 이전 발화는 최근 발화보다 먼저 남김)
+    """
+    return lambda fragment: prescreener.score(fragment).risk_level / 10
+
+
+async def analyze_risk_text(
+    text: str,
+    prescreener: RiskPrescreener,
+    chat: Callable[[str, List[Dict[str, str]]], Awaitable[str]],
+    token_budget: int = 0,
+    endpoint: str = "analyze-risk",
+    gate: bool = True,
+) -> Dict:
+    """
+    대화 텍스트의 위험도를 분석합니다.
+
+    gate가 True이고 사전 점수화가 에스컬레이션 대상이 아니면(임계값 미만, 샘플링 제외) 모델을
+    호출하지 않고 그 결과를 반환합니다. 사전에 없는 표현의 위협도 놓치지 않아야 하는
+    요청은 gate=False로 항상 모델을 호출합니다. 모델을 호출할 때는
+    token_budget에 맞게 줄인 텍스트로 chat(모델 입력 텍스트, 메시지)을 호출하고,
+    응답 JSON을 파싱할 수 없으면 사전 점수화 점수를 사용합니다. (source: prescreen/model)
+    """
+    prescreen = prescreener.score(text)
+    if gate and not prescreener.should_escalate(prescreen):
+        logger.info(f"사전 점수화로 위험도 분석 완료: {prescreen.risk_stage} ({prescreen.risk_level}점)")
+        return {**prescreen.as_result(), "raw_response": "", "source": "prescreen"}
+
+    # 긴 대화는 최근 발화 위주로 줄임 (사전 점수화는 전체 텍스트 기준)
+    model_text = prepare_text(endpoint, text, token_budget, lexicon_weigher(prescreener), keep_repeats=True)
+    analysis_text = await chat(model_text, risk_messages(model_text))
+    logger.info("위험도 분석 완료", extra={"analysis": analysis_text})
+
+    try:
+        with STAGE_SECONDS.time(stage="json_parse"):
+            analysis_data = json.loads(analysis_text)
+        return {
+            "risk_level": analysis_data.get("risk_level", 0),
+            "risk_stage": analysis_data.get("risk_stage", "정상"),
+            "emotion": analysis_data.get("emotion", ""),
+            "analysis": analysis_data.get("analysis", ""),
+            "raw_response": analysis_text,
+            "source": "model",
+        }
+    except json.JSONDecodeError:
+        # JSON 파싱 실패 시 사전 점수화 결과 사용
+        JSON_PARSE_FALLBACKS.inc(source="analyze_risk")
+        return {
+            "risk_level": prescreen.risk_level,
+            "risk_stage": prescreen.risk_stage,
+            "emotion": prescreen.emotion,
+            "analysis": analysis_text,
+            "raw_response": analysis_text,
+            "source": "prescreen",
+        }
+
+
+class RiskAnalysisScheduler:
+    """
+    세션별 실시간 위험도 분석 마이크로 배칭 스케줄러
+
+    - 분석 호출이 진행 중일 때 도착한 청크는 모아서 한 번에 분석합니다.
+    - 새 청크가 이전 청크 텍스트로 시작하면(누적 재전송) 이전 청크는 버립니다.
+    - 결과에는 합쳐진 모든 chunk_id가 chunk_ids로 포함됩니다.
+    - 호출 간 최소 간격(min_interval)으로 세션당 초당 호출 수를 제한합니다.
+    """
+
+    def __init__(
+        self,
+        analyze: Callable[[str], Awaitable[Dict]],
+        send: Callable[[Dict], Awaitable[None]],
+        min_interval: float = 0.5,
+    ):
+        self._analyze = analyze
+        self._send = send
+        self.min_interval = min_interval
+        self._pending: List[Tuple[int, str]] = []
+        self._pending_ids: List[int] = []
+        self._task: Optional[asyncio.Task] = None
+        self._last_call = 0.0
+
+    def submit(self, chunk_id: int, text: str):
+        # 새 텍스트가 이어서 포함하는 대기 중 청크는 대체된 것으로 보고 제거
+        self._pending = [(cid, t) for cid, t in self._pending if not text.startswith(t)]
+        self._pending.append((chunk_id, text))
+        self._pending_ids.append(chunk_id)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            # 호출 간 최소 간격 유지 (대기하는 동안 도착한 청크도 함께 배칭됨)
+            delay = self._last_call + self.min_interval - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            chunk_ids = self._pending_ids
+            text = " ".join(t for _, t in self._pending)
+            self._pending = []
+            self._pending_ids = []
+            self._last_call = loop.time()
+
+            try:
+                result = await self._analyze(text)
+                message = {
+                    "type": "risk_analysis",
+                    "chunk_id": chunk_ids[-1],
+                    "chunk_ids": chunk_ids,
+                    **result,
+                    "text_chunk": text,
+                    "provisional": False,
+                }
+                logger.info(f"실시간 위험도 분석 완료 - 청크 {chunk_ids}: {result['risk_stage']}")
+            except Exception as e:
+                logger.error(f"실시간 위험도 분석 오류: {e}")
+                message = {
+                    "type": "error",
+                    "chunk_id": chunk_ids[-1],
+                    "chunk_ids": chunk_ids,
+                    "error": str(e),
+                }
+
+            try:
+                await self._send(message)
+            except Exception as e:
+                logger.error(f"위험도 분석 결과 전송 실패: {e}")
+                return
+
+    async def close(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
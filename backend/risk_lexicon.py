@@ -0,0 +1,237 @@
+"""
+로컬 어휘 기반 위험도 사전 점수화
+
+욕설/위협/자해 어휘 사전을 Aho-Corasick 오토마톤으로 색인하여 텍스트를 한 번만
+훑고, 감정 강도 특징과 합쳐 LLM 호출 전에 잠정 위험도를 계산합니다.
+"""
+
+import json
+import random
+import re
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# 카테고리별 가중치와 어휘 (공백/문장부호를 제거한 형태로 매칭)
+DEFAULT_LEXICON: Dict[str, Dict] = {
+    "profanity": {
+        "weight": 25,
+        "emotion": "분노",
+        "terms": [
+            "씨발", "시발", "씨팔", "시팔", "씹새", "씹할", "씹놈", "씹년", "개새끼", "개새", "새끼", "병신", "븅신",
+            "좆", "존나", "지랄", "미친놈", "미친년", "또라이", "닥쳐", "꺼져", "엿먹어",
+        ],
+    },
+    "threat": {
+        "weight": 40,
+        "emotion": "위협",
+        "terms": [
+            "죽여버", "죽인다", "죽이겠", "죽여줄", "가만안둬", "가만안두", "가만두지않",
+            "찾아가겠", "찾아간다", "불질러", "불지르", "폭파", "때려버", "칼들고", "묻어버",
+        ],
+    },
+    "self_harm": {
+        "weight": 50,
+        "emotion": "절망",
+        "terms": [
+            "죽고싶", "자살", "뛰어내리", "뛰어내릴", "목매", "살기싫", "죽어버리", "죽어버릴",
+            "끝내버리", "사라지고싶",
+        ],
+    },
+    "anger": {
+        "weight": 10,
+        "emotion": "분노",
+        "terms": [
+            "화나", "화난", "화가나", "화가난", "짜증", "열받", "빡치", "빡쳐", "어이없", "말이돼",
+            "장난해", "장난하",
+            "책임자", "고소", "소송", "민원넣", "금감원",
+        ],
+    },
+}
+
+# 정상 문맥에서 자주 쓰이는 오탐 단어 (매칭 전에 제거)
+DEFAULT_ALLOWLIST = ["시발점", "시발역", "십자", "새끼손가락", "새끼발가락"]
+
+# 자해 위험은 점수와 관계없이 위험 단계로 분류
+CRITICAL_CATEGORIES = {"self_harm"}
+# 서로 다른 카테고리가 함께 나오면(욕설을 섞은 위협 등) 카테고리 하나당 더하는 점수
+COMBINATION_BONUS = 10
+
+_NORMALIZE_PATTERN = re.compile(r"[\s\W_]+")
+_EXCLAMATION_PATTERN = re.compile(r"[!?]{2,}")
+_REPEAT_PATTERN = re.compile(r"(.)\1{2,}")
+
+
+class AhoCorasick:
+    """
+    다중 패턴 문자열 검색 오토마톤
+
+    패턴 수와 관계없이 입력 길이에 비례하는 시간으로 모든 일치 항목을 찾습니다.
+    """
+
+    def __init__(self, patterns: Dict[str, str]):
+        # patterns: 패턴 -> 카테고리
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[str, str]]] = [[]]
+
+        for pattern, category in patterns.items():
+            node = 0
+            for char in pattern:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                node = next_node
+            self._output[node].append((pattern, category))
+
+        # BFS로 실패 링크 구성
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def search(self, text: str) -> List[Tuple[str, str]]:
+        """
+        (패턴, 카테고리) 일치 목록을 반환합니다.
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        matches = []
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                matches.extend(output[node])
+        return matches
+
+
+class PrescreenResult(NamedTuple):
+    risk_level: int
+    risk_stage: str
+    emotion: str
+    matches: List[str]  # 일치한 어휘
+    categories: List[str]  # 일치한 카테고리
+
+    def as_result(self) -> Dict:
+        """
+        위험도 분석 응답과 같은 형태의 필드를 반환합니다.
+        """
+        if self.matches:
+            analysis = f"위험 어휘 감지: {', '.join(self.matches)}"
+        else:
+            analysis = "위험 어휘가 감지되지 않았습니다."
+        return {
+            "risk_level": self.risk_level,
+            "risk_stage": self.risk_stage,
+            "emotion": self.emotion,
+            "analysis": analysis,
+        }
+
+
+# 위험도 단계 (낮은 순)
+RISK_STAGES = ("정상", "경고", "위험")
+
+
+def risk_stage_for(risk_level: int) -> str:
+    if risk_level >= 71:
+        return "위험"
+    if risk_level >= 31:
+        return "경고"
+    return "정상"
+
+
+class RiskPrescreener:
+    """
+    어휘 사전과 강도 특징으로 잠정 위험도를 계산하고 LLM 에스컬레이션 여부를 결정합니다.
+    """
+
+    def __init__(
+        self,
+        lexicon: Optional[Dict[str, Dict]] = None,
+        allowlist: Optional[List[str]] = None,
+        escalate_threshold: int = 10,
+        sample_rate: float = 0.0,
+    ):
+        self.lexicon = lexicon or DEFAULT_LEXICON
+        self.allowlist = [self._normalize(term) for term in (allowlist if allowlist is not None else DEFAULT_ALLOWLIST)]
+        self.escalate_threshold = escalate_threshold
+        self.sample_rate = sample_rate
+
+        patterns = {}
+        for category, entry in self.lexicon.items():
+            for term in entry["terms"]:
+                patterns[self._normalize(term)] = category
+        self._automaton = AhoCorasick(patterns)
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "RiskPrescreener":
+        """
+        JSON 사전 파일({"카테고리": {"weight", "emotion", "terms"}, "allowlist": [...]})을 불러옵니다.
+        """
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        allowlist = data.pop("allowlist", None)
+        return cls(lexicon=data, allowlist=allowlist, **kwargs)
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return _NORMALIZE_PATTERN.sub("", text.lower())
+
+    def score(self, text: str) -> PrescreenResult:
+        normalized = self._normalize(text)
+        for term in self.allowlist:
+            if term in normalized:
+                normalized = normalized.replace(term, "")
+
+        matched_terms: Dict[str, str] = {}
+        for term, category in self._automaton.search(normalized):
+            matched_terms[term] = category
+
+        # 카테고리별로 어휘 수에 따라 가중치 누적 (카테고리당 가중치의 2배까지)
+        category_counts: Dict[str, int] = {}
+        for category in matched_terms.values():
+            category_counts[category] = category_counts.get(category, 0) + 1
+        score = 0
+        for category, count in category_counts.items():
+            weight = self.lexicon[category]["weight"]
+            score += min(weight * count, weight * 2)
+        score += COMBINATION_BONUS * max(0, len(category_counts) - 1)
+
+        # 감정 강도 특징: 연속 느낌표/물음표, 같은 글자 반복
+        score += min(len(_EXCLAMATION_PATTERN.findall(text)) * 5, 15)
+        score += min(len(_REPEAT_PATTERN.findall(normalized)) * 5, 10)
+
+        risk_level = min(score, 100)
+        if CRITICAL_CATEGORIES.intersection(category_counts):
+            risk_level = max(risk_level, 71)
+
+        emotion = ""
+        if category_counts:
+            strongest = max(category_counts, key=lambda c: self.lexicon[c]["weight"])
+            emotion = self.lexicon[strongest].get("emotion", "")
+
+        return PrescreenResult(
+            risk_level=risk_level,
+            risk_stage=risk_stage_for(risk_level),
+            emotion=emotion,
+            matches=list(matched_terms),
+            categories=sorted(category_counts),
+        )
+
+    def should_escalate(self, result: PrescreenResult) -> bool:
+        """
+        임계값을 넘었거나 샘플링에 걸린 경우에만 LLM 분석으로 넘깁니다.
+        """
+        if result.risk_level >= self.escalate_threshold:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
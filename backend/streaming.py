@@ -0,0 +1,153 @@
+"""
+실시간 음성 스트림의 슬라이딩 윈도우 전사와 증분 텍스트 병합
+"""
+
+from typing import List, NamedTuple
+
+import numpy as np
+
+from audio import SAMPLE_RATE, SAMPLE_WIDTH
+
+
+class PCMRingBuffer:
+    """
+    세션별 int16 PCM 링 버퍼
+
+    최근 capacity_seconds 만큼의 오디오만 고정 크기 배열에 보관합니다.
+    """
+
+    def __init__(self, capacity_seconds: float = 30.0, sample_rate: int = SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.capacity = int(capacity_seconds * sample_rate)
+        self._buffer = np.zeros(self.capacity, dtype=np.int16)
+        self._write = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def clear(self):
+        self._write = 0
+        self._size = 0
+
+    def append(self, pcm: bytes):
+        samples = np.frombuffer(pcm, dtype=np.int16, count=len(pcm) // SAMPLE_WIDTH)
+        if len(samples) >= self.capacity:
+            samples = samples[-self.capacity:]
+        n = len(samples)
+
+        end = self._write + n
+        if end <= self.capacity:
+            self._buffer[self._write:end] = samples
+        else:
+            first = self.capacity - self._write
+            self._buffer[self._write:] = samples[:first]
+            self._buffer[: n - first] = samples[first:]
+
+        self._write = end % self.capacity
+        self._size = min(self._size + n, self.capacity)
+
+    def latest(self, seconds: float) -> np.ndarray:
+        """
+        최근 seconds 만큼의 샘플을 반환합니다. (경계를 넘지 않으면 복사 없이 뷰 반환)
+        """
+        n = min(int(seconds * self.sample_rate), self._size)
+        start = (self._write - n) % self.capacity
+        if start + n <= self.capacity:
+            return self._buffer[start:start + n]
+        return np.concatenate((self._buffer[start:], self._buffer[: self._write]))
+
+
+class TranscriptUpdate(NamedTuple):
+    committed: str  # 이번 갱신에서 새로 확정된 텍스트
+    tentative: str  # 아직 확정되지 않은 꼬리 텍스트
+
+
+def _common_prefix_length(a: List[str], b: List[str]) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+class TranscriptMerger:
+    """
+    겹치는 윈도우 전사 결과를 확정 텍스트와 미확정 꼬리로 병합합니다.
+
+    - 확정 텍스트의 끝(suffix)과 새 결과의 앞(prefix)이 겹치는 부분은 제거합니다.
+    - 연속된 두 윈도우가 동의한 앞부분(공통 prefix)만 확정합니다.
+    - max_pending_updates 번 연속 동의가 없으면 미확정 꼬리를 그대로 확정합니다.
+    """
+
+    def __init__(self, max_pending_updates: int = 3, max_lead_tokens: int = 2):
+        self.max_pending_updates = max_pending_updates
+        # 윈도우 시작에서 잘린 단어를 허용하기 위한 최대 선행 토큰 수
+        self.max_lead_tokens = max_lead_tokens
+        self.committed_tokens: List[str] = []
+        self.tentative_tokens: List[str] = []
+        self._pending_updates = 0
+
+    @property
+    def committed_text(self) -> str:
+        return " ".join(self.committed_tokens)
+
+    @property
+    def tentative_text(self) -> str:
+        return " ".join(self.tentative_tokens)
+
+    def update(self, hypothesis: str) -> TranscriptUpdate:
+        tokens = hypothesis.split()
+        tokens = tokens[self._committed_overlap(tokens):]
+
+        agreed = _common_prefix_length(self.tentative_tokens, tokens)
+        if not agreed and self.tentative_tokens:
+            # 윈도우 시작에서 잘린 단어를 건너뛰고 미확정 꼬리와 다시 정렬
+            for lead in range(1, min(self.max_lead_tokens, len(tokens)) + 1):
+                agreed = _common_prefix_length(self.tentative_tokens, tokens[lead:])
+                if agreed:
+                    tokens = tokens[lead:]
+                    break
+        new_committed = tokens[:agreed]
+        self.tentative_tokens = tokens[agreed:]
+
+        if agreed:
+            self._pending_updates = 0
+        elif self.tentative_tokens:
+            self._pending_updates += 1
+            if self._pending_updates >= self.max_pending_updates:
+                new_committed = self.tentative_tokens
+                self.tentative_tokens = []
+                self._pending_updates = 0
+
+        self.committed_tokens.extend(new_committed)
+        return TranscriptUpdate(" ".join(new_committed), self.tentative_text)
+
+    def flush(self) -> TranscriptUpdate:
+        """
+        발화가 끝났을 때 남은 미확정 꼬리를 확정합니다.
+        """
+        new_committed = self.tentative_tokens
+        self.committed_tokens.extend(new_committed)
+        self.tentative_tokens = []
+        self._pending_updates = 0
+        return TranscriptUpdate(" ".join(new_committed), "")
+
+    def _committed_overlap(self, tokens: List[str]) -> int:
+        """
+        새 결과 앞부분 중 이미 확정된 텍스트와 겹치는 토큰 수를 반환합니다.
+        """
+        committed = self.committed_tokens
+        best_end = 0
+        best_k = 0
+        for lead in range(min(self.max_lead_tokens, len(tokens)) + 1):
+            # 선행 토큰을 건너뛰는 경우 우연한 일치를 피하기 위해 2개 이상 겹쳐야 함
+            min_k = 1 if lead == 0 else 2
+            limit = min(len(committed), len(tokens) - lead)
+            for k in range(limit, max(best_k, min_k - 1), -1):
+                if committed[-k:] == tokens[lead:lead + k]:
+                    best_k = k
+                    best_end = lead + k
+                    break
+        return best_end
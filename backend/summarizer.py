@@ -0,0 +1,290 @@
+"""
+긴 통화의 증분(rolling) 요약
+
+- 통화마다 마지막 요약과 그 요약이 반영한 전사 위치(summary_seq)를 저장해 두고,
+  요약 요청 시 그 이후의 새 전사만 이전 요약에 합칩니다.
+- 새 전사가 너무 길면 구간별로 나눠 동시에 요약(map)한 뒤 fan_in개씩 합치는(reduce)
+  계층적 요약으로 줄여서 사용합니다.
+- 요약할 텍스트는 먼저 반복된 전사 조각을 제거하고, direct_max_tokens(정확한 토큰 수)도 넘으면 계층적 요약을 사용합니다.
+- compact: 토큰 예산을 넘는 대화의 앞부분을 요약으로 바꾸고 최근 대화만 원문으로 남깁니다. (스크립트 생성 입력)
+- 요약되지 않은 전사가 trigger_chars 이상 쌓이면 백그라운드에서(배치 우선순위로) 미리 합쳐 두므로,
+  통화가 길어져도 요청 시점에 처리할 새 텍스트는 일정 길이 이하로 유지됩니다.
+
+priority/session은 모델 호출 스케줄러에 그대로 전달됩니다. (통화 요약은 통화 ID를 session으로 사용)
+"""
+
+import asyncio
+import logging
+import re
+import weakref
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from call_store import CallSession, TranscriptEntry
+from config import settings
+from inference import InferenceClient, inference
+from metrics import SUMMARY_UPDATES
+from model_scheduler import PRIORITY_BATCH, PRIORITY_SUMMARY
+from prompts import (
+    compacted_text, merge_summary_messages, rolling_summary_messages, segment_summary_messages, summary_messages
+)
+from token_budget import count_tokens, prepare_text, record_saved, split_fragments, truncate_recent
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_MODEL = "gpt-3.5-turbo"
+SUMMARY_MAX_TOKENS = 400
+
+_SENTENCE_END = re.compile(r"(?<=[.!?。])\s+")
+
+
+def split_text(text: str, max_chars: int) -> List[str]:
+    """
+    문장 경계에서 max_chars 이하의 구간으로 나눕니다. (한 문장이 더 길면 그 문장은 글자 수로 자름)
+    """
+    segments: List[str] = []
+    current = ""
+    for sentence in _SENTENCE_END.split(text.strip()):
+        while len(sentence) > max_chars:
+            if current:
+                segments.append(current)
+                current = ""
+            segments.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            segments.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        segments.append(current)
+    return segments
+
+
+class RollingSummarizer:
+    def __init__(
+        self,
+        client: InferenceClient,
+        direct_max_chars: int = 4000,
+        direct_max_tokens: int = 3000,
+        segment_chars: int = 2000,
+        fan_in: int = 4,
+        trigger_chars: int = 1500,
+    ):
+        self.client = client
+        self.direct_max_chars = direct_max_chars
+        self.direct_max_tokens = direct_max_tokens
+        self.segment_chars = segment_chars
+        self.fan_in = max(2, fan_in)
+        self.trigger_chars = trigger_chars
+        # 같은 통화의 요약 갱신은 하나씩 (동시에 요청되면 뒤 요청은 갱신된 요약을 사용)
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._background: Dict[str, asyncio.Task] = {}
+
+    async def _chat(self, messages, priority: int, session: Optional[str]) -> str:
+        return await self.client.chat(
+            model=SUMMARY_MODEL,
+            messages=messages,
+            max_tokens=SUMMARY_MAX_TOKENS,
+            temperature=0.1,
+            priority=priority,
+            session=session,
+        )
+
+    async def _stream(self, messages, priority: int, session: Optional[str]) -> AsyncIterator[str]:
+        async for delta in self.client.chat_stream(
+            model=SUMMARY_MODEL,
+            messages=messages,
+            max_tokens=SUMMARY_MAX_TOKENS,
+            temperature=0.1,
+            priority=priority,
+            session=session,
+        ):
+            yield delta
+
+    async def _reduce(self, text: str, priority: int, session: Optional[str]) -> List[str]:
+        """
+        구간별 요약을 동시에 만든 뒤 fan_in개 이하가 될 때까지 fan_in개씩 합칩니다.
+        """
+        segments = split_text(text, self.segment_chars)
+        SUMMARY_UPDATES.inc(mode="map_reduce")
+        logger.info(f"계층적 요약: {len(text)}자를 {len(segments)}개 구간으로 나눔")
+        summaries = await asyncio.gather(
+            *(self._chat(segment_summary_messages(s), priority, session) for s in segments)
+        )
+        while len(summaries) > self.fan_in:
+            groups = [summaries[i:i + self.fan_in] for i in range(0, len(summaries), self.fan_in)]
+            summaries = await asyncio.gather(*(self._merge(group, priority, session) for group in groups))
+        return list(summaries)
+
+    async def map_reduce(self, text: str, priority: int = PRIORITY_SUMMARY, session: Optional[str] = None) -> str:
+        return await self._merge(await self._reduce(text, priority, session), priority, session)
+
+    async def _merge(self, group: List[str], priority: int, session: Optional[str]) -> str:
+        if len(group) == 1:
+            return group[0]
+        return await self._chat(merge_summary_messages(group), priority, session)
+
+    def fits_direct(self, text: str) -> bool:
+        """
+        한 번의 호출로 요약할 수 있는 길이인지 (direct_max_chars, direct_max_tokens 이하)
+        """
+        return len(text) <= self.direct_max_chars and count_tokens(text) <= self.direct_max_tokens
+
+    async def summarize_text(self, text: str, priority: int = PRIORITY_SUMMARY, session: Optional[str] = None) -> str:
+        """
+        텍스트 전체를 요약합니다. 반복 조각을 제거한 뒤에도 길면 계층적 요약을 사용합니다.
+        """
+        text = prepare_text("summarize", text)
+        if self.fits_direct(text):
+            SUMMARY_UPDATES.inc(mode="full")
+            return await self._chat(summary_messages(text), priority, session)
+        return await self.map_reduce(text, priority, session)
+
+    async def stream_text(
+        self, text: str, priority: int = PRIORITY_SUMMARY, session: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        summarize_text와 같지만 마지막 단계의 토큰을 도착하는 즉시 전달합니다.
+        """
+        text = prepare_text("summarize", text)
+        if self.fits_direct(text):
+            SUMMARY_UPDATES.inc(mode="full")
+            messages = summary_messages(text)
+        else:
+            summaries = await self._reduce(text, priority, session)
+            if len(summaries) == 1:
+                yield summaries[0]
+                return
+            messages = merge_summary_messages(summaries)
+        async for delta in self._stream(messages, priority, session):
+            yield delta
+
+    async def _prepare(self, call: CallSession, priority: int) -> Tuple[Optional[list], Optional[TranscriptEntry]]:
+        """
+        통화 요약을 갱신할 메시지와 반영할 마지막 전사 항목을 반환합니다. 이미 최신이면 메시지는 None입니다.
+        """
+        last_entry = call.last_entry
+        if call.summary is not None and call.summary_seq >= call.last_seq:
+            SUMMARY_UPDATES.inc(mode="cached")
+            return None, last_entry
+        new_text = prepare_text(
+            "summarize", call.transcript_text(after_seq=call.summary_seq if call.summary is not None else 0)
+        )
+        if not self.fits_direct(new_text):
+            # 새 전사가 길면 먼저 구간 요약으로 줄임
+            new_text = await self.map_reduce(new_text, priority, call.call_id)
+        if call.summary is None:
+            SUMMARY_UPDATES.inc(mode="full")
+            return summary_messages(new_text), last_entry
+        SUMMARY_UPDATES.inc(mode="fold")
+        return rolling_summary_messages(call.summary, new_text), last_entry
+
+    async def compact(
+        self,
+        text: str,
+        budget: int,
+        endpoint: str,
+        priority: int = PRIORITY_SUMMARY,
+        session: Optional[str] = None,
+    ) -> str:
+        """
+        budget 토큰을 넘는 대화는 최근 대화(예산의 절반)만 원문으로 두고 그 앞부분은 요약으로 바꿉니다.
+        """
+        if budget <= 0 or count_tokens(text) <= budget:
+            return text
+        fragments = split_fragments(text)
+        recent: List[str] = []
+        used = 0
+        for fragment in reversed(fragments):
+            size = count_tokens(fragment) + 1
+            if recent and used + size > budget // 2:
+                break
+            recent.append(fragment)
+            used += size
+        head = " ".join(fragments[:len(fragments) - len(recent)])
+        recent_text = truncate_recent(" ".join(reversed(recent)), max(1, budget // 2))
+        if not head:
+            compacted = recent_text
+        else:
+            SUMMARY_UPDATES.inc(mode="compact")
+            compacted = compacted_text(await self.summarize_text(head, priority, session), recent_text)
+        record_saved(endpoint, "compact", text, compacted)
+        return compacted
+
+    def _lock(self, call: CallSession) -> asyncio.Lock:
+        # 사용 중인 동안만 유지되는 통화별 잠금
+        lock = self._locks.get(call.call_id)
+        if lock is None:
+            lock = self._locks[call.call_id] = asyncio.Lock()
+        return lock
+
+    async def summarize_call(self, call: CallSession, priority: int = PRIORITY_SUMMARY) -> str:
+        """
+        통화 요약을 새 전사까지 반영해 갱신하고 반환합니다.
+        """
+        async with self._lock(call):
+            messages, last_entry = await self._prepare(call, priority)
+            if messages is not None:
+                call.save_result("summary", await self._chat(messages, priority, call.call_id), last_entry)
+            return call.summary
+
+    async def stream_call(self, call: CallSession, priority: int = PRIORITY_SUMMARY) -> AsyncIterator[str]:
+        """
+        summarize_call과 같지만 마지막 요약 단계의 토큰을 도착하는 즉시 전달합니다.
+        """
+        async with self._lock(call):
+            messages, last_entry = await self._prepare(call, priority)
+            if messages is None:
+                yield call.summary
+                return
+            parts = []
+            async for delta in self._stream(messages, priority, call.call_id):
+                parts.append(delta)
+                yield delta
+            call.save_result("summary", "".join(parts).strip(), last_entry)
+
+    def pending_chars(self, call: CallSession) -> int:
+        after = call.summary_seq if call.summary is not None else 0
+        total = 0
+        for entry in reversed(call.transcript):
+            if entry.seq <= after:
+                break
+            total += len(entry.text)
+        return total
+
+    def schedule(self, call: CallSession):
+        """
+        요약되지 않은 전사가 trigger_chars 이상이면 백그라운드에서 요약을 갱신합니다.
+        """
+        if self.trigger_chars <= 0 or not self.client.available:
+            return
+        task = self._background.get(call.call_id)
+        if task is not None and not task.done():
+            return
+        if self.pending_chars(call) < self.trigger_chars:
+            return
+        task = asyncio.create_task(self._background_update(call))
+        self._background[call.call_id] = task
+        task.add_done_callback(lambda _: self._background.pop(call.call_id, None))
+
+    async def _background_update(self, call: CallSession):
+        try:
+            await self.summarize_call(call, priority=PRIORITY_BATCH)
+        except Exception as e:
+            logger.warning(f"백그라운드 요약 갱신 실패 ({call.call_id}): {e}")
+
+    async def close(self):
+        tasks = list(self._background.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+summarizer = RollingSummarizer(
+    inference,
+    direct_max_chars=settings.SUMMARY_DIRECT_MAX_CHARS,
+    direct_max_tokens=settings.SUMMARY_DIRECT_MAX_TOKENS,
+    segment_chars=settings.SUMMARY_SEGMENT_CHARS,
+    fan_in=settings.SUMMARY_FAN_IN,
+    trigger_chars=settings.SUMMARY_ROLLING_TRIGGER_CHARS,
+)
@@ -0,0 +1,16 @@
+"""
+단위 테스트 공통 설정
+
+백엔드 모듈은 backend/에서 바로 import하는 평면 구조이므로 경로를 추가하고,
+설정(config.py)을 읽기 전에 네트워크/디스크를 쓰지 않는 환경 변수를 지정합니다.
+"""
+
+import os
+import sys
+
+os.environ.setdefault("MODEL_PROVIDER", "local")
+os.environ.setdefault("SESSION_DB_PATH", "")
+os.environ.setdefault("CACHE_DB_PATH", "")
+os.environ.setdefault("BUS_URL", "")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,55 @@
+import numpy as np
+
+from acoustic import AcousticAnalyzer, fuse_risk, fuse_risk_level
+from audio import SAMPLE_RATE
+
+
+def voice(seconds: float, frequency: float, amplitude: float, syllables: float = 4.0) -> np.ndarray:
+    # 음절 속도로 음량이 오르내리는 유성음
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * syllables * t)
+    return (amplitude * envelope * np.sin(2 * np.pi * frequency * t) * 32767).astype(np.int16)
+
+
+def feed_all(analyzer: AcousticAnalyzer, samples: np.ndarray, chunk: int = 1600):
+    features = None
+    for start in range(0, len(samples), chunk):
+        features = analyzer.feed(samples[start:start + chunk].tobytes()) or features
+    return features
+
+
+def test_pitch_is_tracked_across_odd_chunk_sizes():
+    analyzer = AcousticAnalyzer()
+    features = feed_all(analyzer, voice(2.0, 150.0, 0.3, syllables=0.0), chunk=1234)
+    assert abs(features.pitch_hz - 150.0) < 10.0
+    assert features.rms_db > -30.0
+
+
+def test_pitch_is_not_halved_for_changing_loudness():
+    # 음량이 오르내리는 발화에서 주기의 두 배 지연을 피치로 잡지 않음
+    for frequency in (150.0, 200.0, 260.0):
+        features = feed_all(AcousticAnalyzer(), voice(2.0, frequency, 0.3, syllables=5.0))
+        assert abs(features.pitch_hz - frequency) < frequency * 0.05
+
+
+def test_loud_high_speech_raises_agitation_over_baseline():
+    analyzer = AcousticAnalyzer()
+    calm = feed_all(analyzer, voice(3.0, 140.0, 0.05))
+    assert analyzer.baseline_db is not None and calm.agitation < 0.2
+    agitated = feed_all(analyzer, voice(3.0, 260.0, 0.6, syllables=6.0))
+    assert agitated.agitation > 0.4 and agitated.shout_ratio > 0.3
+    # 말이 없으면 서서히 가라앉음
+    quiet = feed_all(analyzer, np.zeros(SAMPLE_RATE * 2, dtype=np.int16))
+    assert quiet.agitation < agitated.agitation
+
+
+def test_short_chunk_without_full_frame_returns_none():
+    assert AcousticAnalyzer().feed(b"\x00\x00" * 100) is None
+
+
+def test_fused_risk_only_raises_text_score():
+    assert fuse_risk_level(40, None) == 40
+    assert fuse_risk_level(40, 0.2) == 40
+    assert fuse_risk_level(40, 0.9) == 55
+    fused = fuse_risk({"risk_level": 60}, 1.0)
+    assert fused["fused_risk_level"] == 72 and fused["acoustic_agitation"] == 1.0
@@ -0,0 +1,52 @@
+import numpy as np
+
+from audio import SAMPLE_RATE, VoiceActivityDetector, WavEncoder, find_silence_splits
+
+
+def tone(seconds: float, amplitude: float, frequency: float = 220.0) -> np.ndarray:
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return (amplitude * 32767 * np.sin(2 * np.pi * frequency * t)).astype(np.int16)
+
+
+def test_vad_separates_speech_from_silence_and_noise():
+    vad = VoiceActivityDetector()
+    assert not vad.analyze(np.zeros(SAMPLE_RATE, dtype=np.int16).tobytes()).is_speech
+    speech = vad.analyze(tone(1.0, 0.3).tobytes())
+    assert speech.is_speech and speech.speech_ratio > 0.9
+    # 흰 잡음은 영교차율이 높아 에너지가 커도 음성으로 보지 않음
+    noise = (np.random.default_rng(0).uniform(-0.3, 0.3, SAMPLE_RATE) * 32767).astype(np.int16)
+    assert not vad.analyze(noise.tobytes()).is_speech
+
+
+def test_vad_noise_floor_raises_threshold():
+    vad = VoiceActivityDetector(energy_threshold_db=-60.0)
+    # 약 -56 dBFS의 작은 소리는 처음에는 임계값(-60 dBFS)을 넘음
+    faint = tone(1.0, 0.00224)
+    assert vad.analyze(faint.tobytes()).is_speech
+    # 약 -62 dBFS 배경 잡음을 학습하면 임계값이 잡음 수준 + 10 dB로 올라감
+    for _ in range(20):
+        vad.analyze(tone(1.0, 0.00112, frequency=300.0).tobytes())
+    assert -64 < vad.noise_floor_db < -60
+    assert not vad.analyze(faint.tobytes()).is_speech
+    assert vad.analyze(tone(1.0, 0.3).tobytes()).is_speech
+
+
+def test_vad_handles_chunks_shorter_than_a_frame():
+    result = VoiceActivityDetector().analyze(b"\x00\x01" * 10)
+    assert not result.is_speech and result.speech_ratio == 0.0
+
+
+def test_wav_encoder_reuses_buffer():
+    encoder = WavEncoder()
+    first = encoder.encode(tone(0.5, 0.1))
+    assert len(first.getvalue()) == 44 + SAMPLE_RATE
+    second = encoder.encode(tone(0.25, 0.1))
+    assert second is first and len(second.getvalue()) == 44 + SAMPLE_RATE // 2
+
+
+def test_silence_splits_cut_in_pauses():
+    samples = np.concatenate([tone(50, 0.3), np.zeros(SAMPLE_RATE * 2, dtype=np.int16), tone(50, 0.3)])
+    bounds = find_silence_splits(samples, SAMPLE_RATE, target_seconds=45.0, search_seconds=10.0)
+    assert bounds[0][0] == 0 and bounds[-1][1] == len(samples)
+    cut = bounds[0][1] / SAMPLE_RATE
+    assert 50 <= cut <= 52
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from audio_frames import (
+    CODEC_MULAW, FRAME_HEADER, AudioStreamDecoder, FrameError, FrameHeader, FrameReassembler, encode_frame,
+    mulaw_encode, parse_frame, resample,
+)
+
+
+def frame(seq: int, value: int, samples: int = 160, timestamp_ms: int = None) -> tuple:
+    timestamp_ms = seq * samples * 1000 // 16000 if timestamp_ms is None else timestamp_ms
+    return FrameHeader(seq, timestamp_ms, 16000, 1, 0), np.full(samples, value, dtype=np.int16)
+
+
+def values(chunks) -> list:
+    return [int(chunk[0]) for chunk in chunks]
+
+
+def test_reassembler_reorders_within_window():
+    reassembler = FrameReassembler(reorder_window=4)
+    assert values(reassembler.push(*frame(0, 0))) == [0]
+    assert reassembler.push(*frame(2, 2)) == []
+    assert values(reassembler.push(*frame(1, 1))) == [1, 2]
+
+
+def test_reassembler_drops_late_and_duplicate_frames():
+    reassembler = FrameReassembler(reorder_window=4)
+    reassembler.push(*frame(0, 0))
+    reassembler.push(*frame(1, 1))
+    assert reassembler.push(*frame(1, 1)) == []
+    assert reassembler.push(*frame(0, 0)) == []
+    assert reassembler.push(*frame(3, 3)) == []
+    assert reassembler.push(*frame(3, 3)) == []
+
+
+def test_reassembler_skips_lost_frame_and_fills_gap_with_silence():
+    reassembler = FrameReassembler(reorder_window=2)
+    reassembler.push(*frame(0, 5))
+    assert reassembler.push(*frame(2, 2)) == []
+    assert reassembler.push(*frame(3, 3)) == []
+    chunks = reassembler.push(*frame(4, 4))
+    # 1번 프레임 유실: 그 길이(10ms)만큼 무음을 넣고 2번부터 이어감
+    assert len(chunks[0]) == 160 and not chunks[0].any()
+    assert values(chunks[1:]) == [2, 3, 4]
+
+
+def test_reassembler_handles_sequence_wraparound():
+    reassembler = FrameReassembler(reorder_window=4)
+    assert values(reassembler.push(*frame(0xFFFFFFFF, 1, timestamp_ms=0))) == [1]
+    assert values(reassembler.push(*frame(0, 2, timestamp_ms=10))) == [2]
+
+
+def test_parse_frame_rejects_bad_headers():
+    payload = np.zeros(10, dtype=np.int16).tobytes()
+    header, body = parse_frame(encode_frame(7, 20, payload))
+    assert header.seq == 7 and bytes(body) == payload
+    with pytest.raises(FrameError):
+        parse_frame(b"AF")
+    with pytest.raises(FrameError):
+        parse_frame(b"XX" + encode_frame(0, 0, payload)[2:])
+    with pytest.raises(FrameError):
+        parse_frame(encode_frame(0, 0, payload, sample_rate=12345))
+    with pytest.raises(FrameError):
+        parse_frame(encode_frame(0, 0, payload, codec=9))
+
+
+def test_legacy_decoder_does_not_sniff_frame_magic():
+    # 첫 샘플이 0x4641(b"AF")인 헤더 없는 PCM도 그대로 사용
+    pcm = np.array([0x4641] + [0] * (FRAME_HEADER.size * 2), dtype="<i2").tobytes()
+    assert pcm[:2] == b"AF"
+    assert AudioStreamDecoder().feed(pcm) == pcm
+
+
+def test_framed_decoder_decodes_mulaw_to_16khz():
+    tone = (np.sin(2 * np.pi * 200 * np.arange(800) / 8000) * 8000).astype(np.int16)
+    message = encode_frame(0, 0, mulaw_encode(tone).tobytes(), sample_rate=8000, codec=CODEC_MULAW)
+    pcm = np.frombuffer(AudioStreamDecoder(framed=True).feed(message), dtype=np.int16)
+    assert len(pcm) == 1600
+    assert abs(np.abs(pcm).max() - 8000) < 600
+
+
+def test_resample_attenuates_content_above_target_nyquist():
+    t = np.arange(44100) / 44100
+    high = np.sin(2 * np.pi * 15000 * t).astype(np.float32)
+    low = np.sin(2 * np.pi * 440 * t).astype(np.float32)
+    assert np.abs(resample(high, 44100)).mean() < 0.5 * np.abs(resample(low, 44100)).mean()
+    assert len(resample(np.zeros(48000, dtype=np.float32), 48000)) == 16000
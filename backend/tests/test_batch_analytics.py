@@ -0,0 +1,58 @@
+import asyncio
+import io
+import json
+import os
+import wave
+
+import numpy as np
+
+from batch_analytics import CHECKPOINT_FILE, parse_args, prepare_recording, run_batch
+
+
+def write_recording(path, seconds: float = 4.0, sample_rate: int = 8000):
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    samples = (0.3 * np.sin(2 * np.pi * 180 * t) * 32767).astype(np.int16)
+    samples[: sample_rate // 2] = 0
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.tobytes())
+
+
+def test_prepare_recording_resamples_and_keeps_speech(tmp_path):
+    path = tmp_path / "call.wav"
+    write_recording(path)
+    prepared = prepare_recording(str(path), segment_seconds=60.0)
+    assert prepared.source_sample_rate == 8000 and prepared.duration == 4.0
+    assert len(prepared.segments) == 1
+    with wave.open(io.BytesIO(prepared.segments[0])) as wav:
+        assert wav.getframerate() == 16000
+    assert 150 < prepared.features["pitch_mean_hz"] < 210
+
+
+def test_run_batch_writes_parts_and_resumes_from_checkpoint(tmp_path):
+    recordings = tmp_path / "recordings"
+    (recordings / "day1").mkdir(parents=True)
+    write_recording(recordings / "a.wav")
+    write_recording(recordings / "day1" / "b.wav")
+    (recordings / "notes.txt").write_text("무시")
+    output = tmp_path / "out"
+    args = parse_args([str(recordings), "--output", str(output), "--format", "jsonl",
+                       "--workers", "1", "--concurrency", "2", "--batch-size", "1"])
+
+    stats = asyncio.run(run_batch(args))
+    assert (stats["processed"], stats["skipped"], stats["failed"]) == (2, 0, 0)
+    parts = sorted(name for name in os.listdir(output) if name.startswith("part-"))
+    assert parts == ["part-00000.jsonl", "part-00001.jsonl"]
+    rows = [json.loads(line) for part in parts for line in open(output / part, encoding="utf-8")]
+    assert sorted(row["path"] for row in rows) == ["a.wav", os.path.join("day1", "b.wav")]
+    assert all(row["transcript"] and row["risk_stage"] for row in rows)
+
+    # 체크포인트에 없는(쓰다 중단된) part는 지우고, 처리한 녹음은 건너뜀
+    (output / "part-00009.jsonl").write_text("")
+    write_recording(recordings / "c.wav")
+    stats = asyncio.run(run_batch(args))
+    assert (stats["processed"], stats["skipped"]) == (1, 2)
+    assert not (output / "part-00009.jsonl").exists()
+    assert len((output / CHECKPOINT_FILE).read_text(encoding="utf-8").splitlines()) == 3
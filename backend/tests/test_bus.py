@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from bus import BusError, InProcessBus, RedisBus
+from bus_server import start_background_server
+from call_store import CallStore
+from connections import ConnectionManager
+
+
+def test_background_server_defaults_to_tcp_loopback():
+    url = start_background_server()
+    assert url.startswith("redis://127.0.0.1:")
+
+    async def run():
+        bus = RedisBus(url)
+        received = []
+        bus.subscribe("channel", received.append)
+        await bus.start()
+        await bus.hset("key", {"field": {"value": 1}})
+        assert await bus.hgetall("key") == {"field": {"value": 1}}
+        await bus.hdel("key", "field")
+        assert await bus.hgetall("key") == {}
+        for _ in range(50):
+            if await bus.publish("channel", {"n": 1}):
+                break
+            await asyncio.sleep(0.02)
+        for _ in range(50):
+            if received:
+                break
+            await asyncio.sleep(0.02)
+        assert received == [{"n": 1}]
+        await bus.aclose()
+
+    asyncio.run(run())
+
+
+def test_background_server_reports_startup_failure():
+    url = start_background_server()
+    port = int(url.rsplit(":", 1)[1])
+    with pytest.raises(BusError):
+        start_background_server(port=port)
+
+
+def test_unreachable_bus_raises_bus_error():
+    async def run():
+        for url in ("redis://127.0.0.1:1", "ftp://example"):
+            with pytest.raises(BusError):
+                await RedisBus(url, connect_timeout=0.5).hgetall("key")
+
+    asyncio.run(run())
+
+
+def test_in_process_bus_delivers_after_publisher_returns():
+    async def run():
+        bus = InProcessBus()
+        received = []
+        bus.subscribe("channel", received.append)
+        assert await bus.publish("channel", {"n": 1}) == 1
+        assert received == []
+        await asyncio.sleep(0)
+        assert received == [{"n": 1}]
+
+    asyncio.run(run())
+
+
+def test_call_events_reach_other_workers_only():
+    url = start_background_server()
+
+    async def run():
+        first = ConnectionManager(RedisBus(url), worker_id="first")
+        second = ConnectionManager(RedisBus(url), worker_id="second")
+        stores = {"first": CallStore(), "second": CallStore()}
+        echoed = []
+        first.on_call_event(stores["first"].apply_event)
+        first.on_call_event(lambda call_id, event: echoed.append(event))
+        second.on_call_event(stores["second"].apply_event)
+        await first.start()
+        await second.start()
+
+        origin = await stores["first"].get_or_create("call")
+        replica = await stores["second"].get_or_create("call")
+        origin.append_transcript("안녕하세요", source="stt")
+        origin.update_agitation(0.7)
+        first.publish_call_event("call", {"type": "transcript", "text": "안녕하세요", "source": "stt"})
+        first.publish_call_event("call", {"type": "agitation", "agitation": 0.7, "at": origin.agitation_at})
+
+        for _ in range(100):
+            if replica.agitation is not None:
+                break
+            await asyncio.sleep(0.02)
+        assert [entry.text for entry in replica.transcript] == ["안녕하세요"]
+        assert replica.recent_agitation(60) == 0.7
+        # 발행한 워커에는 다시 반영되지 않음
+        assert echoed == []
+
+        await first.stop()
+        await second.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,132 @@
+import asyncio
+import sqlite3
+import time
+
+from call_store import CallStore
+
+
+def test_sessions_for_one_call_get_distinct_seqs(tmp_path):
+    async def run():
+        path = str(tmp_path / "sessions.db")
+        first, second = CallStore(path), CallStore(path)
+        a = await first.get_or_create("call")
+        await first.flush()
+        b = await second.load("call")
+        b.append_transcript("두 번째 워커", "text_chunk")
+        await second.flush()
+        a.append_transcript("첫 번째 워커", "stt")
+        a.save_result("summary", "요약", a.last_entry)
+        await first.flush()
+        assert [entry.seq for entry in a.transcript] == [2]
+        assert a.summary_seq == 2
+
+        reader = CallStore(path)
+        loaded = await reader.load("call")
+        assert [(entry.seq, entry.text) for entry in loaded.transcript] == [(1, "두 번째 워커"), (2, "첫 번째 워커")]
+        assert loaded.summary_seq == 2
+        for store in (first, second, reader):
+            store.close()
+
+    asyncio.run(run())
+
+
+def test_connected_sessions_are_not_evicted():
+    async def run():
+        store = CallStore(max_active=2)
+        attached = await store.attach("attached")
+        await store.get_or_create("b")
+        await store.get_or_create("c")
+        # 가장 오래된 세션이지만 연결 중이므로 그다음 세션을 내보냄
+        assert await store.load("b") is None
+        store.detach(attached)
+        await store.get_or_create("d")
+        assert await store.load("attached") is None
+
+    asyncio.run(run())
+
+
+def test_agitation_is_shared_through_sqlite(tmp_path):
+    async def run():
+        path = str(tmp_path / "sessions.db")
+        audio, analysis = CallStore(path), CallStore(path)
+        speaker = await audio.get_or_create("call")
+        speaker.update_agitation(0.8)
+        await audio.flush()
+        listener = await analysis.load("call")
+        assert await analysis.recent_agitation(listener, max_age=10) == 0.8
+        audio.close()
+        analysis.close()
+
+    asyncio.run(run())
+
+
+def test_record_risk_accepts_non_numeric_chunk_id():
+    async def run():
+        store = CallStore()
+        call = await store.get_or_create("call")
+        for chunk_id in ("chunk-a", None, "7", 2 ** 70):
+            call.record_risk({"chunk_id": chunk_id, "risk_level": 30})
+        assert call.timeline.as_dict()["chunk_ids"] == [0, 0, 7, 0]
+
+    asyncio.run(run())
+
+
+def test_failed_flush_requeues_writes_in_order(tmp_path):
+    async def run():
+        store = CallStore(str(tmp_path / "sessions.db"))
+        call = await store.get_or_create("call")
+        call.append_transcript("첫 발화", "stt")
+        call.record_risk({"chunk_id": 1, "risk_level": 10})
+        write_batch = store._write_batch
+
+        def locked(*args):
+            raise sqlite3.OperationalError("database is locked")
+
+        store._write_batch = locked
+        assert not await store.flush()
+        call.append_transcript("둘째 발화", "stt")
+        store._write_batch = write_batch
+        assert await store.flush()
+
+        store._sessions.clear()
+        loaded = await store.load("call")
+        assert [(entry.seq, entry.text) for entry in loaded.transcript] == [(1, "첫 발화"), (2, "둘째 발화")]
+        assert len(loaded.timeline) == 1
+        store.close()
+
+    asyncio.run(run())
+
+
+def test_concurrent_flushes_keep_transcript_order(tmp_path):
+    async def run():
+        store = CallStore(str(tmp_path / "sessions.db"))
+        call = await store.get_or_create("call")
+        flushes = []
+        for index in range(20):
+            call.append_transcript(f"발화 {index}", "stt")
+            flushes.append(asyncio.create_task(store.flush()))
+        await asyncio.gather(*flushes)
+        store._sessions.clear()
+        loaded = await store.load("call")
+        assert [entry.text for entry in loaded.transcript] == [f"발화 {index}" for index in range(20)]
+        store.close()
+
+    asyncio.run(run())
+
+
+def test_purge_removes_calls_past_retention(tmp_path):
+    async def run():
+        store = CallStore(str(tmp_path / "sessions.db"), retention_days=1)
+        old = await store.get_or_create("old")
+        old.append_transcript("오래된 통화", "stt")
+        old.updated_at = time.time() - 2 * 86400
+        recent = await store.get_or_create("recent")
+        recent.append_transcript("최근 통화", "stt")
+        await store.flush()
+        old.updated_at = time.time() - 2 * 86400
+        assert await store.purge() == 1
+        assert await store.load("old") is None
+        assert (await store.load("recent")).transcript[0].text == "최근 통화"
+        store.close()
+
+    asyncio.run(run())
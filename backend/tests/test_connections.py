@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from bus import InProcessBus
+from connections import Connection, ConnectionManager, risk_merge_key
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sent = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        await asyncio.sleep(self.delay)
+        self.sent.append(text)
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+
+def make_connection(websocket: FakeWebSocket, max_queue: int = 4) -> Connection:
+    return Connection("session", websocket, "analysis", max_queue=max_queue, send_timeout=1.0, accepts_ping=True)
+
+
+def test_merge_key_keeps_latest_and_merges_chunk_ids():
+    async def run():
+        websocket = FakeWebSocket()
+        connection = make_connection(websocket)
+        for chunk_id in (1, 2):
+            message = {"type": "risk_analysis", "provisional": True, "chunk_ids": [chunk_id], "risk_level": chunk_id}
+            connection.send(message, merge_key=risk_merge_key(message))
+        assert len(connection) == 1
+        await connection.close()
+        assert len(websocket.sent) == 1
+        assert '"chunk_ids": [1, 2]' in websocket.sent[0] and '"risk_level": 2' in websocket.sent[0]
+
+    asyncio.run(run())
+
+
+def test_full_queue_drops_mergeable_messages_first():
+    async def run():
+        websocket = FakeWebSocket(delay=10)
+        connection = make_connection(websocket, max_queue=2)
+        connection.send({"type": "partial"}, merge_key="partial")
+        connection.send({"type": "transcription", "n": 1})
+        connection.send({"type": "transcription", "n": 2})
+        assert [payload["type"] for _, payload in connection._queue] == ["transcription", "transcription"]
+        # 버릴 수 있는 메시지가 없으면 따라오지 못하는 클라이언트로 보고 연결 종료
+        with pytest.raises(ConnectionError):
+            connection.send({"type": "transcription", "n": 3})
+        await asyncio.sleep(0)
+        assert connection.closed and websocket.closed_with == 1013
+
+    asyncio.run(run())
+
+
+def test_idle_connection_is_pinged_then_closed(monkeypatch):
+    monkeypatch.setattr(ConnectionManager, "_reap_interval", property(lambda self: 0.02))
+
+    async def run():
+        manager = ConnectionManager(InProcessBus(), heartbeat_interval=0.05, idle_timeout=0.2)
+        await manager.start()
+        websocket = FakeWebSocket()
+        connection = await manager.connect(websocket, kind="analysis", accepts_ping=True)
+        audio = await manager.connect(FakeWebSocket(), kind="audio", reap_idle=False)
+        assert set(await manager.sessions()) == {connection.session_id, audio.session_id}
+        await asyncio.sleep(0.1)
+        assert '{"type": "ping"}' in websocket.sent
+        await asyncio.sleep(0.2)
+        assert manager.get(connection.session_id) is None and websocket.closed_with == 1001
+        # 음성 스트림은 수신이 없어도 정리하지 않음
+        assert manager.get(audio.session_id) is audio
+        await manager.stop()
+
+    asyncio.run(run())
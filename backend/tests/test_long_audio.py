@@ -0,0 +1,70 @@
+import asyncio
+import io
+import wave
+
+import numpy as np
+
+from audio import find_silence_splits
+from long_audio import open_wav, transcribe_segments
+
+
+def make_wav(samples: np.ndarray, sample_rate: int, channels: int = 1) -> io.BytesIO:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(np.repeat(samples, channels).astype("<i2").tobytes())
+    buffer.seek(0)
+    return buffer
+
+
+def speech_with_pauses(sample_rate: int, seconds: int) -> np.ndarray:
+    # 5초 발화 뒤 1초 무음 반복
+    t = np.arange(sample_rate * seconds) / sample_rate
+    samples = (8000 * np.sin(2 * np.pi * 220 * t)).astype(np.int16)
+    samples[(t % 6) >= 5] = 0
+    return samples
+
+
+def test_open_wav_rejects_non_wav_and_short_input():
+    fileobj = io.BytesIO(b"ID3 not a wav file")
+    assert open_wav(fileobj) is None and fileobj.tell() == 0
+    assert open_wav(make_wav(np.zeros(8000, dtype=np.int16), 8000), min_seconds=2.0) is None
+
+
+def test_block_scan_matches_in_memory_splits():
+    sample_rate = 8000
+    samples = speech_with_pauses(sample_rate, 200)
+    audio = open_wav(make_wav(samples, sample_rate, channels=2))
+    assert audio.channels == 2 and audio.duration == 200
+    expected = find_silence_splits(samples, sample_rate, 60.0, 10.0)
+    assert len(expected) > 1
+    assert audio.find_silence_splits(60.0, 10.0) == expected
+    start, end = expected[1]
+    assert np.array_equal(audio.read(start, end), samples[start:end])
+
+
+def test_truncated_file_uses_actual_length():
+    sample_rate = 8000
+    buffer = make_wav(speech_with_pauses(sample_rate, 30), sample_rate)
+    truncated = io.BytesIO(buffer.getvalue()[: 44 + sample_rate * 2 * 20])
+    audio = open_wav(truncated)
+    assert audio.duration == 30
+    assert audio.find_silence_splits(60.0, 10.0) == [(0, sample_rate * 20)]
+    assert audio.duration == 20
+
+
+def test_transcribe_segments_keeps_order():
+    sample_rate = 8000
+    audio = open_wav(make_wav(speech_with_pauses(sample_rate, 150), sample_rate))
+
+    async def run():
+        return await transcribe_segments(audio, segment_seconds=60.0, search_seconds=10.0, workers=2)
+
+    result = asyncio.run(run())
+    segments = result["segments"]
+    assert len(segments) > 1 and all(segment["text"] for segment in segments)
+    assert segments[0]["start"] == 0 and segments[-1]["end"] == 150
+    assert all(a["end"] == b["start"] for a, b in zip(segments, segments[1:]))
+    assert result["duration"] == 150
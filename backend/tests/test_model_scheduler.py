@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+
+from model_scheduler import (
+    PRIORITY_BATCH, PRIORITY_RISK, PRIORITY_SUMMARY, PRIORITY_TRANSCRIPTION, ModelScheduler, SchedulerRejected,
+)
+
+
+async def hold(scheduler: ModelScheduler, priority: int, order: list, name: str, release: asyncio.Event, **kwargs):
+    async with scheduler.slot(priority, **kwargs):
+        order.append(name)
+        await release.wait()
+
+
+def test_waiting_requests_run_by_priority_then_arrival():
+    async def run():
+        scheduler = ModelScheduler(max_concurrency=1, reserved_slots=0)
+        order = []
+        release = asyncio.Event()
+        release.set()
+        assert scheduler.try_acquire(PRIORITY_BATCH)
+        tasks = [
+            asyncio.create_task(hold(scheduler, priority, order, name, release))
+            for name, priority in [
+                ("summary-1", PRIORITY_SUMMARY),
+                ("batch", PRIORITY_BATCH),
+                ("risk", PRIORITY_RISK),
+                ("summary-2", PRIORITY_SUMMARY),
+                ("transcription", PRIORITY_TRANSCRIPTION),
+            ]
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.queued()["summary"] == 2
+        scheduler.release()
+        await asyncio.gather(*tasks)
+        assert order == ["risk", "transcription", "summary-1", "summary-2", "batch"]
+        assert scheduler.active == 0
+
+    asyncio.run(run())
+
+
+def test_reserved_slots_are_kept_for_realtime_calls():
+    async def run():
+        scheduler = ModelScheduler(max_concurrency=2, reserved_slots=1)
+        order = []
+        release = asyncio.Event()
+        first = asyncio.create_task(hold(scheduler, PRIORITY_SUMMARY, order, "summary-1", release))
+        await asyncio.sleep(0)
+        # 남은 한 슬롯은 실시간 처리용이므로 요약은 기다리다 제한 시간이 지남
+        with pytest.raises(SchedulerRejected) as error:
+            async with scheduler.slot(PRIORITY_SUMMARY, deadline=0.05):
+                pass
+        assert error.value.reason == "deadline"
+        risk = asyncio.create_task(hold(scheduler, PRIORITY_RISK, order, "risk", release))
+        await asyncio.sleep(0)
+        assert order == ["summary-1", "risk"] and scheduler.active == 2
+        release.set()
+        await asyncio.gather(first, risk)
+        assert scheduler.active == 0 and scheduler.queued()["summary"] == 0
+
+    asyncio.run(run())
+
+
+def test_urgent_session_uses_reserved_slot_and_jumps_queue():
+    async def run():
+        scheduler = ModelScheduler(max_concurrency=2, reserved_slots=1)
+        order = []
+        release = asyncio.Event()
+        first = asyncio.create_task(hold(scheduler, PRIORITY_SUMMARY, order, "first", release))
+        await asyncio.sleep(0)
+        normal = asyncio.create_task(hold(scheduler, PRIORITY_SUMMARY, order, "normal", release, session="a"))
+        urgent = asyncio.create_task(hold(scheduler, PRIORITY_SUMMARY, order, "urgent", release, session="b"))
+        await asyncio.sleep(0)
+        assert order == ["first"]
+        scheduler.set_urgent("b", True)
+        await asyncio.sleep(0)
+        assert order == ["first", "urgent"]
+        release.set()
+        await asyncio.gather(first, normal, urgent)
+        assert order == ["first", "urgent", "normal"]
+
+    asyncio.run(run())
+
+
+def test_full_queue_rejects_new_requests():
+    async def run():
+        scheduler = ModelScheduler(max_concurrency=1, reserved_slots=0, max_queue=1)
+        release = asyncio.Event()
+        assert scheduler.try_acquire(PRIORITY_SUMMARY)
+        waiting = asyncio.create_task(hold(scheduler, PRIORITY_SUMMARY, [], "waiting", release))
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerRejected) as error:
+            async with scheduler.slot(PRIORITY_SUMMARY):
+                pass
+        assert error.value.reason == "overloaded"
+        scheduler.release()
+        release.set()
+        await waiting
+        assert scheduler.active == 0
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_leaves_queue():
+    async def run():
+        scheduler = ModelScheduler(max_concurrency=1, reserved_slots=0)
+        assert scheduler.try_acquire(PRIORITY_SUMMARY)
+        waiting = asyncio.create_task(hold(scheduler, PRIORITY_SUMMARY, [], "waiting", asyncio.Event()))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert scheduler.queued()["summary"] == 0
+        scheduler.release()
+        assert scheduler.active == 0 and scheduler.try_acquire(PRIORITY_SUMMARY)
+
+    asyncio.run(run())
+
+
+def test_throttled_operation_does_not_block_other_operations():
+    async def run():
+        scheduler = ModelScheduler(max_concurrency=4, reserved_slots=0, chat_rpm=1)
+        order = []
+        release = asyncio.Event()
+        release.set()
+        # 분당 1회 채팅 한도를 다 씀
+        assert scheduler.try_acquire(PRIORITY_RISK, operation="chat")
+        scheduler.release()
+        chat = [
+            asyncio.create_task(hold(scheduler, PRIORITY_RISK, order, f"chat-{n}", release, operation="chat"))
+            for n in range(2)
+        ]
+        await asyncio.sleep(0)
+        stt = asyncio.create_task(hold(scheduler, PRIORITY_TRANSCRIPTION, order, "stt", release, operation="stt"))
+        await asyncio.wait_for(stt, 1.0)
+        assert order == ["stt"] and scheduler.queued()["risk"] == 2
+        for task in chat:
+            task.cancel()
+        await asyncio.gather(*chat, return_exceptions=True)
+        assert scheduler.queued()["risk"] == 0 and scheduler.active == 0
+
+    asyncio.run(run())
@@ -0,0 +1,184 @@
+import asyncio
+import time
+
+import pytest
+
+from inference import InferenceClient
+from model_scheduler import PRIORITY_SUMMARY, ModelScheduler, SchedulerRejected
+from providers import ModelProvider
+from resilience import CIRCUIT_CLOSED, CIRCUIT_HALF_OPEN, CIRCUIT_OPEN, CircuitBreaker
+
+MESSAGES = [{"role": "user", "content": "안녕하세요"}]
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+class ScriptedProvider(ModelProvider):
+    """
+    chat은 errors에 넣어 둔 예외를 차례로 발생시킨 뒤 "ok"를 반환하고, chat_stream은 tokens를 보냅니다.
+    """
+
+    name = "scripted"
+
+    def __init__(self, errors=(), tokens=("a", "b"), token_delay: float = 0.0):
+        self.errors = list(errors)
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self.calls = 0
+
+    async def transcribe(self, file, model, language, timeout):
+        return ""
+
+    async def chat(self, messages, model, max_tokens, temperature, timeout):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+    async def chat_stream(self, messages, model, max_tokens, temperature, timeout):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        for token in self.tokens:
+            await asyncio.sleep(self.token_delay)
+            yield token
+
+
+def make_client(provider, scheduler=None, **kwargs) -> InferenceClient:
+    options = dict(
+        timeout=5.0,
+        scheduler=scheduler or ModelScheduler(max_concurrency=4, reserved_slots=0),
+        max_retries=0,
+        retry_base_delay=0.0,
+        hedge=False,
+        failure_threshold=2,
+        reset_timeout=60.0,
+    )
+    options.update(kwargs)
+    return InferenceClient(provider, **options)
+
+
+def half_open(breaker: CircuitBreaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker._opened_at = time.monotonic() - breaker.reset_timeout
+    assert breaker.allow()
+    assert breaker.state == CIRCUIT_HALF_OPEN
+
+
+def test_breaker_opens_after_threshold_and_rejects():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60.0)
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_OPEN
+    assert not breaker.allow() and not breaker.claim()
+    assert breaker.retry_after() > 0
+
+
+def test_half_open_allows_single_probe_only_after_claim():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60.0)
+    half_open(breaker)
+    # allow는 자격을 가져가지 않으므로 여러 번 호출해도 됨
+    assert breaker.allow() and breaker.allow()
+    assert breaker.claim()
+    assert not breaker.allow() and not breaker.claim()
+    breaker.release()
+    assert breaker.claim()
+
+
+def test_half_open_probe_outcomes():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60.0)
+    half_open(breaker)
+    breaker.claim()
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_OPEN
+
+    breaker._opened_at = time.monotonic() - breaker.reset_timeout
+    assert breaker.claim()
+    breaker.record_success()
+    assert breaker.state == CIRCUIT_CLOSED and breaker.allow()
+
+
+def test_non_retryable_error_closes_half_open_breaker():
+    async def run():
+        provider = ScriptedProvider(errors=[StatusError(400)])
+        client = make_client(provider)
+        breaker = client.breakers["chat"]
+        half_open(breaker)
+        with pytest.raises(StatusError):
+            await client.chat(MESSAGES)
+        assert breaker.state == CIRCUIT_CLOSED and not breaker._probing
+        assert await client.chat(MESSAGES) == "ok"
+
+    asyncio.run(run())
+
+
+def test_retryable_error_reopens_half_open_breaker():
+    async def run():
+        client = make_client(ScriptedProvider(errors=[StatusError(503)]))
+        breaker = client.breakers["chat"]
+        half_open(breaker)
+        with pytest.raises(StatusError):
+            await client.chat(MESSAGES)
+        assert breaker.state == CIRCUIT_OPEN and not breaker._probing
+        with pytest.raises(SchedulerRejected) as error:
+            await client.chat(MESSAGES)
+        assert error.value.reason == "circuit_open"
+
+    asyncio.run(run())
+
+
+def test_probe_rejected_by_scheduler_does_not_hold_breaker():
+    async def run():
+        scheduler = ModelScheduler(max_concurrency=1, reserved_slots=0, deadlines={PRIORITY_SUMMARY: 0.05})
+        client = make_client(ScriptedProvider(), scheduler=scheduler)
+        breaker = client.breakers["chat"]
+        half_open(breaker)
+        assert scheduler.try_acquire(PRIORITY_SUMMARY)
+        with pytest.raises(SchedulerRejected) as error:
+            await client.chat(MESSAGES)
+        assert error.value.reason == "deadline"
+        assert not breaker._probing
+        scheduler.release()
+        assert await client.chat(MESSAGES) == "ok"
+        assert breaker.state == CIRCUIT_CLOSED
+
+    asyncio.run(run())
+
+
+def test_stream_closed_before_first_token_releases_probe():
+    async def run():
+        client = make_client(ScriptedProvider(token_delay=0.05))
+        breaker = client.breakers["chat"]
+        half_open(breaker)
+        stream = client.chat_stream(MESSAGES)
+        first = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.01)
+        assert breaker._probing
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        await stream.aclose()
+        assert breaker.state == CIRCUIT_HALF_OPEN and not breaker._probing
+        assert [token async for token in client.chat_stream(MESSAGES)] == ["a", "b"]
+        assert breaker.state == CIRCUIT_CLOSED
+
+    asyncio.run(run())
+
+
+def test_stream_non_retryable_error_closes_half_open_breaker():
+    async def run():
+        client = make_client(ScriptedProvider(errors=[StatusError(400)]))
+        breaker = client.breakers["chat"]
+        half_open(breaker)
+        with pytest.raises(StatusError):
+            async for _ in client.chat_stream(MESSAGES):
+                pass
+        assert breaker.state == CIRCUIT_CLOSED and not breaker._probing
+
+    asyncio.run(run())
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from response_cache import ResponseCache
+
+
+def test_concurrent_misses_share_one_upstream_call():
+    async def run():
+        cache = ResponseCache(max_entries=8, ttl=60.0)
+        calls = 0
+        release = asyncio.Event()
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "요약"
+
+        waiters = [asyncio.create_task(cache.get_or_compute("key", compute)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        assert await asyncio.gather(*waiters) == ["요약"] * 3
+        assert calls == 1
+        assert await cache.get_or_compute("key", compute) == "요약" and calls == 1
+        stats = cache.stats()
+        assert (stats["misses"], stats["coalesced"], stats["memory_hits"], stats["inflight"]) == (1, 2, 1, 0)
+
+    asyncio.run(run())
+
+
+def test_failure_is_shared_and_not_cached():
+    async def run():
+        cache = ResponseCache(max_entries=8, ttl=60.0)
+        release = asyncio.Event()
+
+        async def failing():
+            await release.wait()
+            raise RuntimeError("upstream")
+
+        waiters = [asyncio.create_task(cache.get_or_compute("key", failing)) for _ in range(2)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+        async def succeed():
+            return "ok"
+
+        assert await cache.get_or_compute("key", succeed) == "ok"
+
+    asyncio.run(run())
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def run():
+        cache = ResponseCache(max_entries=8, ttl=60.0)
+        release = asyncio.Event()
+        calls = 0
+
+        async def slow():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "요약"
+
+        leader = asyncio.create_task(cache.get_or_compute("key", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get_or_compute("key", slow))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        release.set()
+        assert await follower == "요약"
+        await asyncio.sleep(0)
+        assert cache.stats()["inflight"] == 0
+        assert await cache.get_or_compute("key", slow) == "요약" and calls == 1
+
+    asyncio.run(run())
+
+
+def test_abandoned_call_still_fills_cache():
+    async def run():
+        cache = ResponseCache(max_entries=8, ttl=60.0)
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return "요약"
+
+        caller = asyncio.create_task(cache.get_or_compute("key", slow))
+        await asyncio.sleep(0)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        release.set()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert len(cache) == 1 and cache.inflight == 0
+
+    asyncio.run(run())
@@ -0,0 +1,51 @@
+import asyncio
+
+from config import settings
+from risk_analysis import analyze_risk_text
+from risk_lexicon import AhoCorasick, RiskPrescreener
+
+
+def test_automaton_finds_overlapping_terms():
+    automaton = AhoCorasick({"새끼": "profanity", "개새끼": "profanity", "죽여버": "threat"})
+    matches = automaton.search("이개새끼죽여버린다")
+    assert sorted(term for term, _ in matches) == ["개새끼", "새끼", "죽여버"]
+
+
+def test_everyday_words_do_not_match():
+    prescreener = RiskPrescreener()
+    for text in ("고기를 꼭꼭 씹어 드세요", "껌 씹다가 이가 아파요", "시발점부터 다시 확인할게요", "새끼손가락을 다쳤어요"):
+        result = prescreener.score(text)
+        assert result.matches == [] and result.risk_stage == "정상", text
+    assert prescreener.score("이 씹새끼야").categories == ["profanity"]
+
+
+def test_threat_with_profanity_is_critical():
+    prescreener = RiskPrescreener()
+    threat = prescreener.score("죽여버릴거야")
+    assert threat.risk_stage == "경고"
+    combined = prescreener.score("죽여버릴거야 씨발")
+    assert combined.risk_stage == "위험" and combined.categories == ["profanity", "threat"]
+    assert combined.emotion == "위협"
+    assert prescreener.score("죽고 싶어요").risk_stage == "위험"
+
+
+def test_default_threshold_matches_settings():
+    assert RiskPrescreener().escalate_threshold == settings.PRESCREEN_ESCALATE_THRESHOLD
+    prescreener = RiskPrescreener()
+    assert prescreener.should_escalate(prescreener.score("정말 짜증나네요"))
+    assert not prescreener.should_escalate(prescreener.score("카드 재발급 문의드립니다"))
+
+
+def test_ungated_analysis_always_consults_model():
+    prescreener = RiskPrescreener(sample_rate=0.0)
+    calls = []
+
+    async def chat(model_text, messages):
+        calls.append(model_text)
+        return '{"risk_level": 80, "risk_stage": "위험", "emotion": "위협", "analysis": "우회적 위협"}'
+
+    text = "밤길 조심하시라고요 집 주소 알고 있습니다"
+    gated = asyncio.run(analyze_risk_text(text, prescreener, chat))
+    assert gated["source"] == "prescreen" and calls == []
+    result = asyncio.run(analyze_risk_text(text, prescreener, chat, gate=False))
+    assert result["source"] == "model" and result["risk_stage"] == "위험" and calls == [text]
@@ -0,0 +1,54 @@
+import numpy as np
+
+from streaming import PCMRingBuffer, TranscriptMerger
+
+
+def test_merger_commits_prefix_agreed_by_consecutive_windows():
+    merger = TranscriptMerger()
+    first = merger.update("카드 결제 내역을")
+    assert first.committed == "" and first.tentative == "카드 결제 내역을"
+    second = merger.update("카드 결제 내역을 확인하고 싶어요")
+    assert second.committed == "카드 결제 내역을"
+    assert second.tentative == "확인하고 싶어요"
+
+
+def test_merger_strips_overlap_with_committed_text():
+    merger = TranscriptMerger()
+    merger.update("카드 결제 내역을")
+    merger.update("카드 결제 내역을 확인하고")
+    # 다음 윈도우가 확정된 끝부분과 겹쳐 시작해도 다시 확정하지 않음
+    update = merger.update("내역을 확인하고 싶어요")
+    assert update.committed == "확인하고"
+    assert merger.committed_text == "카드 결제 내역을 확인하고"
+    assert update.tentative == "싶어요"
+
+
+def test_merger_skips_clipped_leading_word():
+    merger = TranscriptMerger()
+    merger.update("환불 언제 되나요")
+    update = merger.update("불 환불 언제 되나요")
+    assert update.committed == "환불 언제 되나요"
+
+
+def test_merger_forces_commit_after_pending_updates():
+    merger = TranscriptMerger(max_pending_updates=2)
+    assert merger.update("하나").committed == ""
+    # 동의 없는 갱신이 두 번 이어지면 마지막 결과를 그대로 확정
+    update = merger.update("둘")
+    assert update.committed == "둘" and update.tentative == ""
+
+
+def test_merger_flush_commits_tail():
+    merger = TranscriptMerger()
+    merger.update("감사합니다 좋은 하루")
+    update = merger.flush()
+    assert update.committed == "감사합니다 좋은 하루" and update.tentative == ""
+    assert merger.flush().committed == ""
+
+
+def test_ring_buffer_keeps_latest_samples():
+    buffer = PCMRingBuffer(capacity_seconds=1.0, sample_rate=10)
+    buffer.append(np.arange(8, dtype=np.int16).tobytes())
+    buffer.append(np.arange(8, 14, dtype=np.int16).tobytes())
+    assert len(buffer) == 10
+    assert buffer.latest(0.5).tolist() == [9, 10, 11, 12, 13]
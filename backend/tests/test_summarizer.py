@@ -0,0 +1,101 @@
+import asyncio
+
+from call_store import CallStore
+from summarizer import RollingSummarizer, split_text
+
+
+class FakeClient:
+    available = True
+
+    def __init__(self):
+        self.prompts = []
+
+    async def chat(self, model, messages, **kwargs):
+        self.prompts.append(messages[-1]["content"])
+        return f"요약{len(self.prompts)}"
+
+    async def chat_stream(self, model, messages, **kwargs):
+        self.prompts.append(messages[-1]["content"])
+        for part in ("스트림 ", f"요약{len(self.prompts)}"):
+            yield part
+
+
+def test_split_text_keeps_segments_under_limit():
+    text = "첫 문장입니다. 두 번째 문장입니다! " + "가" * 45 + ". 끝."
+    segments = split_text(text, 20)
+    assert all(len(segment) <= 20 for segment in segments)
+    assert "".join(segments).replace(" ", "") == text.replace(" ", "")
+
+
+def test_call_summary_folds_only_new_transcript():
+    async def run():
+        client = FakeClient()
+        summarizer = RollingSummarizer(client, trigger_chars=0)
+        call = await CallStore().get_or_create("call")
+        call.append_transcript("카드가 분실되었어요.", source="stt")
+        assert await summarizer.summarize_call(call) == "요약1"
+        # 새 전사가 없으면 모델을 호출하지 않음
+        assert await summarizer.summarize_call(call) == "요약1" and len(client.prompts) == 1
+
+        call.append_transcript("재발급은 언제 되나요?", source="stt")
+        assert await summarizer.summarize_call(call) == "요약2"
+        assert "요약1" in client.prompts[-1] and "재발급" in client.prompts[-1]
+        assert "분실" not in client.prompts[-1]
+        assert call.summary_seq == call.last_seq
+
+    asyncio.run(run())
+
+
+def test_stream_call_saves_streamed_summary():
+    async def run():
+        client = FakeClient()
+        summarizer = RollingSummarizer(client, trigger_chars=0)
+        call = await CallStore().get_or_create("call")
+        call.append_transcript("환불 요청합니다.", source="text_chunk")
+        parts = [delta async for delta in summarizer.stream_call(call)]
+        assert "".join(parts) == "스트림 요약1" and call.summary == "스트림 요약1"
+        assert [delta async for delta in summarizer.stream_call(call)] == ["스트림 요약1"]
+
+    asyncio.run(run())
+
+
+def test_long_text_uses_map_reduce():
+    async def run():
+        client = FakeClient()
+        summarizer = RollingSummarizer(client, direct_max_chars=100, segment_chars=50, fan_in=2, trigger_chars=0)
+        text = " ".join(f"{n}번째 문의 내용을 설명드리겠습니다." for n in range(12))
+        assert await summarizer.summarize_text(text)
+        segments = len(split_text(text, 50))
+        # 구간 요약 + fan_in개씩 합치는 호출
+        assert segments < len(client.prompts) < segments * 2
+
+    asyncio.run(run())
+
+
+def test_compact_keeps_recent_turns_verbatim():
+    async def run():
+        client = FakeClient()
+        summarizer = RollingSummarizer(client, trigger_chars=0)
+        text = " ".join(f"{n}번 고객 발화입니다." for n in range(40))
+        compacted = await summarizer.compact(text, budget=60, endpoint="generate_script")
+        assert "39번 고객 발화입니다." in compacted and "요약" in compacted
+        assert compacted.count("고객 발화입니다.") < 40
+        assert await summarizer.compact("짧은 대화", budget=60, endpoint="generate_script") == "짧은 대화"
+
+    asyncio.run(run())
+
+
+def test_schedule_runs_background_update_after_trigger():
+    async def run():
+        client = FakeClient()
+        summarizer = RollingSummarizer(client, trigger_chars=20)
+        call = await CallStore().get_or_create("call")
+        call.append_transcript("짧은 발화", source="stt")
+        summarizer.schedule(call)
+        assert not summarizer._background
+        call.append_transcript("요약을 미리 만들어 둘 만큼 긴 발화가 이어집니다.", source="stt")
+        summarizer.schedule(call)
+        await asyncio.gather(*summarizer._background.values())
+        assert call.summary == "요약1" and call.summary_seq == call.last_seq
+
+    asyncio.run(run())
@@ -0,0 +1,54 @@
+import pytest
+
+from token_budget import GAP_MARKER, count_tokens, dedupe_fragments, split_fragments, truncate_recent
+
+TRANSCRIPT = "안녕하세요 카드 문의입니다. 결제가 두 번 됐어요. 환불 언제 되나요? 빨리 처리해 주세요."
+
+
+@pytest.mark.parametrize("budget", [1, 2, 3, 4, 5])
+def test_truncate_recent_terminates_on_tiny_budgets(budget):
+    result = truncate_recent("가나다라마바사아자차카타파하 가나", budget)
+    assert result
+    assert count_tokens(result) <= budget
+    assert "가나다라마바사아자차카타파하 가나".endswith(result)
+
+
+def test_truncate_recent_ascii_tail_shorter_than_four_chars():
+    result = truncate_recent("abcdefghijklmnopqrstuvwxyz" * 3, 1)
+    assert count_tokens(result) <= 1
+    assert result.endswith("z")
+
+
+def test_truncate_recent_returns_text_within_budget_or_without_budget():
+    assert truncate_recent(TRANSCRIPT, 0) == TRANSCRIPT
+    assert truncate_recent(TRANSCRIPT, count_tokens(TRANSCRIPT)) == TRANSCRIPT
+
+
+def test_truncate_recent_keeps_last_fragment_and_marks_gaps():
+    fragments = split_fragments(TRANSCRIPT)
+    budget = count_tokens(fragments[-1]) + count_tokens(fragments[-2]) + 2
+    result = truncate_recent(TRANSCRIPT, budget)
+    assert result.endswith(fragments[-1])
+    assert result.startswith(GAP_MARKER)
+    assert count_tokens(result.replace(GAP_MARKER, "")) <= budget
+
+
+def test_truncate_recent_prefers_weighted_earlier_fragment():
+    fragments = split_fragments(TRANSCRIPT)
+    budget = count_tokens(fragments[-1]) + count_tokens(fragments[1]) + 2
+    result = truncate_recent(TRANSCRIPT, budget, weigh=lambda fragment: 10.0 if "결제" in fragment else 0.0)
+    assert fragments[1] in result and result.endswith(fragments[-1])
+
+
+def test_dedupe_fragments_collapses_repeats():
+    text = "네 네 네 네, 알겠습니다. 카드 결제가 두 번 됐어요. 카드 결제가 두 번 됐어요."
+    assert dedupe_fragments(text) == "네, 알겠습니다. 카드 결제가 두 번 됐어요."
+
+
+def test_dedupe_keeps_repeated_threats_for_risk_input():
+    text = "가만 안 둘 거야. 가만 안 둘 거야. 죽여 죽여 죽여. 찾아가서 가만 안 둘 거야"
+    kept = dedupe_fragments(text, keep_repeats=True)
+    assert kept.count("가만 안 둘 거야") == 3 and "죽여 죽여 죽여" in kept
+    # 윈도우가 겹쳐 이어지는 조각은 계속 정리
+    overlap = "카드 결제가 두 번 됐어요 그런데. 카드 결제가 두 번 됐어요 그런데 환불이 안 돼요."
+    assert dedupe_fragments(overlap, keep_repeats=True) == "카드 결제가 두 번 됐어요 그런데 환불이 안 돼요."
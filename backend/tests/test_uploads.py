@@ -0,0 +1,62 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from uploads import receive_upload
+
+MAX_BYTES = 1024
+
+app = FastAPI()
+
+
+@app.post("/upload")
+async def upload(request: Request):
+    form, file = await receive_upload(request, "file", MAX_BYTES)
+    try:
+        data = await file.read()
+        return {"filename": file.filename, "size": len(data)}
+    finally:
+        await form.close()
+
+
+client = TestClient(app)
+
+
+def multipart_body(data: bytes, field: str = "file") -> bytes:
+    return (
+        b"--boundary\r\n"
+        + f'Content-Disposition: form-data; name="{field}"; filename="a.wav"\r\n'.encode()
+        + b"Content-Type: audio/wav\r\n\r\n"
+        + data
+        + b"\r\n--boundary--\r\n"
+    )
+
+
+MULTIPART = {"content-type": "multipart/form-data; boundary=boundary"}
+
+
+def test_accepts_file_within_limit():
+    response = client.post("/upload", files={"file": ("a.wav", b"x" * MAX_BYTES, "audio/wav")})
+    assert response.status_code == 200
+    assert response.json() == {"filename": "a.wav", "size": MAX_BYTES}
+
+
+def test_rejects_oversized_file_and_missing_field():
+    response = client.post("/upload", files={"file": ("a.wav", b"x" * (MAX_BYTES + 1), "audio/wav")})
+    assert response.status_code == 400 and "너무 큽니다" in response.json()["detail"]
+    response = client.post("/upload", files={"other": ("a.wav", b"x", "audio/wav")})
+    assert response.status_code == 400 and "파일이 없습니다" in response.json()["detail"]
+    assert client.post("/upload", content=b"x", headers={"content-type": "audio/wav"}).status_code == 400
+
+
+def test_limit_applies_while_streaming_without_content_length():
+    body = multipart_body(b"x" * (MAX_BYTES * 100))
+
+    def chunks():
+        # Content-Length 없이 청크 전송 (본문을 읽는 도중에 거부되어야 함)
+        for start in range(0, len(body), 4096):
+            yield body[start:start + 4096]
+
+    response = client.post("/upload", content=chunks(), headers=MULTIPART)
+    assert response.status_code == 400 and "너무 큽니다" in response.json()["detail"]
+    response = client.post("/upload", content=iter([multipart_body(b"abc")]), headers=MULTIPART)
+    assert response.json() == {"filename": "a.wav", "size": 3}
@@ -0,0 +1,203 @@
+"""
+모델 입력 토큰 계산과 긴 전사 줄이기
+
+- count_tokens: tiktoken(requirements.txt)으로 정확한 토큰 수를 계산합니다. tiktoken이 없거나 토크나이저
+  파일을 받을 수 없는 환경(오프라인)에서는 글자 종류별 어림값이므로 예산은 근사치로만 지켜집니다.
+- dedupe_fragments: 슬라이딩 윈도우 전사에서 생기는 반복 조각과 같은 단어 연속 반복("네 네 네 네") 제거
+  (위험도 입력은 keep_repeats로 겹침 조각만 정리하고, 같은 말을 되풀이한 것은 위험 신호이므로 남김)
+- truncate_recent: 토큰 예산을 넘으면 최근 발화 위주로(가중치가 높은 이전 발화는 남겨서) 자름
+- prepare_text: 위 전처리를 적용하고 요청마다 줄인 토큰 수를 메트릭으로 기록
+"""
+
+import logging
+import re
+from typing import Callable, Dict, List, Optional
+
+from metrics import PROMPT_TOKENS_SAVED, PROMPT_TOKENS_SAVED_TOTAL
+
+try:
+    import tiktoken
+except ImportError:  # 설치되지 않은 환경에서는 어림값 사용
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# gpt-3.5-turbo / gpt-4 계열 토크나이저
+TOKEN_ENCODING = "cl100k_base"
+# 메시지 하나마다 붙는 역할/구분 토큰과 응답 시작 토큰 (OpenAI 채팅 형식 기준)
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_OVERHEAD_TOKENS = 3
+GAP_MARKER = "…"
+# 포함 관계로 겹침을 판단할 최소 길이 (짧은 맞장구는 다른 조각에 포함되어도 남김)
+MIN_OVERLAP_CHARS = 8
+
+_FRAGMENT_END = re.compile(r"(?<=[.!?。])\s+|\n+")
+_REPEATED_WORD = re.compile(r"\b(\w+)(?:\s+\1\b){2,}")
+_NON_WORD = re.compile(r"[\W_]+")
+
+_encoding = None
+_encoding_failed = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_failed
+    if _encoding is None and tiktoken is not None and not _encoding_failed:
+        try:
+            _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+        except Exception as e:
+            # 토크나이저 파일을 받을 수 없는 환경이면 어림값 사용
+            _encoding_failed = True
+            logger.warning(f"tiktoken 토크나이저를 불러올 수 없어 토큰 수를 어림합니다: {e}")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    텍스트의 토큰 수 (tiktoken이 없으면 ASCII는 4글자에 1토큰, 한글 등 그 외 글자는 1글자에 1토큰으로 어림)
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    ascii_chars = sum(1 for char in text if char.isascii())
+    return (ascii_chars + 3) // 4 + len(text) - ascii_chars
+
+
+def count_message_tokens(messages: List[Dict[str, str]]) -> int:
+    """
+    채팅 메시지 목록의 입력 토큰 수
+    """
+    tokens = sum(count_tokens(message.get("content", "")) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+    return tokens + REPLY_OVERHEAD_TOKENS
+
+
+def split_fragments(text: str) -> List[str]:
+    return [fragment.strip() for fragment in _FRAGMENT_END.split(text) if fragment.strip()]
+
+
+def dedupe_fragments(text: str, window: int = 4, keep_repeats: bool = False) -> str:
+    """
+    반복된 전사 조각을 제거합니다.
+
+    - 같은 단어가 세 번 이상 연속되면 한 번만 남김
+    - 최근 window개 조각과 (공백/문장부호를 빼고) 같은 조각, 직전 조각에 포함되는 조각은 버림
+    - 직전 조각을 포함하며 이어지는 조각이면 직전 조각을 대체
+      (포함 관계는 둘 다 MIN_OVERLAP_CHARS 이상일 때만 비교)
+
+    keep_repeats가 True이면 윈도우가 겹쳐 생긴 포함 관계만 정리하고, 같은 조각이나 단어를
+    되풀이한 것(같은 위협을 여러 번 말함)은 그대로 둡니다.
+    """
+    kept: List[str] = []
+    keys: List[str] = []
+    for fragment in split_fragments(text):
+        if not keep_repeats:
+            fragment = _REPEATED_WORD.sub(r"\1", fragment)
+        key = _NON_WORD.sub("", fragment).lower()
+        if not key or (not keep_repeats and key in keys[-window:]):
+            continue
+        if keys and key != keys[-1] and len(key) >= MIN_OVERLAP_CHARS and len(keys[-1]) >= MIN_OVERLAP_CHARS:
+            if key in keys[-1]:
+                continue
+            if keys[-1] in key:
+                kept[-1], keys[-1] = fragment, key
+                continue
+        kept.append(fragment)
+        keys.append(key)
+    return " ".join(kept)
+
+
+def truncate_recent(
+    text: str,
+    budget: int,
+    weigh: Optional[Callable[[str], float]] = None,
+) -> str:
+    """
+    토큰 예산 안에 들도록 최근 발화 위주로 자릅니다.
+
+    조각마다 (뒤에서부터 센 토큰 수로) 예산의 절반마다 반으로 줄어드는 가중치를 주고,
+    weigh가 있으면 (1 + weigh(조각))을 곱합니다. 가중치가 높은 조각부터 예산이 찰 때까지 고르고,
+    원래 순서대로 이어 붙이되 빠진 구간은 GAP_MARKER로 표시합니다. 마지막 조각은 항상 포함합니다.
+    """
+    if budget <= 0 or count_tokens(text) <= budget:
+        return text
+    fragments = split_fragments(text)
+    if not fragments:
+        return text
+    sizes = [count_tokens(fragment) + 1 for fragment in fragments]
+    half_life = max(1, budget // 2)
+
+    weights = [0.0] * len(fragments)
+    age = 0
+    for index in range(len(fragments) - 1, -1, -1):
+        weights[index] = 0.5 ** (age / half_life) * (1.0 + (weigh(fragments[index]) if weigh else 0.0))
+        age += sizes[index]
+
+    last = len(fragments) - 1
+    if sizes[last] > budget:
+        # 마지막 조각 하나가 예산보다 길면 그 조각의 끝부분만 사용 (짧은 꼬리도 한 글자씩은 줄임)
+        tail = fragments[last]
+        while count_tokens(tail) > budget:
+            tail = tail[max(1, len(tail) // 4):]
+        return tail
+
+    selected = {last}
+    used = sizes[last]
+    for index in sorted(range(last), key=weights.__getitem__, reverse=True):
+        if used + sizes[index] <= budget:
+            selected.add(index)
+            used += sizes[index]
+
+    parts: List[str] = []
+    previous = -1
+    for index in sorted(selected):
+        if index > previous + 1:
+            parts.append(GAP_MARKER)
+        parts.append(fragments[index])
+        previous = index
+    return " ".join(parts)
+
+
+def record_saved(endpoint: str, technique: str, before: str, after: str) -> int:
+    """
+    전처리로 줄인 토큰 수를 기법별 카운터에 더하고 반환합니다.
+    """
+    saved = count_tokens(before) - count_tokens(after) if before != after else 0
+    if saved > 0:
+        PROMPT_TOKENS_SAVED_TOTAL.inc(saved, endpoint=endpoint, technique=technique)
+    return max(0, saved)
+
+
+def observe_saved(endpoint: str, before: str, after: str):
+    """
+    요청 하나에서 원래 텍스트 대비 줄인 전체 토큰 수 (요청당 분포)
+    """
+    saved = max(0, count_tokens(before) - count_tokens(after)) if before != after else 0
+    PROMPT_TOKENS_SAVED.observe(saved, endpoint=endpoint)
+
+
+def prepare_text(
+    endpoint: str,
+    text: str,
+    budget: int = 0,
+    weigh: Optional[Callable[[str], float]] = None,
+    observe: bool = True,
+    keep_repeats: bool = False,
+) -> str:
+    """
+    반복 제거 후 budget(0이면 자르지 않음)에 맞게 최근 발화 위주로 자른 텍스트를 반환하고 줄인 토큰 수를 기록합니다.
+
+    뒤에 다른 압축을 더 하는 경우 observe=False로 두고 마지막에 observe_saved를 직접 호출합니다.
+    위험도 분석 입력은 keep_repeats=True로 되풀이한 발화를 남깁니다. (dedupe_fragments 참고)
+    """
+    original = text
+    deduped = dedupe_fragments(text, keep_repeats=keep_repeats)
+    record_saved(endpoint, "dedupe", text, deduped)
+    text = deduped
+    if budget > 0:
+        truncated = truncate_recent(text, budget, weigh)
+        record_saved(endpoint, "truncate", text, truncated)
+        text = truncated
+    if observe:
+        observe_saved(endpoint, original, text)
+    return text
@@ -0,0 +1,84 @@
+"""
+크기 제한을 적용한 multipart 업로드 스트림 처리
+"""
+
+from typing import AsyncIterator, Tuple
+
+from fastapi import HTTPException, Request
+from starlette.datastructures import FormData, UploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+
+# multipart 경계/헤더 등 파일 데이터 외의 본문 크기 여유분
+MULTIPART_OVERHEAD = 64 * 1024
+
+# /transcribe 요청 본문 스키마 (OpenAPI 문서용)
+AUDIO_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail=f"파일 크기가 너무 큽니다. (최대 {max_bytes // (1024 * 1024)}MB)"
+    )
+
+
+async def _limited_stream(request: Request, max_bytes: int) -> AsyncIterator[bytes]:
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_bytes:
+            raise _too_large(max_bytes - MULTIPART_OVERHEAD)
+        yield chunk
+
+
+async def receive_upload(request: Request, field: str, max_bytes: int) -> Tuple[FormData, UploadFile]:
+    """
+    요청 본문을 청크 단위로 읽어 파일 필드를 반환합니다.
+
+    크기 제한은 본문을 읽는 도중에 적용됩니다. 파일 데이터는 1MB까지 메모리에,
+    그 이상은 이름 없는 임시 파일(SpooledTemporaryFile)에 저장되므로 요청마다
+    메모리 사용량이 일정하고 같은 파일명의 동시 업로드도 충돌하지 않습니다.
+    반환된 form은 사용 후 close 해야 합니다.
+    """
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        raise HTTPException(status_code=400, detail="multipart/form-data 형식으로 업로드해주세요.")
+
+    # Content-Length가 있으면 본문을 읽기 전에 거부
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD:
+        raise _too_large(max_bytes)
+
+    parser = MultiPartParser(
+        request.headers,
+        _limited_stream(request, max_bytes + MULTIPART_OVERHEAD),
+        max_files=1,
+        max_fields=10,
+    )
+    try:
+        form = await parser.parse()
+    except MultiPartException as e:
+        raise HTTPException(status_code=400, detail=f"업로드 형식이 올바르지 않습니다: {e.message}")
+
+    upload = form.get(field)
+    if not isinstance(upload, UploadFile):
+        await form.close()
+        raise HTTPException(status_code=400, detail="업로드된 파일이 없습니다.")
+    if upload.size is not None and upload.size > max_bytes:
+        await form.close()
+        raise _too_large(max_bytes)
+
+    await upload.seek(0)
+    return form, upload
@@ -17,6 +17,11 @@ export const connectWebSocket = (
     ws.onmessage = (event) => {
       try {
         const data = JSON.parse(event.data)
+        // 서버 하트비트에 응답 (응답이 없으면 유휴 연결로 종료됨)
+        if (data.type === 'ping') {
+          ws.send(JSON.stringify({ type: 'pong' }))
+          return
+        }
         console.log('웹소켓 메시지 수신:', data)
         onMessage(data)
       } catch (error) {
@@ -51,19 +56,26 @@ export const connectAudioStreamWebSocket = (
   console.log('=== 실시간 음성 스트리밍 웹소켓 연결 시작 ===')
   try {
     const ws = new WebSocket('ws://localhost:8000/ws/audio-stream')
-    
+
+    // 서버가 확정한 텍스트 누적 (미확정 꼬리는 매 메시지마다 교체)
+    let committedText = ''
+
     ws.onopen = () => {
       console.log('실시간 음성 스트리밍 웹소켓 연결됨')
       onOpen?.()
     }
-    
+
     ws.onmessage = (event) => {
       try {
         const data = JSON.parse(event.data)
         console.log('실시간 음성 변환 결과:', data)
-        
-        if (data.type === 'transcription') {
-          onTranscription(data.text)
+
+        if (data.type === 'transcription' || data.type === 'partial_transcription') {
+          if (data.text) {
+            committedText = committedText ? `${committedText} ${data.text}` : data.text
+          }
+          const tentative = data.tentative || ''
+          onTranscription(tentative ? `${committedText} ${tentative}`.trim() : committedText)
         } else if (data.type === 'error') {
           onError(data.message)
         }